@@ -0,0 +1,162 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+from calendar_sync.defaults import DEFAULT_JOBS
+from calendar_sync.feeds import is_url
+from calendar_sync.file_writer import write_ics_file
+from calendar_sync.sync import merge_calendars, read_calendar
+
+PAIR_KEYS = ("from", "to", "output", "add_prefix", "filter_prefix")
+
+
+class ManifestError(ValueError):
+    """Raised when a batch manifest is malformed or its pairs form a cycle."""
+
+
+def _read_manifest(manifest_path: str):
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        if manifest_path.endswith(".json"):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise ManifestError(
+                "Reading YAML manifests needs PyYAML, install it with "
+                "`pip install calendar_sync[yaml]` or use a .json manifest"
+            )
+        return yaml.safe_load(f)
+
+
+def load_manifest(manifest_path: str) -> List[Dict]:
+    """
+    Read the pairs to sync from a YAML or JSON manifest.
+
+    The manifest holds a `pairs` list, each pair with a `from` and `to`
+    calendar and optionally an `output` (defaults to `to`), `add_prefix` and
+    `filter_prefix`. Relative paths are read relative to the manifest.
+    """
+    manifest = _read_manifest(manifest_path)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("pairs"), list):
+        raise ManifestError(f"{manifest_path}: expected a 'pairs' list")
+
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    for number, entry in enumerate(manifest["pairs"], start=1):
+        if not isinstance(entry, dict) or not entry.get("from") or not entry.get("to"):
+            raise ManifestError(f"Pair {number}: 'from' and 'to' are required")
+        unknown = set(entry) - set(PAIR_KEYS)
+        if unknown:
+            raise ManifestError(f"Pair {number}: unknown keys {sorted(unknown)}")
+
+        pair = {key: entry.get(key) for key in PAIR_KEYS}
+        if not pair["output"]:
+            if is_url(pair["to"]):
+                raise ManifestError(f"Pair {number}: 'output' is required for URLs")
+            pair["output"] = pair["to"]
+        elif is_url(pair["output"]):
+            raise ManifestError(f"Pair {number}: 'output' must be a local path")
+        for key in ("from", "to", "output"):
+            if not is_url(pair[key]):
+                pair[key] = os.path.normpath(os.path.join(base, pair[key]))
+        pairs.append(pair)
+    return pairs
+
+
+def plan_batch(pairs: List[Dict]) -> List[List[Tuple[str, List[Dict]]]]:
+    """
+    Group the pairs by output and order the groups by their dependencies.
+
+    Pairs writing the same output are merged into it one after the other, in
+    manifest order, so they must share the same destination calendar. A group
+    that reads another group's output runs after it.
+
+    Returns:
+    - List[List[Tuple[str, List[Dict]]]]: Levels of (output, pairs) groups. The
+      groups within a level are independent of each other.
+    """
+    groups: Dict[str, List[Dict]] = {}
+    for pair in pairs:
+        group = groups.setdefault(pair["output"], [])
+        if group and group[0]["to"] != pair["to"]:
+            raise ManifestError(
+                f"Pairs writing {pair['output']} must share the same 'to' calendar"
+            )
+        group.append(pair)
+
+    depends_on = {
+        output: {
+            path
+            for pair in group
+            for path in (pair["from"], pair["to"])
+            if path in groups and path != output
+        }
+        for output, group in groups.items()
+    }
+
+    levels = []
+    done = set()
+    while len(done) < len(groups):
+        level = [
+            output
+            for output in groups
+            if output not in done and depends_on[output] <= done
+        ]
+        if not level:
+            cycle = sorted(set(groups) - done)
+            raise ManifestError(f"Outputs depend on each other: {', '.join(cycle)}")
+        levels.append([(output, groups[output]) for output in level])
+        done.update(level)
+    return levels
+
+
+def _merge_group(calendars: Dict, output: str, pairs: List[Dict]):
+    calendar = calendars[pairs[0]["to"]]
+    for pair in pairs:
+        calendar = merge_calendars(
+            calendars[pair["from"]],
+            calendar,
+            add_prefix=pair["add_prefix"],
+            filter_prefix=pair["filter_prefix"],
+        )
+    write_ics_file(calendar, output)
+    return calendar
+
+
+def run_batch(pairs: List[Dict], jobs: int = DEFAULT_JOBS) -> Dict[str, int]:
+    """
+    Sync all pairs, parsing every distinct input file once and writing every
+    output once.
+
+    Groups in the same level of `plan_batch` are merged concurrently by up to
+    `jobs` threads. Outputs are kept in memory, so a group reading the output
+    of an earlier group does not parse it again.
+
+    Returns:
+    - Dict[str, int]: The number of events written to each output.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    levels = plan_batch(pairs)
+    calendars = {}
+    counts = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for level in levels:
+            paths = list(
+                dict.fromkeys(
+                    path
+                    for _, group in level
+                    for pair in group
+                    for path in (pair["from"], pair["to"])
+                    if path not in calendars
+                )
+            )
+            calendars.update(zip(paths, pool.map(read_calendar, paths)))
+
+            merged = pool.map(lambda item: _merge_group(calendars, *item), level)
+            for (output, _), calendar in zip(level, merged):
+                calendars[output] = calendar
+                counts[output] = len(calendar.subcomponents)
+
+    return counts
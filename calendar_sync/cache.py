@@ -0,0 +1,195 @@
+import hashlib
+import os
+import struct
+from typing import List, Optional, Tuple
+
+# A cached record: (uid, summary, UTC start, UTC end, recurrence id, master)
+# with times in epoch seconds. The recurrence id is None unless the event
+# overrides an occurrence, the master is the serialized VEVENT of recurring
+# events and empty otherwise.
+Record = Tuple[str, str, int, int, Optional[int], bytes]
+# The source file's size, mtime in ns and blake2b content digest
+Fingerprint = Tuple[int, int, bytes]
+
+MAGIC = b"CSC3"
+# magic, source size, source mtime in ns, blake2b content digest, record count
+HEADER = struct.Struct("<4sQq16sI")
+# start, end, recurrence id, uid length, summary length, master length
+RECORD = struct.Struct("<qqqIII")
+# Stored in place of a missing recurrence id
+NO_RECURRENCE_ID = -(2**63)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Return the cache directory, following XDG_CACHE_HOME when it is set."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "calendar_sync")
+
+
+def _file_digest(path: str) -> bytes:
+    """Hash the contents of a file in chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def encode_records(size: int, mtime_ns: int, digest: bytes, records) -> bytes:
+    """Serialize records into the compact binary cache format."""
+    parts = [HEADER.pack(MAGIC, size, mtime_ns, digest, len(records))]
+    for uid, summary, start, end, recurrence_id, master in records:
+        uid_bytes = uid.encode("utf-8")
+        summary_bytes = summary.encode("utf-8")
+        if recurrence_id is None:
+            recurrence_id = NO_RECURRENCE_ID
+        parts.append(
+            RECORD.pack(
+                start,
+                end,
+                recurrence_id,
+                len(uid_bytes),
+                len(summary_bytes),
+                len(master),
+            )
+        )
+        parts += [uid_bytes, summary_bytes, master]
+    return b"".join(parts)
+
+
+def decode_header(data: bytes) -> Optional[Tuple[int, int, bytes, int]]:
+    """Return (size, mtime_ns, digest, count) or None if this is not a cache file."""
+    if len(data) < HEADER.size:
+        return None
+    magic, size, mtime_ns, digest, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    return size, mtime_ns, digest, count
+
+
+def decode_records(data: bytes, count: int) -> List[Record]:
+    """Deserialize the records that follow the header."""
+    records = []
+    offset = HEADER.size
+    for _ in range(count):
+        start, end, recurrence_id, uid_length, summary_length, master_length = (
+            RECORD.unpack_from(data, offset)
+        )
+        offset += RECORD.size
+        uid = data[offset : offset + uid_length].decode("utf-8")
+        offset += uid_length
+        summary = data[offset : offset + summary_length].decode("utf-8")
+        offset += summary_length
+        master = data[offset : offset + master_length]
+        offset += master_length
+        if recurrence_id == NO_RECURRENCE_ID:
+            recurrence_id = None
+        records.append((uid, summary, start, end, recurrence_id, master))
+    return records
+
+
+class EventCache:
+    """
+    On-disk cache of the normalized event records parsed from ICS files.
+
+    Entries are stored per source path and are valid while the source has the
+    same size and mtime, or, if only the mtime changed, the same content hash.
+    The total size of the cache is kept under `max_bytes` by evicting the least
+    recently used entries.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, ics_file: str) -> str:
+        key = hashlib.sha1(os.path.abspath(ics_file).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def get(self, ics_file: str) -> Optional[List[Record]]:
+        """Return the cached records for the ICS file, or None on a miss."""
+        entry = self._entry_path(ics_file)
+        try:
+            with open(entry, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        header = decode_header(data)
+        if header is None:
+            return None
+        size, mtime_ns, digest, count = header
+
+        stat = os.stat(ics_file)
+        if stat.st_size != size:
+            return None
+        if stat.st_mtime_ns != mtime_ns:
+            # Touched but maybe not modified, compare the contents instead
+            if _file_digest(ics_file) != digest:
+                return None
+            header = HEADER.pack(MAGIC, size, stat.st_mtime_ns, digest, count)
+            data = header + data[HEADER.size :]
+            self._write(entry, data)
+
+        # Bump the entry's mtime, which is what eviction orders by
+        os.utime(entry)
+        return decode_records(data, count)
+
+    def fingerprint(self, ics_file: str) -> Fingerprint:
+        """Return the size, mtime and digest of the ICS file, to take before parsing."""
+        stat = os.stat(ics_file)
+        return stat.st_size, stat.st_mtime_ns, _file_digest(ics_file)
+
+    def put(self, ics_file: str, records: List[Record], fingerprint: Fingerprint):
+        """
+        Store the records parsed from the ICS file and evict old entries.
+
+        `fingerprint` is what `fingerprint` returned before the file was parsed.
+        Nothing is stored if the file has changed since, as the records may then
+        be those of the old contents.
+        """
+        size, mtime_ns, digest = fingerprint
+        stat = os.stat(ics_file)
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return
+        data = encode_records(size, mtime_ns, digest, records)
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._entry_path(ics_file), data)
+        self.evict()
+
+    def _write(self, entry: str, data: bytes):
+        temp_path = f"{entry}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, entry)
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if name.endswith(".bin"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.directory, name))
@@ -1,8 +1,345 @@
-from typing import List, Tuple, Dict
+import heapq
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from calendar_sync import timings
+from calendar_sync.cache import EventCache
 from calendar_sync.event_loader import load_events
+from calendar_sync.event_store import EventStore
+from calendar_sync.parallel import load_events_parallel
 
+if TYPE_CHECKING:
+    from calendar_sync.event_db import EventDB
 
-def check_conflicts(file1: str, file2: str, days: int) -> List[Tuple[Dict, Dict]]:
+# A day and a minute in EventStore time keys, epoch microseconds
+DAY = 86_400_000_000
+MINUTE = 60_000_000
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+def _sweep(calendars: List[List[Dict]]) -> Iterator[Tuple[int, Dict, int, Dict]]:
+    """
+    Yield every conflicting pair of events between different calendars.
+
+    Events from all calendars are merged into a single timeline ordered by start
+    time while one min-heap per calendar, keyed on end time, holds the events
+    of that calendar that are still running. Each event is only compared
+    against the running events of the other calendars, so the cost is
+    O(N (log N + C) + k) for N events in C calendars and k conflicts, however
+    many events of one calendar overlap each other. The sweep runs over the
+    integer columns of an EventStore, the event dicts are only looked up for
+    conflicting pairs.
+
+    Yields (index1, event1, index2, event2) with index1 < index2, where the
+    indexes refer to positions in `calendars`.
+    """
+    store = EventStore.from_calendars(calendars)
+    starts, ends, uids, indexes = store.starts, store.ends, store.uids, store.calendars
+    events = store.events
+
+    # Positions follow calendar and file order, the stable sort keeps that for ties
+    timeline = sorted(range(len(store)), key=starts.__getitem__)
+
+    active = [[] for _ in calendars]
+    # Zero-length events never stay active, so exact matches between them
+    # are paired up separately, among those sharing the current start time.
+    instants = []
+
+    # Slots seen at the current start time, to skip repeated events in a calendar
+    slots = set()
+    slots_start = None
+
+    for i in timeline:
+        start, end, uid, index = starts[i], ends[i], uids[i], indexes[i]
+
+        if start != slots_start:
+            slots.clear()
+            instants.clear()
+            slots_start = start
+        if (index, end, uid) in slots:
+            continue
+        slots.add((index, end, uid))
+
+        for other, running in enumerate(active):
+            # Drop events that ended before this one started
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            if other == index:
+                continue
+            for running_end, j in running:
+                if uids[j] != uid and (
+                    (start < running_end and end > starts[j])
+                    or (start == starts[j] and end == running_end)
+                ):
+                    yield _ordered(other, events[j], index, events[i])
+
+        if end == start:
+            for j in instants:
+                if indexes[j] != index and uids[j] != uid:
+                    yield _ordered(indexes[j], events[j], index, events[i])
+            instants.append(i)
+        else:
+            heapq.heappush(active[index], (end, i))
+
+
+def _ordered(index1: int, event1: Dict, index2: int, event2: Dict) -> Tuple:
+    """Return the pair with the event from the lowest calendar index first."""
+    if index1 < index2:
+        return index1, event1, index2, event2
+    return index2, event2, index1, event1
+
+
+def find_conflicts(events1: List[Dict], events2: List[Dict]) -> List[Tuple[Dict, Dict]]:
+    """
+    Find conflicting events between two lists of loaded events using a sweep line.
+
+    Parameters:
+    - events1 (List[Dict]): Events as returned by `load_events` for the first file.
+    - events2 (List[Dict]): Events as returned by `load_events` for the second file.
+
+    Returns:
+    - List[Tuple[Dict, Dict]]: A list of tuples, each containing two conflicting
+      events, with the event from `events1` first.
+    """
+    with timings.stage("find_conflicts") as find:
+        conflicts = [
+            (event1, event2) for _, event1, _, event2 in _sweep([events1, events2])
+        ]
+        find.add(events=len(events1) + len(events2), conflicts=len(conflicts))
+    return conflicts
+
+
+def iter_conflicts(
+    calendars: Dict[str, List[Dict]],
+) -> Iterator[Tuple[str, Dict, str, Dict]]:
+    """
+    Lazily yield the conflicts between any two of several calendars, as the
+    sweep finds them, ordered by the start of the later event.
+
+    Nothing but the sweep's running events is held on to, so a consumer that
+    writes conflicts out as they come uses memory bounded by the largest set
+    of overlapping events rather than by the number of conflicts.
+
+    Parameters:
+    - calendars (Dict[str, List[Dict]]): Loaded events keyed by calendar name.
+
+    Returns:
+    - Iterator[Tuple[str, Dict, str, Dict]]: (calendar1, event1, calendar2,
+      event2) tuples, ordered so calendar1 comes before calendar2 in `calendars`.
+    """
+    names = list(calendars)
+    for index1, event1, index2, event2 in _sweep(list(calendars.values())):
+        yield names[index1], event1, names[index2], event2
+
+
+def find_conflicts_multi(
+    calendars: Dict[str, List[Dict]],
+) -> List[Tuple[str, Dict, str, Dict]]:
+    """
+    Find conflicting events between any two of several calendars in one sweep.
+
+    Parameters:
+    - calendars (Dict[str, List[Dict]]): Loaded events keyed by calendar name.
+
+    Returns:
+    - List[Tuple[str, Dict, str, Dict]]: A list of (calendar1, event1, calendar2,
+      event2) tuples, ordered so calendar1 comes before calendar2 in `calendars`.
+    """
+    with timings.stage("find_conflicts") as find:
+        conflicts = list(iter_conflicts(calendars))
+        find.add(
+            events=sum(len(events) for events in calendars.values()),
+            conflicts=len(conflicts),
+        )
+    return conflicts
+
+
+def _decrement(counter: Counter, key) -> None:
+    counter[key] -= 1
+    if not counter[key]:
+        del counter[key]
+
+
+def _count_conflicts(store: EventStore) -> Tuple[Counter, Counter]:
+    """
+    Count the conflicts `_sweep` would yield without pairing any events up.
+
+    Rather than a list of running events, the sweep keeps how many are running
+    per calendar, and per UID and calendar to leave out copies of the same
+    event. An event then conflicts with that many events of each other
+    calendar, so the cost stays O(N log N) for N events however many
+    conflicts there are, times the number of calendars running at once.
+
+    Returns the conflicts per (index1, index2) pair of calendars, with
+    index1 < index2, and per start of the later event, as a store time key.
+    """
+    starts, ends, uids, indexes = store.starts, store.ends, store.uids, store.calendars
+    timeline = sorted(range(len(store)), key=starts.__getitem__)
+
+    ending = []
+    running, running_uids = Counter(), {}
+    # Running events that started at the current start time, which zero-length
+    # events starting then do not overlap, and the zero-length events themselves
+    fresh, fresh_uids = Counter(), {}
+    instants, instant_uids = Counter(), {}
+    none = Counter()
+
+    slots = set()
+    slots_start = None
+    pairs, by_start = Counter(), Counter()
+
+    for i in timeline:
+        start, end, uid, index = starts[i], ends[i], uids[i], indexes[i]
+
+        if start != slots_start:
+            slots.clear()
+            fresh.clear()
+            fresh_uids.clear()
+            instants.clear()
+            instant_uids.clear()
+            slots_start = start
+        if (index, end, uid) in slots:
+            continue
+        slots.add((index, end, uid))
+
+        while ending and ending[0][0] <= start:
+            j = heapq.heappop(ending)[1]
+            _decrement(running, indexes[j])
+            _decrement(running_uids[uids[j]], indexes[j])
+            if not running_uids[uids[j]]:
+                del running_uids[uids[j]]
+
+        if end == start:
+            others = running - fresh + instants
+            copies = (
+                running_uids.get(uid, none) - fresh_uids.get(uid, none)
+            ) + instant_uids.get(uid, none)
+        else:
+            others = running
+            copies = running_uids.get(uid, none)
+
+        found = 0
+        for other, count in others.items():
+            count -= copies[other]
+            if other != index and count:
+                pairs[(other, index) if other < index else (index, other)] += count
+                found += count
+        if found:
+            by_start[start] += found
+
+        if end == start:
+            instants[index] += 1
+            instant_uids.setdefault(uid, Counter())[index] += 1
+        else:
+            heapq.heappush(ending, (end, i))
+            for counter, uid_counters in (
+                (running, running_uids),
+                (fresh, fresh_uids),
+            ):
+                counter[index] += 1
+                uid_counters.setdefault(uid, Counter())[index] += 1
+
+    return pairs, by_start
+
+
+def _minutes(duration: int) -> float:
+    return round(duration / MINUTE, 2)
+
+
+def _double_booked(store: EventStore) -> Counter:
+    """
+    Return how long, per day, events of at least two calendars that are not
+    copies of one event ran at the same time, in store time keys.
+
+    Two running events conflict unless they share a calendar or a UID, and
+    a set of events that pairwise share one or the other all share the same
+    one. So time is double-booked whenever the running events span at least
+    two calendars and two UIDs.
+    """
+    starts, ends = store.starts, store.ends
+    # Zero-length events take up no time
+    spans = [i for i in range(len(store)) if ends[i] > starts[i]]
+    points = sorted(
+        [(starts[i], 1, i) for i in spans] + [(ends[i], -1, i) for i in spans]
+    )
+    calendars, uids = Counter(), Counter()
+    days = Counter()
+    previous = None
+    for time, change, i in points:
+        if len(calendars) > 1 and len(uids) > 1:
+            while previous < time:
+                boundary = min(time, (previous // DAY + 1) * DAY)
+                days[previous // DAY] += boundary - previous
+                previous = boundary
+        if change > 0:
+            calendars[store.calendars[i]] += 1
+            uids[store.uids[i]] += 1
+        else:
+            _decrement(calendars, store.calendars[i])
+            _decrement(uids, store.uids[i])
+        previous = time
+    return days
+
+
+def summarize_conflicts(calendars: Dict[str, List[Dict]]) -> Dict:
+    """
+    Count the conflicts between any two of several calendars without listing
+    them, along with the time that is double-booked.
+
+    The conflicts counted are the ones `iter_conflicts` yields, per pair of
+    calendars and per day (UTC) of the later event's start. Double-booked time
+    is the time during which at least two events conflict, counted once
+    however many do. Days and minutes are left out unless the event times are
+    aware datetimes, as `load_events` returns them.
+
+    Parameters:
+    - calendars (Dict[str, List[Dict]]): Loaded events keyed by calendar name.
+
+    Returns:
+    - Dict: `events`, `conflicts` and `overlap_minutes` totals, `calendars`
+      with the conflicts of each pair of calendars that has any, and `days`
+      with the conflicts and overlap minutes of each day that has either.
+    """
+    names = list(calendars)
+    with timings.stage("find_conflicts") as find:
+        store = EventStore.from_calendars(list(calendars.values()))
+        pairs, by_start = _count_conflicts(store)
+        summary = {
+            "events": len(store),
+            "conflicts": sum(pairs.values()),
+            "overlap_minutes": None,
+            "calendars": [
+                {"calendar1": names[i], "calendar2": names[j], "conflicts": count}
+                for (i, j), count in sorted(pairs.items())
+            ],
+            "days": [],
+        }
+        if store.exact:
+            by_day = Counter()
+            for start, count in by_start.items():
+                by_day[start // DAY] += count
+            overlap = _double_booked(store)
+            summary["overlap_minutes"] = _minutes(sum(overlap.values()))
+            summary["days"] = [
+                {
+                    "day": (_EPOCH_DATE + timedelta(days=day)).isoformat(),
+                    "conflicts": by_day[day],
+                    "overlap_minutes": _minutes(overlap[day]),
+                }
+                for day in sorted(by_day.keys() | overlap.keys())
+            ]
+        find.add(events=len(store), conflicts=summary["conflicts"])
+    return summary
+
+
+def check_conflicts(
+    file1: str,
+    file2: str,
+    days: int,
+    use_mmap: bool = False,
+    cache: Optional[EventCache] = None,
+    jobs: int = 1,
+) -> List[Tuple[Dict, Dict]]:
     """
     Check for conflicting events between two ICS files within the next 'days' days.
 
@@ -10,31 +347,81 @@ def check_conflicts(file1: str, file2: str, days: int) -> List[Tuple[Dict, Dict]
     - file1 (str): Path to the first ICS file.
     - file2 (str): Path to the second ICS file.
     - days (int): Number of days to look ahead for events.
+    - use_mmap (bool): Read the files through a memory-mapped VEVENT index.
+    - cache (EventCache): Cache of parsed events to skip parsing unchanged files.
+    - jobs (int): Parse the files in this many worker processes.
 
     Returns:
     - List[Tuple[Dict, Dict]]: A list of tuples, each containing two conflicting events.
     """
-    events1 = load_events(file1, days)
-    events2 = load_events(file2, days)
+    if jobs > 1:
+        calendars = load_events_parallel([file1, file2], days, jobs, cache=cache)
+        return find_conflicts(calendars[file1], calendars[file2])
 
-    conflicts = []
+    events1 = load_events(file1, days, use_mmap=use_mmap, cache=cache)
+    events2 = load_events(file2, days, use_mmap=use_mmap, cache=cache)
 
-    # Create a set of event times for faster lookup
-    event_times1 = {(event["start"], event["end"], event["uid"]) for event in events1}
-    event_times2 = {(event["start"], event["end"], event["uid"]) for event in events2}
+    return find_conflicts(events1, events2)
 
-    # Check for overlapping or identical time events
-    for start1, end1, uid1 in event_times1:
-        for start2, end2, uid2 in event_times2:
-            # Only consider conflicts if UIDs are different
-            if uid1 != uid2:
-                # Detect conflicts when time slots overlap or match exactly
-                if (start1 < end2 and end1 > start2) or (
-                    start1 == start2 and end1 == end2
-                ):
-                    # Retrieve the event details from the original list
-                    event1 = next(event for event in events1 if event["uid"] == uid1)
-                    event2 = next(event for event in events2 if event["uid"] == uid2)
-                    conflicts.append((event1, event2))
 
-    return conflicts
+def check_conflicts_multi(
+    files: List[str],
+    days: int,
+    use_mmap: bool = False,
+    cache: Optional[EventCache] = None,
+    jobs: int = 1,
+) -> List[Tuple[str, Dict, str, Dict]]:
+    """
+    Check for conflicting events between any two of several ICS files within
+    the next 'days' days. Each file is parsed once.
+
+    Parameters:
+    - files (List[str]): Paths to the ICS files.
+    - days (int): Number of days to look ahead for events.
+    - use_mmap (bool): Read the files through a memory-mapped VEVENT index.
+    - cache (EventCache): Cache of parsed events to skip parsing unchanged files.
+    - jobs (int): Parse the files in this many worker processes.
+
+    Returns:
+    - List[Tuple[str, Dict, str, Dict]]: A list of (file1, event1, file2, event2)
+      tuples, each containing two conflicting events and the files they came from.
+    """
+    return find_conflicts_multi(
+        load_calendars(files, days, use_mmap=use_mmap, cache=cache, jobs=jobs)
+    )
+
+
+def load_calendars(
+    files: List[str],
+    days: int,
+    use_mmap: bool = False,
+    cache: Optional[EventCache] = None,
+    jobs: int = 1,
+    start: Optional[datetime] = None,
+    db: Optional["EventDB"] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Load the events of the next 'days' days, or the 'days' days from `start`,
+    from each ICS file, parsing each file once, keyed by file in the order
+    given. Files the EventDB is indexed for over the window are read from it
+    instead of being parsed. `use_mmap` only applies to files parsed in this
+    process, with `jobs` of 1.
+    """
+    calendars = {}
+    if db is not None:
+        for ics_file in files:
+            events = db.load_events(ics_file, days, start=start)
+            if events is not None:
+                calendars[ics_file] = events
+    pending = [ics_file for ics_file in files if ics_file not in calendars]
+
+    if jobs > 1 and pending:
+        calendars.update(
+            load_events_parallel(pending, days, jobs, cache=cache, start=start)
+        )
+    for ics_file in pending:
+        if ics_file not in calendars:
+            calendars[ics_file] = load_events(
+                ics_file, days, use_mmap=use_mmap, cache=cache, start=start
+            )
+    return {ics_file: calendars[ics_file] for ics_file in files}
@@ -0,0 +1,113 @@
+import csv
+import json
+from typing import Dict, Iterable, TextIO, Tuple
+
+from calendar_sync import timings
+
+FORMATS = ("text", "jsonl", "csv")
+# Columns of the jsonl and csv formats
+FIELDS = (
+    "calendar1",
+    "uid1",
+    "summary1",
+    "start1",
+    "end1",
+    "calendar2",
+    "uid2",
+    "summary2",
+    "start2",
+    "end2",
+)
+# Columns of the csv format of summaries, one row per day
+DAY_FIELDS = ("day", "conflicts", "overlap_minutes")
+
+
+def _time(value) -> str:
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def conflict_row(calendar1: str, event1: Dict, calendar2: str, event2: Dict) -> Dict:
+    """Flatten a conflict into the FIELDS of the jsonl and csv formats."""
+    row = {}
+    for n, calendar, event in ((1, calendar1, event1), (2, calendar2, event2)):
+        row[f"calendar{n}"] = calendar
+        row[f"uid{n}"] = event.get("uid")
+        row[f"summary{n}"] = event["summary"]
+        row[f"start{n}"] = _time(event["start"])
+        row[f"end{n}"] = _time(event["end"])
+    return row
+
+
+def write_conflicts(
+    conflicts: Iterable[Tuple[str, Dict, str, Dict]],
+    stream: TextIO,
+    output_format: str = "text",
+    tagged: bool = False,
+) -> int:
+    """
+    Write conflicts to the stream as they come and return how many there were.
+
+    `text` writes the lines check_conflicts always printed, `tagged` with the
+    names of the calendars when more than two are checked. `jsonl` writes one
+    JSON object per line and `csv` a header and one row per conflict, both
+    with the FIELDS columns.
+    The stream is not flushed per conflict, its buffer decides when output
+    goes out, so the caller should flush it at the end.
+    """
+    count = 0
+    with timings.stage("find_conflicts") as find:
+        if output_format == "csv":
+            writer = csv.DictWriter(stream, FIELDS, lineterminator="\n")
+            writer.writeheader()
+        for calendar1, event1, calendar2, event2 in conflicts:
+            count += 1
+            if output_format == "jsonl":
+                row = conflict_row(calendar1, event1, calendar2, event2)
+                stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+            elif output_format == "csv":
+                writer.writerow(conflict_row(calendar1, event1, calendar2, event2))
+            elif tagged:
+                stream.write(
+                    f"- Conflict: [{calendar1}] {event1['summary']} "
+                    f"vs [{calendar2}] {event2['summary']}\n"
+                )
+            else:
+                stream.write(
+                    f"- Conflict: {event1['summary']} vs {event2['summary']}\n"
+                )
+        find.add(conflicts=count)
+    return count
+
+
+def write_summary(summary: Dict, stream: TextIO, output_format: str = "text") -> None:
+    """
+    Write what `summarize_conflicts` returns to the stream.
+
+    `text` writes the totals followed by the conflicts per pair of calendars
+    and per day, `jsonl` the summary as a single JSON object and `csv` a row
+    per day with the DAY_FIELDS columns.
+    """
+    if output_format == "jsonl":
+        stream.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        return
+    if output_format == "csv":
+        writer = csv.DictWriter(stream, DAY_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(summary["days"])
+        return
+
+    stream.write(
+        f"{summary['conflicts']} conflicts between {summary['events']} events\n"
+    )
+    if summary["overlap_minutes"] is not None:
+        stream.write(f"Double-booked for {summary['overlap_minutes']:g} minutes\n")
+    for pair in summary["calendars"]:
+        stream.write(
+            f"- {pair['calendar1']} vs {pair['calendar2']}: "
+            f"{pair['conflicts']} conflicts\n"
+        )
+    for day in summary["days"]:
+        stream.write(
+            f"- {day['day']}: {day['conflicts']} conflicts, "
+            f"{day['overlap_minutes']:g} minutes double-booked\n"
+        )
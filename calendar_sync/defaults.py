@@ -0,0 +1,14 @@
+# Defaults shared by the CLI and the modules behind its commands, kept here so
+# the CLI can show them without importing those modules
+
+# Pairs of a batch manifest synced at once
+DEFAULT_JOBS = 4
+# Seconds between polls of watched files
+DEFAULT_INTERVAL = 1.0
+# Seconds a changed file must be left alone before it is acted on
+DEFAULT_DEBOUNCE = 0.5
+# Address the server binds
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Days from the start of today (UTC) that the server's indexes hold events for
+DEFAULT_DAYS = 90
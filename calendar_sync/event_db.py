@@ -0,0 +1,252 @@
+import math
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from calendar_sync import timings
+from calendar_sync.cache import EventCache
+from calendar_sync.event_loader import cached_records, load_records, records_to_events
+
+# The R*Tree keeps its coordinates as 32-bit floats, rounded outwards, which
+# near today's epoch times are only accurate to a few hundred seconds. Range
+# queries are widened by this much and then checked against the exact times.
+RTREE_SLACK = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendars (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    first INTEGER NOT NULL,
+    last INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    calendar INTEGER NOT NULL REFERENCES calendars (id),
+    uid TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_uid ON events (uid);
+CREATE INDEX IF NOT EXISTS events_calendar ON events (calendar);
+CREATE VIRTUAL TABLE IF NOT EXISTS event_times USING rtree (
+    id, start, end, calendar_min, calendar_max
+);
+"""
+
+
+def default_db_path(cache_dir: str) -> str:
+    """Return where the event database lives by default, in the cache directory."""
+    return os.path.join(cache_dir, "events.sqlite")
+
+
+def _datetime(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+class EventDB:
+    """
+    SQLite store of the events of ICS files, indexed for range and UID queries.
+
+    Each calendar is indexed for a window of time, with recurring events
+    expanded into their occurrences in it, the same events `load_events`
+    returns for that window. An R*Tree over (start, end) answers which events
+    fall in a range without reading the others, and an index on UID finds an
+    event across calendars. A calendar is only answered for while its file
+    keeps the size and modification time it had when it was indexed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _calendar(self, ics_file: str) -> Optional[Tuple[int, int, int, int, int]]:
+        """Return the id, size, mtime and window of an indexed calendar."""
+        return self.connection.execute(
+            "SELECT id, size, mtime_ns, first, last FROM calendars WHERE path = ?",
+            (os.path.abspath(ics_file),),
+        ).fetchone()
+
+    def index(
+        self,
+        ics_file: str,
+        since: datetime,
+        until: datetime,
+        cache: Optional[EventCache] = None,
+    ) -> int:
+        """
+        Store the events of the ICS file between `since` and `until`, replacing
+        what was indexed for it before, and return how many there are.
+        """
+        with timings.stage("index") as index:
+            records = (
+                cached_records(ics_file, cache)
+                if cache is not None
+                else load_records(ics_file)
+            )
+            events = records_to_events(records, since, until, ics_file)
+            stat = os.stat(ics_file)
+
+            with self.connection:
+                self._delete(ics_file)
+                calendar = self.connection.execute(
+                    "INSERT INTO calendars (path, size, mtime_ns, first, last)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        os.path.abspath(ics_file),
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        int(since.timestamp()),
+                        int(until.timestamp()),
+                    ),
+                ).lastrowid
+                first_id = (
+                    self.connection.execute(
+                        "SELECT COALESCE(MAX(id), 0) FROM events"
+                    ).fetchone()[0]
+                    + 1
+                )
+                rows = [
+                    (
+                        first_id + n,
+                        calendar,
+                        event["uid"],
+                        event["summary"],
+                        int(event["start"].timestamp()),
+                        int(event["end"].timestamp()),
+                    )
+                    for n, event in enumerate(events)
+                ]
+                self.connection.executemany(
+                    "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                self.connection.executemany(
+                    "INSERT INTO event_times VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (row[0], row[4], max(row[4], row[5]), calendar, calendar)
+                        for row in rows
+                    ],
+                )
+            index.add(events=len(rows))
+        return len(rows)
+
+    def _delete(self, ics_file: str):
+        calendar = self._calendar(ics_file)
+        if calendar is None:
+            return
+        self.connection.execute(
+            "DELETE FROM event_times WHERE id IN"
+            " (SELECT id FROM events WHERE calendar = ?)",
+            (calendar[0],),
+        )
+        self.connection.execute("DELETE FROM events WHERE calendar = ?", (calendar[0],))
+        self.connection.execute("DELETE FROM calendars WHERE id = ?", (calendar[0],))
+
+    def covers(self, ics_file: str, start: datetime, end: datetime) -> bool:
+        """
+        Return True if the calendar is indexed for the whole window and its
+        file has not changed since.
+        """
+        calendar = self._calendar(ics_file)
+        if calendar is None:
+            return False
+        _, size, mtime_ns, first, last = calendar
+        try:
+            stat = os.stat(ics_file)
+        except OSError:
+            return False
+        return (
+            stat.st_size == size
+            and stat.st_mtime_ns == mtime_ns
+            and first <= start.timestamp()
+            and end.timestamp() <= last
+        )
+
+    def events_between(
+        self, ics_file: str, start: datetime, end: datetime
+    ) -> List[Dict]:
+        """
+        Return the calendar's indexed events starting between `start` and
+        `end`, as `load_events` returns them, through the R*Tree.
+        """
+        calendar = self._calendar(ics_file)
+        if calendar is None:
+            return []
+        first, last = math.ceil(start.timestamp()), math.floor(end.timestamp())
+        rows = self.connection.execute(
+            "SELECT e.uid, e.summary, e.start, e.end"
+            " FROM event_times t JOIN events e ON e.id = t.id"
+            " WHERE t.start >= ? AND t.start <= ?"
+            " AND t.calendar_min >= ? AND t.calendar_max <= ?"
+            " AND e.start >= ? AND e.start <= ?"
+            " ORDER BY e.id",
+            (
+                first - RTREE_SLACK,
+                last + RTREE_SLACK,
+                calendar[0],
+                calendar[0],
+                first,
+                last,
+            ),
+        )
+        return [
+            {
+                "uid": uid,
+                "summary": summary,
+                "start": _datetime(event_start),
+                "end": _datetime(event_end),
+            }
+            for uid, summary, event_start, event_end in rows
+        ]
+
+    def load_events(
+        self, ics_file: str, days: int, start: Optional[datetime] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Return the events `load_events` would for the window, or None if the
+        calendar is not indexed for it or has changed since it was indexed.
+        """
+        start = start or datetime.now(timezone.utc)
+        end = start + timedelta(days=days)
+        if not self.covers(ics_file, start, end):
+            return None
+        with timings.stage("load_events") as load:
+            events = self.events_between(ics_file, start, end)
+            load.add(events=len(events))
+        return events
+
+    def events_by_uid(self, uid: str) -> List[Tuple[str, Dict]]:
+        """Return the indexed events with the UID as (path, event) pairs."""
+        rows = self.connection.execute(
+            "SELECT c.path, e.uid, e.summary, e.start, e.end"
+            " FROM events e JOIN calendars c ON c.id = e.calendar"
+            " WHERE e.uid = ? ORDER BY e.start, c.path",
+            (uid,),
+        )
+        return [
+            (
+                path,
+                {
+                    "uid": event_uid,
+                    "summary": summary,
+                    "start": _datetime(event_start),
+                    "end": _datetime(event_end),
+                },
+            )
+            for path, event_uid, summary, event_start, event_end in rows
+        ]
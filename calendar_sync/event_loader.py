@@ -1,39 +1,292 @@
-from icalendar import Calendar
 from datetime import datetime, timedelta, timezone
+from calendar_sync import timings
+from calendar_sync.ics_reader import (
+    VEventIndex,
+    block_in_window,
+    iter_vevent_blocks,
+    parse_block,
+)
+from calendar_sync.recurrence import (
+    event_bounds,
+    is_recurring,
+    iter_occurrences,
+    to_utc,
+)
+from calendar_sync.timezones import TimeNormalizer, split_property
 
+# Properties read from the raw lines of one-off events
+_RAW_PROPERTIES = {b"UID", b"SUMMARY", b"DTSTART", b"DTEND", b"RECURRENCE-ID"}
+# Properties that send an event through the full parser
+_PARSED_PROPERTIES = {b"RRULE", b"RDATE", b"DURATION"}
 
-def load_events(ics_file, days):
+
+def _event_record(component, normalizer=None):
     """
-    Load events from the ICS file from today + days ahead.
+    Turn a VEVENT into a (uid, summary, start, end, recurrence_id, master) record.
+
+    Times are UTC epoch seconds. `recurrence_id` is set for events overriding
+    one occurrence of a series, and `master` holds the component itself for
+    recurring events, whose occurrences depend on the window.
     """
-    with open(ics_file, "rb") as f:
-        gcal = Calendar.from_ical(f.read())
+    recurring = is_recurring(component)
+    if normalizer is not None:
+        normalizer.localize(component)
+    start_time, end_time = event_bounds(component)
 
-    # Make 'now' timezone-aware using UTC
-    now = datetime.now(timezone.utc)
-    future_limit = now + timedelta(days=days)
+    recurrence_id = component.get("RECURRENCE-ID")
+    if recurrence_id is not None:
+        recurrence_id = int(to_utc(recurrence_id.dt).timestamp())
+
+    return (
+        str(component.get("UID")),
+        str(component.get("SUMMARY")),
+        int(start_time.timestamp()),
+        int(end_time.timestamp()),
+        recurrence_id,
+        component if recurring else None,
+    )
+
+
+def _records(components, normalizer=None):
+    return [
+        _event_record(component, normalizer)
+        for component in components
+        if component.get("DTSTART") is not None
+    ]
+
+
+def _text(line):
+    """Return the unescaped TEXT value of a raw line, as icalendar reads it."""
+    value = split_property(line)[1].decode("utf-8")
+    if "\\" not in value:
+        return value
+    return (
+        value.replace("\\N", "\\n")
+        .replace("\\n", "\n")
+        .replace("\\,", ",")
+        .replace("\\;", ";")
+        .replace("\\\\", "\\")
+    )
+
+
+def _epoch(line, normalizer):
+    """Return the UTC epoch seconds of a raw DTSTART-style line, or None."""
+    params, value = split_property(line)
+    tzid = params.get(b"TZID")
+    return normalizer.epoch(value.strip(), tzid.decode("utf-8") if tzid else None)
+
+
+def _block_record(block, normalizer):
+    """
+    Build the record of a one-off VEVENT straight from its raw lines, with
+    times normalized to UTC epoch seconds, without parsing it into a component.
+
+    Returns None for events the full parser has to handle: recurring masters,
+    events with a DURATION or without a DTSTART, repeated properties and
+    values in any other form.
+    """
+    lines = {}
+    depth = 0
+    for line in block[1:-1]:
+        if line[:6].upper() == b"BEGIN:":
+            depth += 1
+        elif line[:4].upper() == b"END:":
+            depth -= 1
+        elif depth == 0:
+            name = line.split(b":", 1)[0].split(b";", 1)[0].upper()
+            if name in _PARSED_PROPERTIES:
+                return None
+            if name in _RAW_PROPERTIES:
+                if name in lines:
+                    return None
+                lines[name] = line
+    if b"DTSTART" not in lines:
+        return None
+
+    try:
+        start = _epoch(lines[b"DTSTART"], normalizer)
+        if b"DTEND" in lines:
+            end = _epoch(lines[b"DTEND"], normalizer)
+        elif start is None or b"T" in lines[b"DTSTART"].rsplit(b":", 1)[1]:
+            end = start
+        else:
+            end = start + 86400
+        recurrence_id = None
+        if b"RECURRENCE-ID" in lines:
+            recurrence_id = _epoch(lines[b"RECURRENCE-ID"], normalizer)
+            if recurrence_id is None:
+                return None
+        uid = _text(lines[b"UID"]) if b"UID" in lines else "None"
+        summary = _text(lines[b"SUMMARY"]) if b"SUMMARY" in lines else "None"
+    except (TypeError, UnicodeDecodeError):
+        # split_property found a malformed line
+        return None
+    if start is None or end is None:
+        return None
+    return (uid, summary, start, end, recurrence_id, None)
+
+
+def _iter_records(ics_file, start=None, end=None, byte_range=None):
+    """
+    Yield the records of the events in the ICS file, see `_event_record`.
+
+    One-off events are read from their raw lines through a TimeNormalizer,
+    only recurring and unusual events are parsed into components.
+    """
+    normalizer = TimeNormalizer(ics_file)
+    for block in iter_vevent_blocks(ics_file, byte_range):
+        if start is not None and end is not None:
+            if not block_in_window(block, start, end):
+                continue
+        record = _block_record(block, normalizer)
+        if record is None:
+            component = parse_block(block)
+            if component.get("DTSTART") is None:
+                continue
+            record = _event_record(component, normalizer)
+        yield record
+
+
+def load_records(ics_file, start=None, end=None, byte_range=None):
+    """
+    Parse the events in the ICS file into the records the EventCache stores,
+    see `_event_record`, with recurring masters serialized to bytes.
+
+    A (start, end) window skips events that clearly start outside of it and
+    a `byte_range` limits parsing to part of the file. The records are plain
+    tuples, cheap to pickle, so worker processes can return them.
+    """
+    return _serialized(_iter_records(ics_file, start, end, byte_range))
+
+
+def component_records(components, ics_file=None):
+    """
+    Build the records `load_records` returns from VEVENT components that are
+    already parsed, such as those of a Calendar read for syncing.
+    """
+    return _serialized(_records(components, TimeNormalizer(ics_file)))
+
+
+def _serialized(records):
+    return [
+        record[:5] + (record[5].to_ical() if record[5] is not None else b"",)
+        for record in records
+    ]
+
+
+def _event(uid, summary, start, end):
+    return {
+        "uid": uid,
+        "summary": summary,
+        "start": start,
+        "end": end,
+    }
+
+
+def _window_events(records, now, future_limit):
+    """
+    Return the events starting inside the window, expanding recurring events
+    into their occurrences and dropping occurrences that have been overridden.
+    """
+    first, last = now.timestamp(), future_limit.timestamp()
     events = []
+    occurrences = []
+    overridden = set()
 
-    for component in gcal.walk():
-        if component.name == "VEVENT":
-            start_time = component.get("DTSTART").dt
-            end_time = component.get("DTEND").dt
-
-            # Convert naive datetimes to UTC if necessary
-            if start_time.tzinfo is None:
-                start_time = start_time.replace(tzinfo=timezone.utc)
-            if end_time.tzinfo is None:
-                end_time = end_time.replace(tzinfo=timezone.utc)
-
-            # Now compare both timezone-aware datetimes
-            if now <= start_time <= future_limit:
-                events.append(
-                    {
-                        "uid": str(component.get("UID")),
-                        "summary": str(component.get("SUMMARY")),
-                        "start": start_time,
-                        "end": end_time,
-                    }
+    for uid, summary, start, end, recurrence_id, master in records:
+        if recurrence_id is not None:
+            overridden.add((uid, recurrence_id))
+        if master is not None:
+            for occurrence_start, occurrence_end in iter_occurrences(
+                master, now, future_limit
+            ):
+                occurrences.append(
+                    _event(uid, summary, occurrence_start, occurrence_end)
+                )
+        elif first <= start <= last:
+            events.append(
+                _event(
+                    uid,
+                    summary,
+                    datetime.fromtimestamp(start, timezone.utc),
+                    datetime.fromtimestamp(end, timezone.utc),
                 )
+            )
+
+    events += [
+        event
+        for event in occurrences
+        if (event["uid"], int(event["start"].timestamp())) not in overridden
+    ]
+    return events
+
+
+def records_to_events(records, now, future_limit, ics_file=None):
+    """
+    Build the event dicts for the window from records made by `load_records`.
+
+    Recurring masters are parsed again here, on their own, so a TZID only the
+    file's VTIMEZONEs define is resolved from `ics_file` before they expand.
+    """
+    # Only recurring masters need icalendar, cached one-off events skip loading it
+    if any(record[5] for record in records):
+        from icalendar import Event
+
+        normalizer = TimeNormalizer(ics_file) if ics_file is not None else None
+
+        def from_ical(master):
+            component = Event.from_ical(master)
+            if normalizer is not None:
+                normalizer.localize(component)
+            return component
+
+    records = [
+        record[:5] + (from_ical(record[5]) if record[5] else None,)
+        for record in records
+    ]
+    return _window_events(records, now, future_limit)
+
+
+def cached_records(ics_file, cache):
+    """Return the file's records from the cache, parsing the file on a miss."""
+    records = cache.get(ics_file)
+    if records is None:
+        fingerprint = cache.fingerprint(ics_file)
+        records = load_records(ics_file)
+        cache.put(ics_file, records, fingerprint)
+    return records
+
+
+def load_events(ics_file, days, use_mmap=False, cache=None, start=None):
+    """
+    Load events from the ICS file from today, or `start`, + days ahead.
+
+    Recurring events (RRULE/RDATE, minus EXDATE and RECURRENCE-ID overrides)
+    are expanded into one event per occurrence in the window. Event times are
+    returned in UTC.
+
+    The file is streamed one VEVENT at a time and events that clearly start
+    outside of the window are skipped before they are parsed. With `use_mmap`
+    the file is memory-mapped and indexed instead, and only the events in the
+    window are sliced out of the mapping. With an EventCache, unchanged files
+    are not parsed at all.
+    """
+    # Make 'now' timezone-aware using UTC
+    now = start or datetime.now(timezone.utc)
+    future_limit = now + timedelta(days=days)
 
+    with timings.stage("load_events") as load:
+        if cache is not None:
+            records = cached_records(ics_file, cache)
+            events = records_to_events(records, now, future_limit, ics_file)
+        else:
+            if use_mmap:
+                with VEventIndex(ics_file) as index:
+                    records = _records(
+                        index.in_window(now, future_limit), TimeNormalizer(ics_file)
+                    )
+            else:
+                records = list(_iter_records(ics_file, now, future_limit))
+            events = _window_events(records, now, future_limit)
+        load.add(events=len(events))
     return events
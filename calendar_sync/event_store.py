@@ -0,0 +1,70 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _time_keys(values: List) -> Tuple[array, bool]:
+    """
+    Map event times to integers with the same ordering.
+
+    Aware datetimes, which `load_events` returns, map to epoch microseconds.
+    Anything else, such as naive datetimes or strings, is mapped to its rank
+    among all the values, which keeps comparisons between them intact. The
+    flag tells whether the keys are epoch microseconds.
+    """
+    try:
+        return (
+            array("q", [(value - _EPOCH) // _MICROSECOND for value in values]),
+            True,
+        )
+    except TypeError:
+        ranks = {value: rank for rank, value in enumerate(sorted(set(values)))}
+        return array("q", [ranks[value] for value in values]), False
+
+
+class EventStore:
+    """
+    Columnar store of the events of one or more calendars for the conflict check.
+
+    Start and end times are kept as int64 arrays and UIDs as interned integer
+    ids, so the sweep compares machine integers instead of datetimes and dict
+    values. The original event dicts are kept aside and only looked up for the
+    events that end up in a conflict. `exact` is False when the times could only
+    be ranked, so their differences are not durations.
+    """
+
+    __slots__ = ("starts", "ends", "uids", "calendars", "events", "exact")
+
+    def __init__(self):
+        self.starts = array("q")
+        self.ends = array("q")
+        self.uids = array("q")
+        self.calendars = array("q")
+        self.events: List[Dict] = []
+        self.exact = True
+
+    @classmethod
+    def from_calendars(cls, calendars: List[List[Dict]]) -> "EventStore":
+        """Build a store from lists of events as `load_events` returns them."""
+        store = cls()
+        store.events = [event for events in calendars for event in events]
+        times, store.exact = _time_keys(
+            [event[name] for name in ("start", "end") for event in store.events]
+        )
+        store.starts = times[: len(store.events)]
+        store.ends = times[len(store.events) :]
+
+        uid_ids = {}
+        store.uids = array(
+            "q",
+            [uid_ids.setdefault(event["uid"], len(uid_ids)) for event in store.events],
+        )
+        for index, events in enumerate(calendars):
+            store.calendars += array("q", [index]) * len(events)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.events)
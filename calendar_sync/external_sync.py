@@ -0,0 +1,267 @@
+import heapq
+import os
+import struct
+import tempfile
+import time
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from calendar_sync import timings
+from calendar_sync.event_loader import _text
+from calendar_sync.file_writer import BUFFER_SIZE
+from calendar_sync.ics_reader import _unfold, get_property, iter_raw_vevents
+from calendar_sync.pipeline import Pipeline, prefix_new_events, skip_prefix
+from calendar_sync.sync import handle_event_conflicts
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+# Runs merged at once, more are first merged into longer runs in several passes
+MAX_FAN_IN = 64
+# Rough cost of keeping a record in memory beyond its bytes, tuple and objects
+RECORD_OVERHEAD = 200
+# A record in a run file: number, key length and block length
+RUN_RECORD = struct.Struct("<qII")
+
+# What merge_calendars writes around the events
+HEADER = b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Calendar Sync App//EN\r\n"
+FOOTER = b"END:VCALENDAR\r\n"
+
+# A spilled record: (key, number, raw VEVENT), sorted by key and then number
+Record = Tuple[bytes, int, bytes]
+
+
+def _write_run(records: Iterable[Record], directory: str) -> str:
+    """Write records, already in order, to a new run file and return its path."""
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "wb", buffering=BUFFER_SIZE) as f:
+        for key, number, block in records:
+            f.write(RUN_RECORD.pack(number, len(key), len(block)))
+            f.write(key)
+            f.write(block)
+    return path
+
+
+def _read_run(path: str) -> Iterator[Record]:
+    with open(path, "rb", buffering=BUFFER_SIZE) as f:
+        while True:
+            header = f.read(RUN_RECORD.size)
+            if not header:
+                return
+            number, key_length, block_length = RUN_RECORD.unpack(header)
+            yield f.read(key_length), number, f.read(block_length)
+
+
+class RunSpiller:
+    """
+    Sorts records that may not fit in memory.
+
+    Records are buffered until they take up `budget` bytes, then sorted and
+    spilled to a run file in `directory`. `sorted` merges the runs back in
+    one streaming pass, or in several once there are more than MAX_FAN_IN.
+    Records that never outgrow the budget are sorted in memory.
+    """
+
+    def __init__(self, directory: str, budget: int):
+        self.directory = directory
+        self.budget = budget
+        self.runs: List[str] = []
+        self.spilled = 0
+        self._records: List[Record] = []
+        self._size = 0
+
+    def add(self, key: bytes, number: int, block: bytes):
+        self._records.append((key, number, block))
+        self._size += len(key) + len(block) + RECORD_OVERHEAD
+        if self._size >= self.budget:
+            self._spill()
+
+    def _spill(self):
+        self._records.sort()
+        self.runs.append(_write_run(self._records, self.directory))
+        self.spilled += 1
+        self._records = []
+        self._size = 0
+
+    def sorted(self) -> Iterator[Record]:
+        """Yield every record added, ordered by key and number."""
+        if not self.runs:
+            self._records.sort()
+            yield from self._records
+            return
+        if self._records:
+            self._spill()
+        while len(self.runs) > MAX_FAN_IN:
+            merged = [
+                _write_run(
+                    heapq.merge(*map(_read_run, self.runs[i : i + MAX_FAN_IN])),
+                    self.directory,
+                )
+                for i in range(0, len(self.runs), MAX_FAN_IN)
+            ]
+            for path in self.runs:
+                os.remove(path)
+            self.runs = merged
+        yield from heapq.merge(*map(_read_run, self.runs))
+
+
+def _uid(block: bytes) -> bytes:
+    """Return the UID of a raw VEVENT as `str(event.get("UID"))` would, encoded."""
+    line = get_property(list(_unfold(block.splitlines())), b"UID")
+    if line is None:
+        return b"None"
+    try:
+        return _text(line).encode("utf-8")
+    except (TypeError, UnicodeDecodeError):
+        from icalendar import Event
+
+        return str(Event.from_ical(block).get("UID")).encode("utf-8")
+
+
+def _spill_calendar(ics_file: str, spiller: RunSpiller) -> int:
+    """Spill the VEVENTs of the file keyed by UID and numbered in file order."""
+    count = 0
+    for number, block in enumerate(iter_raw_vevents(ics_file)):
+        spiller.add(_uid(block), number, block)
+        count += 1
+    return count
+
+
+def _by_uid(records: Iterator[Record]) -> Iterator[Record]:
+    """
+    Collapse the records of each UID into one, as a dictionary by UID does:
+    at the position of the first event with the UID, holding the last one.
+    """
+    for uid, group in groupby(records, key=itemgetter(0)):
+        first = last = next(group)
+        for last in group:
+            pass
+        yield uid, first[1], last[2]
+
+
+def external_sync(
+    from_file: str,
+    to_file: str,
+    output: str,
+    add_prefix: Optional[str] = None,
+    filter_prefix: Optional[str] = None,
+    check_conflicts=None,
+    pipeline: Optional[Pipeline] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    temp_dir: Optional[str] = None,
+) -> Dict:
+    """
+    Sync the source calendar into the destination and write the output like
+    `sync_ics_files` and `write_ics_file` do, for calendars too big for memory.
+
+    Both calendars are read one VEVENT at a time and spilled to run files
+    sorted by UID. A streaming merge-join of the two pairs each source event
+    with the destination event of the same UID, if any, and decides which of
+    them ends up in the output. The chosen events are spilled again, sorted by
+    their position in the output, and written out in that order. Events that
+    come through unchanged are copied as raw bytes. Only source events are
+    parsed, and destination events with the same UID, so there is never more
+    than one of each in memory.
+
+    Parameters:
+    - memory_budget (int): Bytes of events to keep in memory, split between
+      the sorts. Each sort spills to disk when it holds more.
+    - temp_dir (str): Where to put the run files, the system default if None.
+
+    Returns:
+    - Dict: The number of `events` written and of `runs` spilled to disk.
+    """
+    if pipeline is None:
+        pipeline = Pipeline()
+    stages = list(pipeline.stages)
+    if filter_prefix:
+        stages.insert(0, skip_prefix(filter_prefix))
+    # Set to the UID of the source event being merged when the destination has it
+    in_destination = set()
+    if add_prefix:
+        stages.append(prefix_new_events(add_prefix, in_destination))
+
+    with tempfile.TemporaryDirectory(prefix="calendar_sync-", dir=temp_dir) as runs:
+        destination = RunSpiller(runs, memory_budget // 4)
+        source = RunSpiller(runs, memory_budget // 4)
+        merged = RunSpiller(runs, memory_budget // 2)
+
+        with timings.stage("spill") as spill:
+            destination_count = _spill_calendar(to_file, destination)
+            source_count = _spill_calendar(from_file, source)
+            spill.add(events=destination_count + source_count)
+
+        # Events are streamed, so the checks are added up and recorded once
+        checks = {"events": 0, "seconds": 0.0}
+
+        def merge_event(uid, number, block, existing):
+            """Spill the event the output gets for a source event's UID."""
+            if not stages and existing is None:
+                merged.add(b"", destination_count + number, block)
+                return
+            from icalendar import Event
+
+            event = Event.from_ical(block)
+            in_destination.clear()
+            if existing is not None:
+                in_destination.add(uid.decode("utf-8"))
+            result = next(pipeline.run([(uid.decode("utf-8"), event)], stages), None)
+            if result is not None and existing is not None:
+                existing_event = Event.from_ical(existing[2])
+                began = time.perf_counter()
+                skip = handle_event_conflicts(
+                    result[1], existing_event, check_conflicts
+                )
+                checks["seconds"] += time.perf_counter() - began
+                checks["events"] += 1
+                if skip:
+                    result = None
+            if result is None:
+                if existing is not None:
+                    merged.add(b"", existing[1], existing[2])
+                return
+            if result[1] is not event:
+                block = result[1].to_ical()
+            # Replaced and new events follow the destination's, in source order
+            merged.add(b"", destination_count + number, block)
+
+        with timings.stage("merge") as merge:
+            destination_events = _by_uid(destination.sorted())
+            source_events = _by_uid(source.sorted())
+            existing = next(destination_events, None)
+            for uid, number, block in source_events:
+                while existing is not None and existing[0] < uid:
+                    merged.add(b"", existing[1], existing[2])
+                    existing = next(destination_events, None)
+                if existing is not None and existing[0] == uid:
+                    merge_event(uid, number, block, existing)
+                    existing = next(destination_events, None)
+                else:
+                    merge_event(uid, number, block, None)
+            while existing is not None:
+                merged.add(b"", existing[1], existing[2])
+                existing = next(destination_events, None)
+            merge.add(events=destination_count + source_count)
+        if checks["events"]:
+            timings.stage("handle_event_conflicts").add(calls=1, **checks)
+
+        count = 0
+        temp_path = f"{output}.{os.getpid()}.tmp"
+        try:
+            with timings.stage("write") as write:
+                with open(temp_path, "wb", buffering=BUFFER_SIZE) as f:
+                    f.write(HEADER)
+                    for _, _, block in merged.sorted():
+                        f.write(block)
+                        count += 1
+                    f.write(FOOTER)
+                os.replace(temp_path, output)
+                write.add(components=count)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return {
+        "events": count,
+        "runs": destination.spilled + source.spilled + merged.spilled,
+    }
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, List
+from urllib.parse import urljoin, urlsplit
+
+if TYPE_CHECKING:
+    import http.client
+
+DEFAULT_TIMEOUT = 30
+# Upper bound on concurrent requests, and on idle connections kept per host
+MAX_CONNECTIONS = 8
+MAX_REDIRECTS = 5
+USER_AGENT = "calendar_sync"
+
+
+class FeedError(Exception):
+    """Raised when an ICS feed cannot be downloaded."""
+
+
+def is_url(source: str) -> bool:
+    """Return True if the source is an http(s) URL rather than a local path."""
+    return urlsplit(source).scheme in ("http", "https")
+
+
+class FeedFetcher:
+    """
+    Downloads ICS feeds into a local directory, one file per URL.
+
+    Every download stores the response's ETag and Last-Modified, which are sent
+    back as If-None-Match and If-Modified-Since on the next fetch. A feed that
+    did not change costs a 304 and leaves its file untouched, so the EventCache
+    keeps serving the events parsed from it. Connections are kept alive and
+    reused across requests to the same host.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_connections: int = MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.directory = directory
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle: Dict[tuple, List["http.client.HTTPConnection"]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = None
+
+    def path(self, url: str) -> str:
+        """Return the local file the feed at `url` is downloaded to."""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.ics")
+
+    def _metadata_path(self, url: str) -> str:
+        return self.path(url)[: -len(".ics")] + ".json"
+
+    def _load_metadata(self, url: str) -> Dict:
+        try:
+            with open(self._metadata_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _connect(self, scheme: str, netloc: str) -> "http.client.HTTPConnection":
+        # asyncio, http.client and ssl are only imported once a feed is fetched
+        import http.client
+        import ssl
+
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return http.client.HTTPSConnection(
+                netloc, timeout=self.timeout, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release(self, scheme: str, netloc: str, connection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_connections:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _get(self, url: str, headers: Dict[str, str]):
+        """Send a GET over a pooled connection and return (status, headers, body)."""
+        import http.client
+
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+
+        # A pooled connection may have been closed by the server in the meantime,
+        # so a failure on a reused connection is retried once on a fresh one.
+        for attempt in range(2):
+            connection = self._connect(parts.scheme, parts.netloc)
+            reused = connection.sock is not None
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise FeedError(f"Could not fetch {url}: {e}") from e
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(parts.scheme, parts.netloc, connection)
+            return response.status, response.headers, body
+
+    def fetch(self, url: str) -> str:
+        """
+        Download the feed unless it is unchanged since the last fetch.
+
+        Returns:
+        - str: Path of the local copy of the feed.
+        """
+        path = self.path(url)
+        metadata = self._load_metadata(url) if os.path.exists(path) else {}
+        headers = {"User-Agent": USER_AGENT}
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+        location = url
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._get(location, headers)
+            if status in (301, 302, 303, 307, 308) and "Location" in response_headers:
+                location = urljoin(location, response_headers["Location"])
+                continue
+            break
+
+        if status == 304 and metadata:
+            return path
+        if status != 200:
+            raise FeedError(f"Could not fetch {url}: HTTP {status}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, path)
+
+        metadata = {
+            "url": url,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+        }
+        temp_path = f"{self._metadata_path(url)}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(metadata))
+        os.replace(temp_path, self._metadata_path(url))
+        return path
+
+    async def fetch_all(self, urls: List[str]) -> Dict[str, str]:
+        """
+        Fetch the feeds concurrently, at most `max_connections` at a time.
+
+        Returns:
+        - Dict[str, str]: The local path of each URL.
+        """
+        import asyncio
+
+        limit = asyncio.Semaphore(self.max_connections)
+
+        async def fetch(url):
+            async with limit:
+                return await asyncio.to_thread(self.fetch, url)
+
+        urls = list(dict.fromkeys(urls))
+        paths = await asyncio.gather(*(fetch(url) for url in urls))
+        return dict(zip(urls, paths))
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            for idle in self._idle.values():
+                for connection in idle:
+                    connection.close()
+            self._idle.clear()
+
+
+def resolve_sources(sources: List[str], directory: str) -> List[str]:
+    """
+    Return a local path for each source, downloading the URLs among them
+    concurrently into `directory`. Local paths are returned unchanged.
+    """
+    urls = [source for source in sources if is_url(source)]
+    if not urls:
+        return list(sources)
+
+    import asyncio
+
+    fetcher = FeedFetcher(directory)
+    try:
+        paths = asyncio.run(fetcher.fetch_all(urls))
+    finally:
+        fetcher.close()
+    return [paths.get(source, source) for source in sources]
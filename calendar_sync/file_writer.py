@@ -1,4 +1,44 @@
+import os
+from typing import Iterator
+
+from calendar_sync import timings
+
+# Size of the write buffer, components are small so they are batched up to this
+BUFFER_SIZE = 1024 * 1024
+
+
+def iter_ical(calendar) -> Iterator[bytes]:
+    """
+    Serialize the calendar one component at a time.
+
+    The joined chunks are the same bytes `calendar.to_ical()` returns, but only
+    one subcomponent is held in serialized form at a time.
+    """
+    items = calendar.property_items(recursive=False)
+    # The last item closes the calendar, it is written after the subcomponents
+    for name, value in items[:-1]:
+        yield calendar.content_line(name, value).to_ical() + b"\r\n"
+    for component in calendar.subcomponents:
+        yield component.to_ical()
+    yield calendar.content_line(*items[-1]).to_ical() + b"\r\n"
+
+
 def write_ics_file(calendar, output_file_path):
-    """Writes the calendar to the specified output file."""
-    with open(output_file_path, "wb") as f:
-        f.write(calendar.to_ical())
+    """
+    Writes the calendar to the specified output file.
+
+    The calendar is streamed to a temporary file next to the output, which then
+    replaces the output in one step, so readers never see a partial calendar.
+    """
+    temp_path = f"{output_file_path}.{os.getpid()}.tmp"
+    try:
+        with timings.stage("write") as write:
+            with open(temp_path, "wb", buffering=BUFFER_SIZE) as f:
+                for chunk in iter_ical(calendar):
+                    f.write(chunk)
+            os.replace(temp_path, output_file_path)
+            write.add(components=len(calendar.subcomponents))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
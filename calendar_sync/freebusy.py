@@ -0,0 +1,185 @@
+import heapq
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from calendar_sync import timings
+
+if TYPE_CHECKING:
+    from icalendar import Calendar
+
+    from calendar_sync.cache import EventCache
+
+
+def _epoch(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def _datetime(value: int) -> datetime:
+    return datetime.fromtimestamp(value, timezone.utc)
+
+
+class BusyIndex:
+    """
+    Busy time of a calendar as sorted, disjoint [start, end) intervals.
+
+    Overlapping and back-to-back events are merged into one run, so the index
+    is run-length encoded at one-second granularity and holds at most one
+    interval per event. Point and range queries are a binary search over the
+    interval starts. Times are UTC epoch seconds.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        self.starts = array("q")
+        self.ends = array("q")
+        # Merge the intervals, which must be sorted by start, into runs
+        for start, end in intervals:
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+
+    @classmethod
+    def from_events(cls, events: List[Dict]) -> "BusyIndex":
+        """Build the index from events as `load_events` returns them."""
+        return cls(
+            sorted((_epoch(event["start"]), _epoch(event["end"])) for event in events)
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, BusyIndex)
+            and self.starts == other.starts
+            and self.ends == other.ends
+        )
+
+    def is_busy(self, at: int) -> bool:
+        """Return True if `at` falls inside a busy interval."""
+        i = bisect_right(self.starts, at) - 1
+        return i >= 0 and at < self.ends[i]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Return True if any busy time falls between `start` and `end`."""
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and start < self.ends[i]:
+            return True
+        return i + 1 < len(self.starts) and self.starts[i + 1] < end
+
+    def between(self, start: int, end: int) -> "BusyIndex":
+        """Return the busy time between `start` and `end`, clipped to them."""
+        first = max(bisect_right(self.starts, start) - 1, 0)
+        last = bisect_right(self.starts, end)
+        return BusyIndex(
+            (max(s, start), min(e, end))
+            for s, e in zip(self.starts[first:last], self.ends[first:last])
+        )
+
+    def free(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Return the free intervals between `start` and `end`."""
+        free = []
+        for busy_start, busy_end in self.between(start, end):
+            if busy_start > start:
+                free.append((start, busy_start))
+            start = busy_end
+        if start < end:
+            free.append((start, end))
+        return free
+
+
+def load_busy(
+    ics_file: str,
+    start: datetime,
+    end: datetime,
+    cache: Optional["EventCache"] = None,
+) -> BusyIndex:
+    """
+    Return the busy time of the ICS file between `start` and `end`.
+
+    Events that started before `start` and are still running count too, so
+    events are expanded from `start` less the longest event in the file.
+    """
+    from calendar_sync.event_loader import (
+        cached_records,
+        load_records,
+        records_to_events,
+    )
+
+    with timings.stage("load_events") as load:
+        if cache is not None:
+            records = cached_records(ics_file, cache)
+        else:
+            records = load_records(ics_file)
+        longest = max((record[3] - record[2] for record in records), default=0)
+        events = records_to_events(
+            records, start - timedelta(seconds=max(longest, 0)), end, ics_file
+        )
+        load.add(events=len(events))
+    return BusyIndex.from_events(events).between(_epoch(start), _epoch(end))
+
+
+def union(indexes: List[BusyIndex]) -> BusyIndex:
+    """Return the time when any of the calendars is busy."""
+    return BusyIndex(heapq.merge(*indexes))
+
+
+def intersection(indexes: List[BusyIndex]) -> BusyIndex:
+    """Return the time when all of the calendars are busy."""
+    if not indexes:
+        return BusyIndex()
+
+    result = list(indexes[0])
+    for index in indexes[1:]:
+        other = list(index)
+        both = []
+        i = j = 0
+        # Walk both sorted interval lists, keeping the parts they share
+        while i < len(result) and j < len(other):
+            start = max(result[i][0], other[j][0])
+            end = min(result[i][1], other[j][1])
+            if start < end:
+                both.append((start, end))
+            if result[i][1] < other[j][1]:
+                i += 1
+            else:
+                j += 1
+        result = both
+    return BusyIndex(result)
+
+
+def to_vfreebusy(index: BusyIndex, start: datetime, end: datetime) -> "Calendar":
+    """
+    Return a calendar with a VFREEBUSY component listing the busy time of the
+    index between `start` and `end`.
+    """
+    from icalendar import Calendar, FreeBusy
+
+    component = FreeBusy()
+    component.add("dtstamp", datetime.now(timezone.utc))
+    component.add("dtstart", start)
+    component.add("dtend", end)
+    for busy_start, busy_end in index.between(_epoch(start), _epoch(end)):
+        component.add(
+            "freebusy",
+            (_datetime(busy_start), _datetime(busy_end)),
+            parameters={"FBTYPE": "BUSY"},
+        )
+
+    calendar = Calendar()
+    calendar.add("prodid", "-//Calendar Sync App//EN")
+    calendar.add("version", "2.0")
+    calendar.add("method", "PUBLISH")
+    calendar.add_component(component)
+    return calendar
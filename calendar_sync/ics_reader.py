@@ -0,0 +1,319 @@
+import hashlib
+import io
+import mmap
+import os
+import re
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from icalendar import Event
+
+# Largest UTC offset a TZID can shift a local DTSTART by. Used as slack when
+# deciding from the raw DTSTART line whether an event can be in the window.
+MAX_UTC_OFFSET = timedelta(days=1)
+
+# Properties that make an event apply outside of its own DTSTART
+RECURRENCE_PROPERTIES = (b"RRULE", b"RDATE", b"RECURRENCE-ID")
+
+
+def _unfold(lines) -> Iterator[bytes]:
+    """Yield logical content lines, joining folded continuation lines."""
+    parts = []
+    for raw in lines:
+        line = raw.rstrip(b"\r\n")
+        if line[:1] in (b" ", b"\t"):
+            if parts:
+                parts.append(line[1:])
+            continue
+        if parts:
+            yield b"".join(parts)
+        parts = [line]
+    if parts:
+        yield b"".join(parts)
+
+
+def iter_vevent_blocks(
+    ics_file: str, byte_range: Optional[Tuple[int, int]] = None
+) -> Iterator[List[bytes]]:
+    """
+    Yield the unfolded content lines of each VEVENT in the ICS file.
+
+    The file is read line by line, so only one event is held in memory at a
+    time. Nested components such as VALARM are kept inside their VEVENT.
+    With a (start, end) `byte_range` only that part of the file is read, it
+    should begin at a BEGIN:VEVENT line.
+    """
+    with open(ics_file, "rb") as f:
+        if byte_range is None:
+            lines = f
+        else:
+            f.seek(byte_range[0])
+            lines = io.BytesIO(f.read(byte_range[1] - byte_range[0]))
+
+        block = None
+        for line in _unfold(lines):
+            if block is None:
+                if line.upper() == b"BEGIN:VEVENT":
+                    block = [line]
+                continue
+            block.append(line)
+            if line.upper() == b"END:VEVENT":
+                yield block
+                block = None
+
+
+def iter_raw_vevents(ics_file: str) -> Iterator[bytes]:
+    """
+    Yield each VEVENT in the ICS file as the raw bytes it was written with,
+    folded lines and all, reading the file line by line.
+    """
+    with open(ics_file, "rb") as f:
+        lines = None
+        for line in f:
+            if lines is None:
+                if line.rstrip(b"\r\n").upper() == b"BEGIN:VEVENT":
+                    lines = [line]
+                continue
+            lines.append(line)
+            if line.rstrip(b"\r\n").upper() == b"END:VEVENT":
+                if not line.endswith(b"\n"):
+                    lines.append(b"\r\n")
+                yield b"".join(lines)
+                lines = None
+
+
+def get_property(block: List[bytes], name: bytes) -> Optional[bytes]:
+    """Return the raw content line of the first top-level property `name`."""
+    name = name.upper()
+    depth = 0
+    for line in block[1:-1]:
+        if line[:6].upper() == b"BEGIN:":
+            depth += 1
+        elif line[:4].upper() == b"END:":
+            depth -= 1
+        elif depth == 0:
+            prefix = line[: len(name) + 1].upper()
+            if prefix == name + b":" or prefix == name + b";":
+                return line
+    return None
+
+
+def parse_dtstart(line: bytes):
+    """
+    Parse a raw DTSTART line into a UTC datetime, without building a component.
+
+    Times with a TZID are read as if they were UTC, so callers must allow for
+    MAX_UTC_OFFSET. Returns None if the value is not in a basic date or
+    date-time form.
+    """
+    value = line.rsplit(b":", 1)[-1].strip()
+    try:
+        if len(value) == 8:
+            return datetime(
+                int(value[0:4]), int(value[4:6]), int(value[6:8]), tzinfo=timezone.utc
+            )
+        if value[8:9] == b"T":
+            return datetime(
+                int(value[0:4]),
+                int(value[4:6]),
+                int(value[6:8]),
+                int(value[9:11]),
+                int(value[11:13]),
+                int(value[13:15]),
+                tzinfo=timezone.utc,
+            )
+    except ValueError:
+        pass
+    return None
+
+
+def block_in_window(block: List[bytes], start: datetime, end: datetime) -> bool:
+    """
+    Cheaply decide whether an event may start between `start` and `end`.
+
+    Errs on the side of True, the exact check is left to the caller once the
+    component has been parsed.
+    """
+    for name in RECURRENCE_PROPERTIES:
+        # Recurring events and their overrides can apply inside the window
+        # whatever their DTSTART, the caller expands them
+        if get_property(block, name) is not None:
+            return True
+    line = get_property(block, b"DTSTART")
+    if line is None:
+        return True
+    dtstart = parse_dtstart(line)
+    if dtstart is None:
+        return True
+    return start - MAX_UTC_OFFSET <= dtstart <= end + MAX_UTC_OFFSET
+
+
+def parse_block(block: List[bytes]) -> "Event":
+    """Build the icalendar component for a single VEVENT block."""
+    from icalendar import Event
+
+    return Event.from_ical(b"\r\n".join(block) + b"\r\n")
+
+
+def iter_events(
+    ics_file: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator["Event"]:
+    """
+    Yield VEVENT components from the ICS file one at a time.
+
+    If a window is given, events whose DTSTART is clearly outside of it are
+    skipped before their component is built.
+    """
+    for block in iter_vevent_blocks(ics_file, byte_range):
+        if start is not None and end is not None:
+            if not block_in_window(block, start, end):
+                continue
+        yield parse_block(block)
+
+
+_FOLD = re.compile(rb"\r?\n[ \t]")
+
+
+# Index pattern groups, read back through `match.lastindex`
+_BEGIN, _END, _UID, _DTSTART, _RECURRENCE, _FIELD = range(1, 7)
+
+
+@lru_cache(maxsize=None)
+def _index_pattern(fields: Tuple[bytes, ...] = ()) -> re.Pattern:
+    """
+    Build the regex matching the lines the index needs, anchored at the start
+    of a line and including any folded continuation lines.
+    """
+    names = b"|".join(re.escape(field) for field in fields) or b"(?!)"
+    return re.compile(
+        rb"^(?:(BEGIN:VEVENT)|(END:VEVENT)|(UID)[;:]|(DTSTART)[;:]|(%s)[;:]|(%s)[;:])"
+        rb"[^\r\n]*(?:\r?\n[ \t][^\r\n]*)*" % (b"|".join(RECURRENCE_PROPERTIES), names),
+        re.MULTILINE | re.IGNORECASE,
+    )
+
+
+def _unfold_line(line: bytes) -> bytes:
+    return _FOLD.sub(b"", line) if b"\n" in line else line
+
+
+class VEventIndex(Mapping):
+    """
+    Memory-mapped ICS file with an index of its VEVENT blocks.
+
+    A single regex pass over the mapping records the byte range, UID and raw
+    DTSTART line of every VEVENT. Blocks are only sliced out of the mapping,
+    and parsed, when they are asked for. The index maps UIDs to parsed events,
+    so it can be used wherever a dictionary of events by UID is expected.
+    """
+
+    def __init__(self, ics_file: str, fingerprint_fields: Sequence[bytes] = ()):
+        self.ics_file = ics_file
+        self.entries = []  # (start offset, end offset, uid, raw DTSTART line)
+        # UID -> digest of the `fingerprint_fields` lines, if any were given
+        self.fingerprints = {}
+        # Positions of events with RRULE, RDATE or RECURRENCE-ID
+        self.recurring = set()
+        self._by_uid = {}
+        self._parsed = {}
+        self._mmap = None
+
+        with open(ics_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        fields = tuple(field.upper() for field in fingerprint_fields)
+        hash_dtstart = b"DTSTART" in fields
+        start = uid = dtstart = parts = None
+        for match in _index_pattern(fields).finditer(self._mmap):
+            kind = match.lastindex
+            if kind == _BEGIN:
+                start, uid, dtstart, parts = match.start(), None, None, []
+            elif start is None:
+                continue
+            elif kind == _END:
+                uid = str(uid)  # Matches str(event.get("UID")) for missing UIDs
+                self._by_uid[uid] = len(self.entries)
+                self.entries.append((start, match.end(), uid, dtstart))
+                if fields:
+                    digest = hashlib.blake2b(b"\n".join(parts), digest_size=16)
+                    self.fingerprints[uid] = digest.hexdigest()
+                start = None
+            elif kind == _UID:
+                if uid is None:
+                    line = _unfold_line(match.group(0))
+                    uid = line.split(b":", 1)[1].strip().decode()
+            elif kind == _DTSTART:
+                if dtstart is None:
+                    dtstart = _unfold_line(match.group(0))
+                if hash_dtstart:
+                    parts.append(_unfold_line(match.group(0)))
+            elif kind == _RECURRENCE:
+                self.recurring.add(len(self.entries))
+            else:
+                parts.append(_unfold_line(match.group(0)))
+
+    def dtstart(self, position: int) -> Optional[datetime]:
+        """Return the DTSTART of the event at `position`, see `parse_dtstart`."""
+        line = self.entries[position][3]
+        return None if line is None else parse_dtstart(line)
+
+    def block(self, position: int) -> memoryview:
+        """Return a zero-copy view of the raw VEVENT block at `position`."""
+        start, end, _, _ = self.entries[position]
+        return memoryview(self._mmap)[start:end]
+
+    def event(self, position: int) -> "Event":
+        """Parse the VEVENT at `position` into an icalendar component."""
+        if position not in self._parsed:
+            from icalendar import Event
+
+            self._parsed[position] = Event.from_ical(bytes(self.block(position)))
+        return self._parsed[position]
+
+    def in_window(self, start: datetime, end: datetime) -> Iterator["Event"]:
+        """Yield the events that may start between `start` and `end`."""
+        for position in range(len(self.entries)):
+            dtstart = self.dtstart(position)
+            if (
+                position in self.recurring
+                or dtstart is None
+                or (start - MAX_UTC_OFFSET <= dtstart <= end + MAX_UTC_OFFSET)
+            ):
+                yield self.event(position)
+
+    def __getitem__(self, uid: str) -> "Event":
+        return self.event(self._by_uid[uid])
+
+    def __iter__(self):
+        return iter(self._by_uid)
+
+    def __len__(self):
+        return len(self._by_uid)
+
+    def __contains__(self, uid):
+        return uid in self._by_uid
+
+    def walk(self, name: str = "VEVENT") -> List["Event"]:
+        """Return all events, mirroring `Calendar.walk("VEVENT")`."""
+        if name.upper() != "VEVENT":
+            return []
+        return [self.event(position) for position in range(len(self.entries))]
+
+    def close(self):
+        if self._mmap is not None:
+            self._parsed.clear()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,242 @@
+import json
+import mmap
+import os
+from typing import Dict, List, Optional
+
+from calendar_sync.file_writer import write_ics_file
+from calendar_sync.ics_reader import VEventIndex
+from calendar_sync.pipeline import _summary
+from calendar_sync.sync import handle_event_conflicts, sync_ics_files
+
+STATE_VERSION = 2
+
+# Properties that decide whether an event has changed since the last sync.
+# DTSTAMP is left out on purpose, most exports rewrite it on every run.
+FINGERPRINT_FIELDS = (b"DTSTART", b"DTEND", b"SUMMARY", b"STATUS", b"SEQUENCE")
+
+
+def _stamp(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_state(state_file: str) -> Optional[Dict]:
+    """Read the sync state file, returning None if it is missing or outdated."""
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(state_file: str, state: Dict):
+    """Write the sync state file atomically."""
+    temp_path = f"{state_file}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        # json.dumps uses the C encoder, json.dump streams through Python
+        f.write(json.dumps(state))
+    os.replace(temp_path, state_file)
+
+
+def merge_event(uid, source, destination, add_prefix, filter_prefix, check_conflicts):
+    """
+    Return the event `sync_ics_files` would write for `uid`,
+    or None if the UID should not be in the output at all.
+    """
+    event = source[uid] if uid in source else None
+    existing_event = destination[uid] if uid in destination else None
+
+    if event is not None and filter_prefix:
+        if str(event.get("SUMMARY")).startswith(filter_prefix):
+            event = None
+
+    if event is None:
+        return existing_event
+
+    if existing_event is not None:
+        if handle_event_conflicts(event, existing_event, check_conflicts):
+            return existing_event
+        return event
+
+    summary = _summary(event)
+    if add_prefix and not summary.startswith(add_prefix):
+        event["SUMMARY"] = f"{add_prefix}{summary}"
+    return event
+
+
+def _index(ics_file: str, previous: Optional[Dict]) -> VEventIndex:
+    """
+    Index the ICS file, reusing the fingerprints from the previous run when
+    the file has not been touched since.
+    """
+    if previous is not None and previous["stamp"] == _stamp(ics_file):
+        index = VEventIndex(ics_file)
+        index.fingerprints = previous["events"]
+        return index
+    return VEventIndex(ics_file, FINGERPRINT_FIELDS)
+
+
+def _changed_uids(old: Dict[str, str], new: Dict[str, str]) -> set:
+    """Return the UIDs that were added, removed or changed between two runs."""
+    changed = {uid for uid, fingerprint in new.items() if old.get(uid) != fingerprint}
+    changed.update(uid for uid in old if uid not in new)
+    return changed
+
+
+def incremental_sync(
+    from_file,
+    to_file,
+    output,
+    state_file,
+    add_prefix=None,
+    filter_prefix=None,
+    check_conflicts=None,
+) -> Dict:
+    """
+    Sync events from the source calendar to the destination calendar, only
+    processing the events that changed since the previous run.
+
+    The state file keeps a fingerprint of every source and destination event
+    from the last run. Events whose fingerprints are unchanged are copied as
+    raw bytes from the previous output, only added, changed or removed events
+    are parsed and re-serialized. Falls back to a full sync when there is no
+    usable state, the options changed or the output was modified elsewhere.
+
+    Returns:
+    - Dict: Counts of the sync, with "full" set if everything was rebuilt.
+    """
+    options = [add_prefix, filter_prefix, bool(check_conflicts)]
+    state = load_state(state_file)
+
+    reusable = (
+        state is not None
+        and state["options"] == options
+        and state["output"]["path"] == os.path.abspath(output)
+        and os.path.exists(output)
+        and state["output"]["stamp"] == _stamp(output)
+    )
+    if (
+        reusable
+        and state["source"]["stamp"] == _stamp(from_file)
+        and state["destination"]["stamp"] == _stamp(to_file)
+    ):
+        return {"full": False, "changed": 0}
+
+    source = _index(from_file, state["source"] if reusable else None)
+    destination = _index(to_file, state["destination"] if reusable else None)
+
+    if reusable:
+        changed = _changed_uids(state["source"]["events"], source.fingerprints)
+        changed |= _changed_uids(
+            state["destination"]["events"], destination.fingerprints
+        )
+        merged = {
+            uid: merge_event(
+                uid, source, destination, add_prefix, filter_prefix, check_conflicts
+            )
+            for uid in changed
+        }
+        layout = _patch_output(output, state["output"]["layout"], merged)
+        result = {"full": False, "changed": len(changed)}
+    else:
+        new_cal = sync_ics_files(
+            from_file,
+            to_file,
+            add_prefix=add_prefix,
+            filter_prefix=filter_prefix,
+            check_conflicts=check_conflicts,
+        )
+        write_ics_file(new_cal, output)
+        layout = _layout(output)
+        result = {"full": True, "changed": len(new_cal.subcomponents)}
+
+    save_state(
+        state_file,
+        {
+            "version": STATE_VERSION,
+            "options": options,
+            "source": {"stamp": _stamp(from_file), "events": source.fingerprints},
+            "destination": {
+                "stamp": _stamp(to_file),
+                "events": destination.fingerprints,
+            },
+            "output": {
+                "path": os.path.abspath(output),
+                "stamp": _stamp(output),
+                "layout": layout,
+            },
+        },
+    )
+    source.close()
+    destination.close()
+    return result
+
+
+def _layout(output: str) -> List[list]:
+    """
+    Return the [uid, start, end] byte range of every event in a written output,
+    including the CRLF that `to_ical` ends each component with.
+    """
+    with VEventIndex(output) as index:
+        return [[uid, start, end + 2] for start, end, uid, _ in index.entries]
+
+
+def _patch_output(output: str, layout: List[list], merged: Dict) -> List[list]:
+    """
+    Rewrite the previous output, replacing only the events in `merged`.
+
+    Runs of unchanged events are copied from the old file in one write each.
+    Changed events keep their position in the output, new ones are appended
+    and events merged to None are dropped. Returns the new layout.
+    """
+    merged = dict(merged)
+    new_layout = []
+    temp_path = f"{output}.tmp"
+
+    with open(output, "rb") as old, open(temp_path, "wb") as f:
+        data = mmap.mmap(old.fileno(), 0, access=mmap.ACCESS_READ)
+        if layout:
+            header_end, footer_start = layout[0][1], layout[-1][2]
+        else:
+            header_end = footer_start = data.rfind(b"END:VCALENDAR")
+
+        f.write(data[:header_end])
+        position = header_end
+        run_start = None
+
+        for uid, start, end in layout:
+            if uid not in merged:
+                if run_start is None:
+                    run_start = start
+                new_layout.append([uid, position, position + end - start])
+                position += end - start
+                continue
+
+            if run_start is not None:
+                f.write(data[run_start:start])
+                run_start = None
+            event = merged.pop(uid)
+            if event is not None:
+                block = event.to_ical()
+                f.write(block)
+                new_layout.append([uid, position, position + len(block)])
+                position += len(block)
+
+        if run_start is not None:
+            f.write(data[run_start:footer_start])
+
+        for uid, event in merged.items():
+            if event is not None:
+                block = event.to_ical()
+                f.write(block)
+                new_layout.append([uid, position, position + len(block)])
+                position += len(block)
+
+        f.write(data[footer_start:])
+        data.close()
+
+    os.replace(temp_path, output)
+    return new_layout
@@ -0,0 +1,120 @@
+import mmap
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from calendar_sync.cache import EventCache
+from calendar_sync.event_loader import load_records, records_to_events
+
+# Files are only split into chunks this large or larger, below that the cost
+# of starting a worker outweighs parsing the chunk in place
+MIN_CHUNK_BYTES = 1024 * 1024
+
+
+def split_ics_file(ics_file: str, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split an ICS file into up to `chunks` byte ranges of about the same size.
+    Every range but the first starts at a BEGIN:VEVENT line, so each event
+    falls in exactly one range.
+    """
+    size = os.path.getsize(ics_file)
+    if chunks <= 1 or size == 0:
+        return [(0, size)]
+
+    offsets = [0]
+    with open(ics_file, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for i in range(1, chunks):
+            position = data.find(
+                b"\nBEGIN:VEVENT", max(size * i // chunks, offsets[-1])
+            )
+            if position == -1:
+                break
+            offsets.append(position + 1)
+        data.close()
+    offsets.append(size)
+
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+
+
+def _tasks(files: List[str], jobs: int) -> List[Tuple[str, Tuple[int, int]]]:
+    """Return the (file, byte range) chunks to parse for the files."""
+    tasks = []
+    for ics_file in files:
+        chunks = min(jobs, os.path.getsize(ics_file) // MIN_CHUNK_BYTES)
+        tasks += [
+            (ics_file, byte_range) for byte_range in split_ics_file(ics_file, chunks)
+        ]
+    return tasks
+
+
+def load_events_parallel(
+    files: List[str],
+    days: int,
+    jobs: int,
+    cache: Optional[EventCache] = None,
+    start: Optional[datetime] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Load events from several ICS files from today, or `start`, + days ahead,
+    parsing them in up to `jobs` worker processes.
+
+    Large files are split at VEVENT boundaries so a single big calendar is
+    spread over the workers too. Workers return compact records rather than
+    parsed components, which are far cheaper to send back to this process.
+    Files found in the EventCache are not parsed at all.
+
+    Parameters:
+    - files (List[str]): Paths to the ICS files.
+    - days (int): Number of days to look ahead for events.
+    - jobs (int): Number of worker processes, 1 parses everything in-process.
+    - cache (EventCache): Cache of parsed events to skip parsing unchanged files.
+    - start (datetime): Start of the window instead of now.
+
+    Returns:
+    - Dict[str, List[Dict]]: The events of each file, as `load_events` returns them.
+    """
+    now = start or datetime.now(timezone.utc)
+    future_limit = now + timedelta(days=days)
+
+    records = {}
+    pending = []
+    # Taken before parsing, so files changed meanwhile are not cached
+    fingerprints = {}
+    for ics_file in dict.fromkeys(files):
+        cached = cache.get(ics_file) if cache is not None else None
+        if cached is not None:
+            records[ics_file] = cached
+        else:
+            records[ics_file] = []
+            pending.append(ics_file)
+            if cache is not None:
+                fingerprints[ics_file] = cache.fingerprint(ics_file)
+
+    # Cached records cover the whole file, otherwise skip events outside the window
+    window = (None, None) if cache is not None else (now, future_limit)
+    tasks = _tasks(pending, jobs)
+
+    if jobs > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            futures = [
+                pool.submit(load_records, ics_file, *window, byte_range=byte_range)
+                for ics_file, byte_range in tasks
+            ]
+            # Collect in submission order so events keep their order in the file
+            for (ics_file, _), future in zip(tasks, futures):
+                records[ics_file] += future.result()
+    else:
+        for ics_file, byte_range in tasks:
+            records[ics_file] += load_records(ics_file, *window, byte_range=byte_range)
+
+    if cache is not None:
+        for ics_file in pending:
+            cache.put(ics_file, records[ics_file], fingerprints[ics_file])
+
+    return {
+        ics_file: records_to_events(file_records, now, future_limit, ics_file)
+        for ics_file, file_records in records.items()
+    }
@@ -0,0 +1,198 @@
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from calendar_sync.recurrence import event_bounds, is_recurring
+
+
+class Stage(NamedTuple):
+    """
+    One step of a Pipeline. `apply` takes a source event and returns it,
+    a changed copy of it, or None to leave the event out of the sync.
+    """
+
+    name: str
+    apply: Callable
+
+
+class Pipeline:
+    """
+    Runs source events through a series of stages before they are merged.
+
+    Events flow through one at a time, so stages run lazily as the merge
+    consumes them. Instead of logging every event, each stage counts the
+    events it dropped and changed, see `summary`.
+    """
+
+    def __init__(self, stages: Iterable[Stage] = ()):
+        self.stages = list(stages)
+        self.dropped = Counter()
+        self.changed = Counter()
+
+    def __bool__(self) -> bool:
+        return bool(self.stages)
+
+    def run(
+        self, events: Iterable[Tuple[str, object]], stages: Optional[List[Stage]] = None
+    ) -> Iterator[Tuple[str, object]]:
+        """
+        Yield the (uid, event) pairs that make it through the stages, by
+        default the pipeline's own.
+        """
+        stages = self.stages if stages is None else stages
+        for stage in stages:
+            # Keep the stages in order for the summary
+            self.dropped.setdefault(stage.name, 0)
+            self.changed.setdefault(stage.name, 0)
+        if not stages:
+            yield from events
+            return
+        for uid, event in events:
+            for stage in stages:
+                result = stage.apply(event)
+                if result is None:
+                    self.dropped[stage.name] += 1
+                    break
+                if result is not event:
+                    self.changed[stage.name] += 1
+                event = result
+            else:
+                yield uid, event
+
+    def summary(self) -> List[str]:
+        """Describe what each stage did, one line per stage that did anything."""
+        lines = []
+        for stage in self.dropped:
+            counts = [
+                f"{count} {what}"
+                for what, count in (
+                    ("dropped", self.dropped[stage]),
+                    ("changed", self.changed[stage]),
+                )
+                if count
+            ]
+            if counts:
+                lines.append(f"{stage}: {', '.join(counts)}")
+        return lines
+
+
+def _summary(event) -> str:
+    summary = event.get("SUMMARY")
+    return "" if summary is None else str(summary)
+
+
+def _copy(event):
+    """
+    Copy an event before changing it, the source calendar may be merged
+    elsewhere too. Nested components such as VALARMs are shared.
+    """
+    copy = event.copy()
+    copy.subcomponents = list(event.subcomponents)
+    return copy
+
+
+def _categories(event) -> set:
+    value = event.get("CATEGORIES")
+    if value is None:
+        return set()
+    values = value if isinstance(value, list) else [value]
+    return {str(category).lower() for prop in values for category in prop.cats}
+
+
+def skip_prefix(prefix: str) -> Stage:
+    """Drop events whose summary starts with `prefix`."""
+    return Stage(
+        "skip_prefix",
+        lambda event: None if str(event.get("SUMMARY")).startswith(prefix) else event,
+    )
+
+
+def match_summary(pattern: str, exclude: bool = False) -> Stage:
+    """
+    Keep only events whose summary matches the regex, or with `exclude`
+    drop them instead.
+    """
+    search = re.compile(pattern).search
+
+    def apply(event):
+        return event if bool(search(_summary(event))) != exclude else None
+
+    return Stage("exclude" if exclude else "include", apply)
+
+
+def in_categories(categories: Iterable[str]) -> Stage:
+    """Keep only events in at least one of the categories, ignoring case."""
+    wanted = {category.lower() for category in categories}
+    return Stage(
+        "category", lambda event: event if _categories(event) & wanted else None
+    )
+
+
+def in_window(start: Optional[datetime], end: Optional[datetime]) -> Stage:
+    """
+    Keep only events overlapping the window between `start` and `end` (UTC,
+    either may be open). Recurring events are kept, their occurrences are not
+    known until they are expanded.
+    """
+
+    def apply(event):
+        if event.get("DTSTART") is None or is_recurring(event):
+            return event
+        event_start, event_end = event_bounds(event)
+        if start is not None and max(event_start, event_end) < start:
+            return None
+        if end is not None and event_start >= end:
+            return None
+        return event
+
+    return Stage("window", apply)
+
+
+def rewrite_summary(pattern: str, replacement: str) -> Stage:
+    """Replace matches of the regex in summaries, as `re.sub` does."""
+    sub = re.compile(pattern).sub
+
+    def apply(event):
+        summary = _summary(event)
+        rewritten = sub(replacement, summary)
+        if rewritten == summary:
+            return event
+        event = _copy(event)
+        event["SUMMARY"] = rewritten
+        return event
+
+    return Stage("rewrite", apply)
+
+
+def strip_fields(names: Iterable[str]) -> Stage:
+    """Remove properties such as DESCRIPTION or ATTENDEE, and VALARM etc."""
+    names = {name.upper() for name in names}
+
+    def apply(event):
+        subcomponents = [c for c in event.subcomponents if c.name not in names]
+        if not names.intersection(event) and len(subcomponents) == len(
+            event.subcomponents
+        ):
+            return event
+        event = _copy(event)
+        for name in names.intersection(event):
+            del event[name]
+        event.subcomponents = subcomponents
+        return event
+
+    return Stage("strip", apply)
+
+
+def prefix_new_events(prefix: str, destination) -> Stage:
+    """Add `prefix` to summaries of events that are not in `destination` yet."""
+
+    def apply(event):
+        summary = _summary(event)
+        if summary.startswith(prefix) or str(event.get("UID")) in destination:
+            return event
+        event = _copy(event)
+        event["SUMMARY"] = f"{prefix}{summary}"
+        return event
+
+    return Stage("add_prefix", apply)
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    from icalendar.prop import vRecur
+
+RECURRENCE_PROPERTIES = ("RRULE", "RDATE")
+
+
+def to_utc(value) -> datetime:
+    """
+    Convert a DTSTART/DTEND style value to an aware UTC datetime.
+    Naive datetimes are read as UTC and all-day dates as midnight UTC.
+    """
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _dates(value) -> List:
+    """Return the values of one or more RDATE/EXDATE properties."""
+    values = []
+    for prop in _as_list(value):
+        for item in prop.dts:
+            dt = item.dt
+            # RDATE can also hold PERIOD values, only their start matters here
+            values.append(dt[0] if isinstance(dt, tuple) else dt)
+    return values
+
+
+def _rule_text(rule: "vRecur", dtstart: datetime) -> str:
+    """
+    Serialize an RRULE for dateutil, making UNTIL aware like DTSTART.
+    A floating UNTIL is read in DTSTART's zone and a date UNTIL covers that day.
+    """
+    from icalendar.prop import vRecur
+
+    rule = dict(rule)
+    until = []
+    for value in rule.get("UNTIL", []):
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day, 23, 59, 59)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dtstart.tzinfo)
+        until.append(value.astimezone(timezone.utc))
+    if until:
+        rule["UNTIL"] = until
+    return vRecur(rule).to_ical().decode()
+
+
+def _aware(value, tzinfo) -> datetime:
+    """Make an RDATE/EXDATE comparable with occurrences of the series."""
+    if not isinstance(value, datetime):
+        return to_utc(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=tzinfo)
+    return value
+
+
+def event_bounds(component) -> Tuple[datetime, datetime]:
+    """
+    Return the UTC start and end of a VEVENT. Without DTEND the end follows
+    from DURATION, or RFC 5545's defaults of zero length or one whole day.
+    """
+    dtstart = component.get("DTSTART").dt
+    start = to_utc(dtstart)
+    if component.get("DTEND") is not None:
+        return start, to_utc(component.get("DTEND").dt)
+    if component.get("DURATION") is not None:
+        return start, start + component.get("DURATION").dt
+    if isinstance(dtstart, datetime):
+        return start, start
+    return start, start + timedelta(days=1)
+
+
+def is_recurring(component) -> bool:
+    """Return True if the VEVENT defines more occurrences than its DTSTART."""
+    return any(component.get(name) is not None for name in RECURRENCE_PROPERTIES)
+
+
+def iter_occurrences(
+    component, window_start: datetime, window_end: datetime
+) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    Lazily yield the (start, end) of each occurrence of a recurring VEVENT
+    that starts between `window_start` and `window_end`, in UTC.
+
+    RRULE, RDATE and EXDATE are combined into a dateutil rruleset, which is
+    iterated from the start of the window and abandoned once past its end, so
+    a series without an end date never produces more than the window holds.
+    Occurrences replaced through RECURRENCE-ID are left to the caller.
+    """
+    from dateutil.rrule import rruleset, rrulestr
+
+    dtstart = component.get("DTSTART").dt
+    if isinstance(dtstart, datetime) and dtstart.tzinfo is not None:
+        # Keep the zone so the rules follow its wall clock across DST changes
+        start = dtstart
+    else:
+        start = to_utc(dtstart)
+    first_start, first_end = event_bounds(component)
+    duration = first_end - first_start
+
+    ruleset = rruleset()
+    # DTSTART is always the first instance, even if the rules do not match it
+    ruleset.rdate(start)
+    for rule in _as_list(component.get("RRULE")):
+        ruleset.rrule(rrulestr(_rule_text(rule, start), dtstart=start))
+    for value in _dates(component.get("RDATE")):
+        ruleset.rdate(_aware(value, start.tzinfo))
+    for value in _dates(component.get("EXDATE")):
+        ruleset.exdate(_aware(value, start.tzinfo))
+
+    for occurrence in ruleset.xafter(window_start, inc=True):
+        if occurrence > window_end:
+            break
+        occurrence = occurrence.astimezone(timezone.utc)
+        yield occurrence, occurrence + duration
@@ -0,0 +1,455 @@
+import asyncio
+import json
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from calendar_sync.cache import EventCache
+from calendar_sync.conflict_checker import iter_conflicts, summarize_conflicts
+from calendar_sync.conflict_writer import conflict_row
+from calendar_sync.defaults import (
+    DEFAULT_DAYS,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_HOST,
+    DEFAULT_INTERVAL,
+    DEFAULT_PORT,
+)
+from calendar_sync.event_loader import cached_records, load_records, records_to_events
+from calendar_sync.freebusy import BusyIndex, intersection, union
+from calendar_sync.watch import FileWatcher
+
+# Length of the window of a query that only gives a start, or nothing
+DEFAULT_QUERY_DAYS = 7
+# Longest request line or header line accepted
+MAX_LINE = 8192
+MAX_HEADERS = 100
+# Queries that may sweep many events, answered in a worker thread so they do
+# not hold up the cheap ones
+SLOW_PATHS = ("/conflicts",)
+
+
+class QueryError(Exception):
+    """Raised for a request the service cannot answer, with its HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _epoch(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def _iso(value: int) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+def _parse_time(value: str) -> int:
+    """Parse epoch seconds or an ISO 8601 time, UTC unless it has an offset."""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(400, f"Invalid time: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return _epoch(parsed)
+
+
+def _window(days: int) -> Tuple[datetime, datetime]:
+    today = datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return today, today + timedelta(days=days)
+
+
+def _event(name: str, event: Dict) -> Dict:
+    return {
+        "calendar": name,
+        "uid": event["uid"],
+        "summary": event["summary"],
+        "start": event["start"].isoformat(),
+        "end": event["end"].isoformat(),
+    }
+
+
+class CalendarIndex:
+    """
+    The events of one calendar over the indexed window, for interval queries.
+
+    Events are sorted by start, with their starts and ends in parallel arrays
+    of epoch seconds. The events overlapping a range are found by a binary
+    search for the range's end, and for its start less the longest event, so
+    a query only looks at events that can overlap it. Busy time is kept as a
+    BusyIndex and the events by UID in a dictionary.
+    """
+
+    def __init__(self, events: List[Dict]):
+        self.events = sorted(events, key=lambda event: (event["start"], event["end"]))
+        self.starts = array("q", (_epoch(event["start"]) for event in self.events))
+        self.ends = array("q", (_epoch(event["end"]) for event in self.events))
+        self.longest = max(
+            (end - start for start, end in zip(self.starts, self.ends)), default=0
+        )
+        self.busy = BusyIndex(zip(self.starts, self.ends))
+        self.by_uid: Dict[str, List[Dict]] = {}
+        for event in self.events:
+            self.by_uid.setdefault(event["uid"], []).append(event)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def overlapping(self, start: int, end: int) -> List[Dict]:
+        """Return the events between `start` and `end`, instants at `start` too."""
+        first = bisect_left(self.starts, start - max(self.longest, 0))
+        last = bisect_left(self.starts, end)
+        return [
+            self.events[i]
+            for i in range(first, last)
+            if self.ends[i] > start or self.starts[i] >= start
+        ]
+
+
+class CalendarService:
+    """
+    Calendars loaded once and kept in memory as CalendarIndexes, answering
+    the queries of the HTTP API.
+
+    The records of each file are kept, so the indexes are rebuilt for the new
+    window without parsing when the day changes, and a changed file is parsed
+    again on its own. The indexes are replaced as a whole, never changed in
+    place, so a query sees a consistent set of them even during a reload.
+
+    Parameters:
+    - calendars (Dict[str, str]): Local ICS files keyed by the name queries
+      use for them.
+    - days (int): Days from the start of today (UTC) to index events for.
+    - cache (EventCache): Cache of parsed events to skip parsing unchanged files.
+    """
+
+    def __init__(
+        self,
+        calendars: Dict[str, str],
+        days: int = DEFAULT_DAYS,
+        cache: Optional[EventCache] = None,
+    ):
+        self.paths = dict(calendars)
+        self.days = days
+        self.cache = cache
+        self.records = {name: self._parse(name) for name in self.paths}
+        self.indexes: Dict[str, CalendarIndex] = {}
+        self.window: Optional[Tuple[datetime, datetime]] = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._build(list(self.paths))
+        self.routes: Dict[str, Callable[[Dict[str, List[str]]], Dict]] = {
+            "/health": self.health,
+            "/events": self.events,
+            "/conflicts": self.conflicts,
+            "/freebusy": self.freebusy,
+        }
+
+    def _parse(self, name: str) -> List[tuple]:
+        if self.cache is None:
+            return load_records(self.paths[name])
+        return cached_records(self.paths[name], self.cache)
+
+    def _build(self, names: List[str]):
+        window = _window(self.days)
+        if window != self.window:
+            names = list(self.paths)
+        indexes = dict(self.indexes)
+        for name in names:
+            indexes[name] = CalendarIndex(
+                records_to_events(self.records[name], *window, self.paths[name])
+            )
+        self.indexes, self.window = indexes, window
+
+    def current(self) -> Dict[str, CalendarIndex]:
+        """Return the indexes, moving them on to today's window first if needed."""
+        if _window(self.days) != self.window:
+            with self._lock:
+                if _window(self.days) != self.window:
+                    self._build([])
+        return self.indexes
+
+    def reload(self, changed: List[str]) -> List[str]:
+        """Parse the changed files again and rebuild their indexes, by name."""
+        names = [name for name, path in self.paths.items() if path in changed]
+        with self._lock:
+            records = {name: self._parse(name) for name in names}
+            self.records.update(records)
+            self._build(names)
+            self.reloads += 1
+        return names
+
+    def watch(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+        report: Optional[Callable[[List[str], Optional[Exception]], None]] = None,
+    ) -> threading.Thread:
+        """
+        Reload calendars whenever their files change, from a daemon thread.
+
+        `report` is called with the names reloaded, or with the error a file
+        failed to parse with, in which case its old index is kept.
+        """
+        watcher = FileWatcher(list(self.paths.values()), interval, debounce)
+
+        def loop():
+            while True:
+                changed = watcher.wait()
+                try:
+                    names, error = self.reload(changed), None
+                except (OSError, ValueError) as e:
+                    names, error = [], e
+                if report is not None:
+                    report(names, error)
+
+        thread = threading.Thread(target=loop, name="calendar_sync-watch", daemon=True)
+        thread.start()
+        return thread
+
+    def _names(self, query: Dict[str, List[str]]) -> List[str]:
+        names = query.get("calendar") or list(self.paths)
+        for name in names:
+            if name not in self.paths:
+                raise QueryError(404, f"Unknown calendar: {name!r}")
+        return list(dict.fromkeys(names))
+
+    @staticmethod
+    def _range(query: Dict[str, List[str]]) -> Tuple[int, int]:
+        if "start" in query:
+            start = _parse_time(query["start"][-1])
+        else:
+            start = _epoch(datetime.now(timezone.utc))
+        if "end" in query:
+            end = _parse_time(query["end"][-1])
+        else:
+            end = start + DEFAULT_QUERY_DAYS * 86_400
+        if end <= start:
+            raise QueryError(400, "end must be after start")
+        return start, end
+
+    @staticmethod
+    def _flag(query: Dict[str, List[str]], name: str) -> bool:
+        return query.get(name, [""])[-1].lower() in ("1", "true", "yes")
+
+    def health(self, query: Dict[str, List[str]]) -> Dict:
+        """GET /health: the calendars loaded, their event counts and the window."""
+        indexes = self.current()
+        start, end = self.window
+        return {
+            "status": "ok",
+            "window": {"start": start.isoformat(), "end": end.isoformat()},
+            "reloads": self.reloads,
+            "calendars": {name: len(index) for name, index in indexes.items()},
+        }
+
+    def events(self, query: Dict[str, List[str]]) -> Dict:
+        """
+        GET /events: the events with a `uid` in any calendar, or the events
+        between `start` and `end`, in the `calendar`s given or all of them.
+        """
+        indexes = self.current()
+        names = self._names(query)
+        if "uid" in query:
+            uid = query["uid"][-1]
+            found = [
+                _event(name, event)
+                for name in names
+                for event in indexes[name].by_uid.get(uid, ())
+            ]
+        else:
+            start, end = self._range(query)
+            found = [
+                _event(name, event)
+                for name in names
+                for event in indexes[name].overlapping(start, end)
+            ]
+        return {"count": len(found), "events": found}
+
+    def conflicts(self, query: Dict[str, List[str]]) -> Dict:
+        """
+        GET /conflicts: the conflicts between the `calendar`s given, at least
+        two, or all of them, among the events between `start` and `end`. With
+        `summary` they are counted as `check_conflicts --summary` does.
+        """
+        indexes = self.current()
+        names = self._names(query)
+        if len(names) < 2:
+            raise QueryError(400, "Conflicts need at least two calendars")
+        start, end = self._range(query)
+        calendars = {name: indexes[name].overlapping(start, end) for name in names}
+        if self._flag(query, "summary"):
+            return summarize_conflicts(calendars)
+        found = [conflict_row(*conflict) for conflict in iter_conflicts(calendars)]
+        return {"count": len(found), "conflicts": found}
+
+    def freebusy(self, query: Dict[str, List[str]]) -> Dict:
+        """
+        GET /freebusy: the busy and free time between `start` and `end` when
+        any of the `calendar`s given is busy, or all of them with `all`. With
+        `at` only whether they are busy then.
+        """
+        indexes = self.current()
+        names = self._names(query)
+        combine = intersection if self._flag(query, "all") else union
+        if "at" in query:
+            at = _parse_time(query["at"][-1])
+            start, end = at, at + 1
+        else:
+            start, end = self._range(query)
+        # Only the busy time of the range is combined, not the whole window
+        index: BusyIndex = combine(
+            [indexes[name].busy.between(start, end) for name in names]
+        )
+        if "at" in query:
+            return {"at": _iso(start), "busy": index.is_busy(start)}
+        return {
+            "busy": [{"start": _iso(s), "end": _iso(e)} for s, e in index],
+            "free": [
+                {"start": _iso(s), "end": _iso(e)} for s, e in index.free(start, end)
+            ],
+        }
+
+    def handle(self, method: str, target: str) -> Tuple[int, Dict]:
+        """Answer a request for `target`, returning the status and JSON payload."""
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, {"error": f"Not found: {url.path}"}
+        if method not in ("GET", "HEAD"):
+            return 405, {"error": f"Method not allowed: {method}"}
+        # A literal + in a time's UTC offset must not turn into a space
+        query = parse_qs(url.query.replace("+", "%2B"))
+        try:
+            return 200, route(query)
+        except QueryError as e:
+            return e.status, {"error": str(e)}
+
+
+def _response(status: int, payload: Dict, keep_alive: bool, head: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    head_bytes = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head_bytes if head else head_bytes + body
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """Read a request line and headers, skipping any body, None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise QueryError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) == MAX_HEADERS:
+            raise QueryError(431, "Too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise QueryError(400, "Invalid Content-Length")
+    if length:
+        await reader.readexactly(length)
+    return parts[0], parts[1], parts[2], headers
+
+
+async def _connection(
+    service: CalendarService,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+):
+    """Answer the requests on one connection, kept alive between them."""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except QueryError as e:
+                writer.write(_response(e.status, {"error": str(e)}, False, False))
+                break
+            except ValueError:
+                # The StreamReader's limit, a line longer than MAX_LINE
+                writer.write(_response(431, {"error": "Line too long"}, False, False))
+                break
+            if request is None:
+                break
+            method, target, version, headers = request
+            connection = headers.get("connection", "").lower()
+            if version == "HTTP/1.0":
+                keep_alive = connection == "keep-alive"
+            else:
+                keep_alive = connection != "close"
+            if urlsplit(target).path in SLOW_PATHS:
+                status, payload = await asyncio.to_thread(
+                    service.handle, method, target
+                )
+            else:
+                status, payload = service.handle(method, target)
+            writer.write(_response(status, payload, keep_alive, method == "HEAD"))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(
+    service: CalendarService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+) -> asyncio.AbstractServer:
+    """
+    Start serving the HTTP/JSON API of the service, each connection in its
+    own task, and return the server. Port 0 picks a free port.
+    """
+    return await asyncio.start_server(
+        lambda reader, writer: _connection(service, reader, writer),
+        host,
+        port,
+        limit=MAX_LINE,
+    )
+
+
+def serve(
+    service: CalendarService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    ready: Optional[Callable[[str, int], None]] = None,
+):
+    """Serve the API until interrupted, calling `ready` with the address bound."""
+
+    async def main():
+        server = await start_server(service, host, port)
+        if ready is not None:
+            ready(*server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
@@ -1,17 +1,39 @@
-from icalendar import Calendar
-from icalendar.prop import vText
+from typing import TYPE_CHECKING
+
 import click
 from termcolor import colored
+from calendar_sync import timings
+from calendar_sync.ics_reader import VEventIndex
+from calendar_sync.pipeline import Pipeline, prefix_new_events, skip_prefix
+
+if TYPE_CHECKING:
+    from icalendar import Calendar
 
 
-def read_calendar(file_path: str) -> Calendar:
-    """Reads the ICS file and returns a Calendar object."""
-    with open(file_path, "rb") as f:
-        return Calendar.from_ical(f.read())
+def read_calendar(file_path: str, use_mmap: bool = False) -> "Calendar":
+    """
+    Reads the ICS file and returns a Calendar object.
+    With `use_mmap` a memory-mapped VEventIndex is returned instead.
+    """
+    if use_mmap:
+        with timings.stage("index") as index:
+            calendar = VEventIndex(file_path)
+            index.add(events=len(calendar))
+        return calendar
+    from icalendar import Calendar
 
+    with timings.stage("parse") as parse:
+        with open(file_path, "rb") as f:
+            calendar = Calendar.from_ical(f.read())
+        parse.add(components=len(calendar.subcomponents))
+    return calendar
 
-def get_events_from_calendar(calendar: Calendar) -> dict:
+
+def get_events_from_calendar(calendar: "Calendar") -> dict:
     """Extracts events from the calendar and returns a dictionary of events by UID."""
+    if isinstance(calendar, VEventIndex):
+        # Already keyed by UID, events are parsed when they are looked up
+        return calendar
     events = {}
     for event in calendar.walk("VEVENT"):
         uid = str(event.get("UID"))
@@ -42,50 +64,101 @@ def handle_event_conflicts(event, existing_event, check_conflicts) -> bool:
     return False
 
 
-def sync_ics_files(
-    from_file, to_file, add_prefix=None, filter_prefix=None, check_conflicts=None
-):
-    """Syncs events from the source calendar to the destination calendar."""
+def _merge_events(source_events, destination_events, check_conflicts) -> dict:
+    """Return the merged events by UID, starting out in destination order."""
+    merged_events = dict(destination_events)
+    source_events = list(source_events)
+
+    # Check the events already in the destination calendar in one timed loop
+    with timings.stage("handle_event_conflicts") as check:
+        skipped = set()
+        checked = 0
+        for uid, event in source_events:
+            if uid in destination_events:
+                checked += 1
+                existing_event = destination_events[uid]
+                if handle_event_conflicts(event, existing_event, check_conflicts):
+                    skipped.add(uid)
+        check.add(events=checked)
+
+    for uid, event in source_events:
+        if uid in skipped:
+            continue  # Skip due to conflict
+        if uid in destination_events:
+            # Replace the old event, moving the updated one to the end
+            del merged_events[uid]
+        merged_events[uid] = event
+
+    return merged_events
+
+
+def merge_calendars(
+    from_calendar,
+    to_calendar,
+    add_prefix=None,
+    filter_prefix=None,
+    check_conflicts=None,
+    pipeline=None,
+) -> "Calendar":
+    """
+    Merges the events of the source calendar into the destination calendar,
+    returning a new calendar. Neither calendar is modified, so the same
+    parsed calendars can be merged again.
+
+    Source events are skipped if they start with `filter_prefix`, then go
+    through the stages of the `pipeline`, and events new to the destination
+    get `add_prefix`. The pipeline counts what each stage did.
+    """
+    from icalendar import Calendar
+
     # Create a new calendar for the merged events
     new_cal = Calendar()
     new_cal.add("prodid", "-//Calendar Sync App//EN")
     new_cal.add("version", "2.0")
 
-    # Read destination calendar and get events
-    to_calendar = read_calendar(to_file)
     destination_events = get_events_from_calendar(to_calendar)
-
-    # Add destination events to the new calendar
-    for event in destination_events.values():
-        new_cal.add_component(event)
-
-    # Read source calendar and process events
-    from_calendar = read_calendar(from_file)
     source_events = get_events_from_calendar(from_calendar)
 
-    for uid, event in source_events.items():
-        # Skip events with filter prefix
-        if filter_prefix and str(event.get("SUMMARY")).startswith(filter_prefix):
-            continue
-
-        # Event already exists in the destination calendar
-        if uid in destination_events:
-            existing_event = destination_events[uid]
-            if handle_event_conflicts(event, existing_event, check_conflicts):
-                continue  # Skip due to conflict
-
-            # Remove old event and add the updated one
-            new_cal.subcomponents.remove(existing_event)
-            new_cal.add_component(event)
-        else:
-            # Only apply the prefix to new events from `from_file`
-            summary = event.get("SUMMARY")
-            if isinstance(summary, vText):
-                summary = str(summary)  # Convert vText to string
-
-            if add_prefix and not summary.startswith(add_prefix):
-                event["SUMMARY"] = f"{add_prefix}{summary}"
-                print(f"Updated event with prefix: {event.get('SUMMARY')}")
+    if pipeline is None:
+        pipeline = Pipeline()
+    stages = list(pipeline.stages)
+    if filter_prefix:
+        stages.insert(0, skip_prefix(filter_prefix))
+    if add_prefix:
+        stages.append(prefix_new_events(add_prefix, destination_events))
+
+    with timings.stage("merge") as merge:
+        merged_events = _merge_events(
+            pipeline.run(source_events.items(), stages),
+            destination_events,
+            check_conflicts,
+        )
+        for event in merged_events.values():
             new_cal.add_component(event)
+        merge.add(events=len(merged_events))
 
     return new_cal
+
+
+def sync_ics_files(
+    from_file,
+    to_file,
+    add_prefix=None,
+    filter_prefix=None,
+    check_conflicts=None,
+    use_mmap=False,
+    pipeline=None,
+):
+    """Syncs events from the source calendar to the destination calendar."""
+    # Read the destination calendar first, then the source calendar
+    to_calendar = read_calendar(to_file, use_mmap=use_mmap)
+    from_calendar = read_calendar(from_file, use_mmap=use_mmap)
+
+    return merge_calendars(
+        from_calendar,
+        to_calendar,
+        add_prefix=add_prefix,
+        filter_prefix=filter_prefix,
+        check_conflicts=check_conflicts,
+        pipeline=pipeline,
+    )
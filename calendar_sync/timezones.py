@@ -0,0 +1,185 @@
+import mmap
+import os
+import re
+from datetime import datetime, timedelta, tzinfo
+from typing import Dict, Optional, Tuple
+
+# UTC offsets are looked up once per zone and quarter hour of local time. Zones
+# change offset on quarter hour boundaries, so all times in a bucket share one.
+BUCKET_SECONDS = 15 * 60
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_NAME = re.compile(rb"[A-Za-z0-9-]+")
+_PARAMETER = re.compile(rb';([A-Za-z0-9-]+)=("[^"]*"|[^";:]*)')
+_VTIMEZONE = re.compile(
+    rb"^BEGIN:VTIMEZONE\r?$.*?^END:VTIMEZONE\r?$", re.MULTILINE | re.DOTALL
+)
+
+
+def split_property(line: bytes) -> Optional[Tuple[Dict[bytes, bytes], bytes]]:
+    """
+    Split an unfolded content line into its parameters and its value.
+
+    Parameter names are upper-cased and quotes around parameter values are
+    removed. Returns None if the line is not a well-formed content line.
+    """
+    match = _NAME.match(line)
+    if match is None:
+        return None
+    position = match.end()
+    params = {}
+    while line[position : position + 1] == b";":
+        match = _PARAMETER.match(line, position)
+        if match is None:
+            return None
+        params[match.group(1).upper()] = match.group(2).strip(b'"')
+        position = match.end()
+    if line[position : position + 1] != b":":
+        return None
+    return params, line[position + 1 :]
+
+
+def _lookup(tzid: str) -> Optional[tzinfo]:
+    """Resolve a TZID by name, as an IANA zone or a name icalendar knows."""
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        pass
+    # Windows and other well-known aliases, the same lookup icalendar does
+    from icalendar.timezone import tzp
+
+    return tzp.timezone(tzid)
+
+
+def read_vtimezones(ics_file: str) -> Dict[str, tzinfo]:
+    """Build a tzinfo for each VTIMEZONE defined in the ICS file, by TZID."""
+    with open(ics_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            blocks = [match.group(0) for match in _VTIMEZONE.finditer(data)]
+    if not blocks:
+        return {}
+
+    from icalendar import Timezone
+
+    zones = {}
+    for block in blocks:
+        try:
+            definition = Timezone.from_ical(block)
+            zones[str(definition["TZID"])] = definition.to_tz(lookup_tzid=False)
+        except (KeyError, ValueError):
+            continue
+    return zones
+
+
+class TimeNormalizer:
+    """
+    Converts DATE and DATE-TIME values to UTC epoch seconds, memoizing the work.
+
+    A TZID is resolved once: as an IANA zone, as another name icalendar knows
+    (such as a Windows zone name), or else from the VTIMEZONE definitions in
+    the ICS file, which are only read if such a TZID turns up. UTC offsets are
+    memoized by (tzid, quarter hour of local time), so tens of thousands of
+    events in a handful of zones cost a few hundred offset lookups. Dates are
+    read as midnight UTC and floating times, or unknown TZIDs, as UTC, like
+    `recurrence.to_utc` does.
+    """
+
+    def __init__(self, ics_file: Optional[str] = None):
+        self.ics_file = ics_file
+        self._zones: Dict[str, Optional[tzinfo]] = {}
+        self._defined: Optional[Dict[str, tzinfo]] = None
+        self._offsets: Dict[Tuple[str, int], int] = {}
+        self._days: Dict[bytes, Optional[int]] = {}
+
+    def zone(self, tzid: str) -> Optional[tzinfo]:
+        """Return the tzinfo for a TZID, None if it cannot be resolved."""
+        try:
+            return self._zones[tzid]
+        except KeyError:
+            pass
+        zone = _lookup(tzid)
+        if zone is None and self.ics_file is not None:
+            if self._defined is None:
+                self._defined = read_vtimezones(self.ics_file)
+            zone = self._defined.get(tzid)
+        self._zones[tzid] = zone
+        return zone
+
+    def offset(self, tzid: str, local: int) -> int:
+        """Return the UTC offset in seconds of the zone at a local epoch time."""
+        key = (tzid, local // BUCKET_SECONDS)
+        try:
+            return self._offsets[key]
+        except KeyError:
+            pass
+        zone = self.zone(tzid)
+        offset = 0
+        if zone is not None:
+            wall = _EPOCH + timedelta(seconds=key[1] * BUCKET_SECONDS)
+            offset = int(wall.replace(tzinfo=zone).utcoffset().total_seconds())
+        self._offsets[key] = offset
+        return offset
+
+    def _day(self, value: bytes) -> Optional[int]:
+        """Return the days since the epoch of a YYYYMMDD value, None if invalid."""
+        try:
+            return self._days[value]
+        except KeyError:
+            pass
+        try:
+            day = (
+                datetime(int(value[0:4]), int(value[4:6]), int(value[6:8])).toordinal()
+                - _EPOCH_ORDINAL
+            )
+        except ValueError:
+            day = None
+        self._days[value] = day
+        return day
+
+    def epoch(self, value: bytes, tzid: Optional[str] = None) -> Optional[int]:
+        """
+        Return the UTC epoch seconds of a raw DATE or DATE-TIME value, in the
+        zone of `tzid` unless it ends in Z. Returns None if the value is in
+        neither form.
+        """
+        day = self._day(value[:8]) if len(value) >= 8 else None
+        if day is None:
+            return None
+        if len(value) == 8:
+            return day * 86400
+        utc = value[15:] in (b"Z", b"z")
+        if value[8:9] != b"T" or not (len(value) == 15 or utc):
+            return None
+        try:
+            hour, minute, second = (
+                int(value[9:11]),
+                int(value[11:13]),
+                int(value[13:15]),
+            )
+        except ValueError:
+            return None
+        if hour > 23 or minute > 59 or second > 59:
+            return None
+        local = day * 86400 + hour * 3600 + minute * 60 + second
+        if utc or not tzid:
+            return local
+        return local - self.offset(tzid, local)
+
+    def localize(self, component):
+        """
+        Attach zones icalendar could not resolve to the DTSTART, DTEND and
+        RECURRENCE-ID of a parsed component, using the file's VTIMEZONEs.
+        """
+        for name in ("DTSTART", "DTEND", "RECURRENCE-ID"):
+            prop = component.get(name)
+            tzid = getattr(prop, "params", {}).get("TZID")
+            value = getattr(prop, "dt", None)
+            if tzid and isinstance(value, datetime) and value.tzinfo is None:
+                zone = self.zone(tzid)
+                if zone is not None:
+                    prop.dt = value.replace(tzinfo=zone)
@@ -0,0 +1,151 @@
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Return the peak resident set size of this process in KB, if known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _Stage:
+    """Times one run of a stage and adds it to the stage's totals."""
+
+    __slots__ = ("totals", "began", "peak")
+
+    def __init__(self, totals: Dict):
+        self.totals = totals
+
+    def __enter__(self):
+        self.peak = peak_rss_kb()
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.totals["calls"] += 1
+        self.totals["seconds"] += time.perf_counter() - self.began
+        # The process peak only grows, so count what the stage added to it
+        peak = peak_rss_kb()
+        if peak is not None:
+            growth = self.totals.get("peak_rss_growth_kb", 0)
+            self.totals["peak_rss_growth_kb"] = growth + peak - self.peak
+        return False
+
+    def add(self, **counts):
+        """Add to the counts of the stage, e.g. `events=len(events)`."""
+        for name, count in counts.items():
+            self.totals[name] = self.totals.get(name, 0) + count
+
+
+class _Disabled:
+    """Stand-in for _Stage while timings are off, doing nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+_DISABLED = _Disabled()
+# Keys of a stage's totals that are not counts
+_COLUMNS = ("stage", "calls", "seconds", "peak_rss_growth_kb")
+# Totals per stage name while timings are enabled, None while they are not
+_stages: Optional[Dict[str, Dict]] = None
+_began = 0.0
+
+
+def enable():
+    """Start collecting timings, discarding any collected before."""
+    global _stages, _began
+    _stages = {}
+    _began = time.perf_counter()
+
+
+def disable():
+    """Stop collecting timings."""
+    global _stages
+    _stages = None
+
+
+def enabled() -> bool:
+    return _stages is not None
+
+
+def stage(name: str):
+    """
+    Return a context manager timing a stage of the run, e.g.
+
+        with timings.stage("parse") as parse:
+            ...
+            parse.add(events=len(events))
+
+    Runs of a stage with the same name are added up, including how much
+    each run raised the peak memory of the process. While timings are
+    disabled this returns a shared object that does nothing.
+
+    Work done per event is better timed around its loop, or by adding up
+    the time of the loop's calls with `add(calls=..., seconds=...)`, than
+    by entering a stage for each event.
+    """
+    if _stages is None:
+        return _DISABLED
+    totals = _stages.get(name)
+    if totals is None:
+        totals = _stages[name] = {"stage": name, "calls": 0, "seconds": 0.0}
+    return _Stage(totals)
+
+
+def report() -> Dict:
+    """Return the collected timings, in the order stages first ran."""
+    return {
+        "seconds": time.perf_counter() - _began,
+        "peak_rss_kb": peak_rss_kb(),
+        "stages": [totals for totals in (_stages or {}).values() if totals["calls"]],
+    }
+
+
+def to_json(timings: Dict) -> str:
+    return json.dumps(timings, indent=2)
+
+
+def to_text(timings: Dict) -> str:
+    """
+    Format the timings as a table. "Peak +" is how much each stage raised
+    the peak memory of the process, which follows the table.
+    """
+    counts: List[str] = []
+    for totals in timings["stages"]:
+        counts += [name for name in totals if name not in counts]
+    counts = [name for name in counts if name not in _COLUMNS]
+
+    header = f"{'Stage':<24}{'Calls':>8}{'Seconds':>10}{'Peak +':>12}"
+    header += "".join(f"{name:>12}" for name in counts)
+    lines = [header]
+    for totals in timings["stages"]:
+        line = f"{totals['stage']:<24}{totals['calls']:>8}{totals['seconds']:>10.3f}"
+        line += f"{_megabytes(totals.get('peak_rss_growth_kb')):>12}"
+        line += "".join(f"{totals.get(name, ''):>12}" for name in counts)
+        lines.append(line)
+    lines.append(f"{'total':<24}{'':>8}{timings['seconds']:>10.3f}")
+    lines.append(f"{'process peak RSS':<42}{_megabytes(timings['peak_rss_kb']):>12}")
+    return "\n".join(lines)
+
+
+def _megabytes(kb: Optional[int]) -> str:
+    return "" if kb is None else f"{kb / 1024:.1f} MB"
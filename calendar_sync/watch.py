@@ -0,0 +1,202 @@
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from calendar_sync.conflict_checker import find_conflicts
+from calendar_sync.defaults import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL
+from calendar_sync.event_loader import (
+    component_records,
+    load_records,
+    records_to_events,
+)
+from calendar_sync.file_writer import write_ics_file
+from calendar_sync.sync import merge_calendars, read_calendar
+
+
+def _stamp(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FileWatcher:
+    """
+    Polls files for changes by their size and mtime.
+
+    A change is only reported once the files have stopped changing for
+    `debounce` seconds, so an editor or exporter writing a file in several
+    steps triggers a single cycle.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        interval: float = DEFAULT_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.paths = list(dict.fromkeys(paths))
+        self.interval = interval
+        self.debounce = debounce
+        self.sleep = sleep
+        self._stamps = self._poll()
+
+    def _poll(self) -> Dict[str, Optional[tuple]]:
+        return {path: _stamp(path) for path in self.paths}
+
+    def wait(self) -> List[str]:
+        """Block until files changed and settled, returning the changed paths."""
+        while True:
+            self.sleep(self.interval)
+            stamps = self._poll()
+            if stamps == self._stamps:
+                continue
+
+            while True:
+                self.sleep(self.debounce)
+                settled = self._poll()
+                if settled == stamps:
+                    break
+                stamps = settled
+
+            # Deleted files are skipped until they are written again
+            changed = [
+                path
+                for path in self.paths
+                if stamps[path] != self._stamps[path] and stamps[path] is not None
+            ]
+            self._stamps = stamps
+            if changed:
+                return changed
+
+    def acknowledge(self, path: str):
+        """Treat the current state of `path` as seen, e.g. after writing it."""
+        if path in self._stamps:
+            self._stamps[path] = _stamp(path)
+
+
+class WatchSession:
+    """
+    Keeps the parsed input calendars in memory and redoes the sync, the
+    conflict check or both for every cycle. Only changed files are parsed
+    again.
+
+    With an `output`, the source calendar is synced into the destination
+    calendar and written there. With `days`, conflicts between the two
+    calendars in the next `days` days are checked.
+    """
+
+    def __init__(
+        self,
+        from_file: str,
+        to_file: str,
+        output: Optional[str] = None,
+        add_prefix: Optional[str] = None,
+        days: Optional[int] = None,
+    ):
+        self.from_file = from_file
+        self.to_file = to_file
+        self.output = output
+        self.add_prefix = add_prefix
+        self.days = days
+        self.calendars = {}
+        self.records = {}
+        self.cycles = 0
+        # Seconds spent per stage over all cycles
+        self.totals = Counter()
+
+    @property
+    def files(self) -> List[str]:
+        return [self.from_file, self.to_file]
+
+    def run_cycle(self, changed: Optional[List[str]] = None) -> Dict:
+        """
+        Parse the changed files, all of them on the first cycle, and redo the
+        sync and conflict check.
+
+        Returns:
+        - Dict: The cycle number, counts and the seconds spent in each stage.
+        """
+        changed = list(dict.fromkeys(changed if changed is not None else self.files))
+        timings = Counter()
+        stats = {"cycle": self.cycles + 1, "changed": len(changed)}
+
+        began = time.perf_counter()
+        # Nothing is replaced until every changed file parsed
+        calendars, records = {}, {}
+        for path in changed:
+            if self.output:
+                calendars[path] = read_calendar(path)
+            if self.days is not None:
+                if self.output:
+                    # Reuse the parsed calendar rather than reading the file again
+                    records[path] = component_records(
+                        calendars[path].walk("VEVENT"), path
+                    )
+                else:
+                    records[path] = load_records(path)
+        self.calendars.update(calendars)
+        self.records.update(records)
+        timings["parse"] = time.perf_counter() - began
+
+        if self.output:
+            began = time.perf_counter()
+            new_cal = merge_calendars(
+                self.calendars[self.from_file],
+                self.calendars[self.to_file],
+                add_prefix=self.add_prefix,
+            )
+            timings["sync"] = time.perf_counter() - began
+
+            began = time.perf_counter()
+            write_ics_file(new_cal, self.output)
+            timings["write"] = time.perf_counter() - began
+            stats["events"] = len(new_cal.subcomponents)
+
+        if self.days is not None:
+            began = time.perf_counter()
+            now = datetime.now(timezone.utc)
+            future_limit = now + timedelta(days=self.days)
+            events1, events2 = (
+                records_to_events(self.records[path], now, future_limit, path)
+                for path in self.files
+            )
+            stats["conflicts"] = find_conflicts(events1, events2)
+            timings["check"] = time.perf_counter() - began
+
+        timings["total"] = sum(timings.values())
+        self.cycles += 1
+        self.totals.update(timings)
+        stats.update(timings)
+        return stats
+
+
+def watch(
+    session: WatchSession,
+    watcher: FileWatcher,
+    report: Callable[[Dict], None],
+    max_cycles: Optional[int] = None,
+):
+    """
+    Run a first cycle over all files, then one more each time the watcher
+    reports changes, passing the stats of every cycle to `report`.
+
+    A later cycle that fails to read or write a file, such as one caught
+    half-written, is reported with an `error` and the calendars of the last
+    good cycle are kept, so the next change is picked up as usual.
+    """
+    report(session.run_cycle())
+    while max_cycles is None or session.cycles < max_cycles:
+        # Writing the output must not trigger a cycle when it is also an input
+        if session.output:
+            watcher.acknowledge(session.output)
+        changed = watcher.wait()
+        try:
+            stats = session.run_cycle(changed)
+        except (OSError, ValueError) as e:
+            stats = {"cycle": session.cycles + 1, "changed": len(changed), "error": e}
+        report(stats)
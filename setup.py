@@ -20,7 +20,11 @@ setup(
     install_requires=[
         "click",  # Command line interface
         "icalendar",  # For working with ICS files
+        "python-dateutil",  # Expanding recurrence rules
     ],
+    extras_require={
+        "yaml": ["PyYAML"],  # YAML manifests for the batch command
+    },
     entry_points={
         "console_scripts": [
             "calendar-sync=sync_calendars:cli",  # Command line entry point for your app
@@ -1,27 +1,152 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
 import click
-from calendar_sync.sync import sync_ics_files
-from calendar_sync.file_writer import write_ics_file
-from calendar_sync.conflict_checker import check_conflicts
+from calendar_sync import timings
+from calendar_sync.cache import EventCache
+from calendar_sync.conflict_writer import FORMATS
+from calendar_sync.defaults import (
+    DEFAULT_DAYS,
+    DEFAULT_DEBOUNCE,
+    DEFAULT_HOST,
+    DEFAULT_INTERVAL,
+    DEFAULT_JOBS,
+    DEFAULT_PORT,
+)
+from calendar_sync.feeds import FeedError, is_url, resolve_sources
+
+# Commands import what they run when they are invoked, and the calendar_sync
+# modules only load icalendar and friends when they need them, so `--help` and
+# cached conflict checks start quickly. tests/test_startup.py guards this.
+
+
+class Source(click.ParamType):
+    """An existing ICS file or the http(s) URL of an ICS feed."""
+
+    name = "source"
+
+    def convert(self, value, param, ctx):
+        if is_url(value) or os.path.exists(value):
+            return value
+        self.fail(f"Path '{value}' does not exist.", param, ctx)
+
+
+def fetch_sources(obj, sources):
+    """Download the feeds among the sources, returning local paths for all."""
+    try:
+        return resolve_sources(sources, obj["feed_dir"])
+    except FeedError as e:
+        raise click.ClickException(str(e))
+
+
+def build_pipeline(include, exclude, categories, since, until, rewrites, strip):
+    """Build the source event pipeline from the sync options, in option order."""
+    from calendar_sync import pipeline
+    from calendar_sync.recurrence import to_utc
+
+    stages = [pipeline.match_summary(pattern) for pattern in include]
+    stages += [pipeline.match_summary(pattern, exclude=True) for pattern in exclude]
+    if categories:
+        stages.append(pipeline.in_categories(categories))
+    if since or until:
+        stages.append(
+            pipeline.in_window(since and to_utc(since), until and to_utc(until))
+        )
+    stages += [
+        pipeline.rewrite_summary(pattern, replacement)
+        for pattern, replacement in rewrites
+    ]
+    if strip:
+        stages.append(pipeline.strip_fields(strip))
+    return pipeline.Pipeline(stages)
+
 
+def report_timings(show_timings, timings_json):
+    """Print and/or write the timings collected while the command ran."""
+    report = timings.report()
+    timings.disable()
+    if show_timings:
+        click.echo(timings.to_text(report), err=True)
+    if timings_json:
+        with click.open_file(timings_json, "w") as f:
+            f.write(timings.to_json(report) + "\n")
 
-@click.group()
-def cli():
+
+def stop_profile(profiler, path):
+    profiler.disable()
+    profiler.dump_stats(path)
+    click.echo(f"Profile saved to {path}", err=True)
+
+
+@click.group(invoke_without_command=True)
+@click.option(
+    "--no-cache", is_flag=True, help="Parse every input file instead of using the cache"
+)
+@click.option(
+    "--clear-cache", is_flag=True, help="Remove all cached events before running"
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for cached events (default: ~/.cache/calendar_sync)",
+)
+@click.option(
+    "--timings",
+    "show_timings",
+    is_flag=True,
+    help="Print the time, event counts and peak memory of each stage to stderr",
+)
+@click.option(
+    "--timings-json",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help="Write the timings of each stage as JSON to this file ('-' for stdout)",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False),
+    help="Run under cProfile and write the pstats dump to this file",
+)
+@click.pass_context
+def cli(ctx, no_cache, clear_cache, cache_dir, show_timings, timings_json, profile):
     """A CLI tool for syncing and managing calendar events."""
-    pass
+    if show_timings or timings_json:
+        timings.enable()
+        ctx.call_on_close(lambda: report_timings(show_timings, timings_json))
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        ctx.call_on_close(lambda: stop_profile(profiler, profile))
+
+    cache = EventCache(cache_dir)
+    if clear_cache:
+        cache.clear()
+        click.echo("Cleared the event cache.", err=True)
+    ctx.obj = {
+        "cache": None if no_cache else cache,
+        # Resolved even with --no-cache, for what else lives in the directory
+        "cache_dir": cache.directory,
+        "feed_dir": os.path.join(cache.directory, "feeds"),
+    }
+
+    if ctx.invoked_subcommand is None and not clear_cache:
+        click.echo(ctx.get_help())
 
 
 @cli.command(name="sync")
 @click.option(
     "--from_file",
-    type=click.Path(exists=True),
+    type=Source(),
     required=True,
-    help="Path to the source ICS file (e.g., Calendar A)",
+    help="Path or http(s) URL of the source ICS file (e.g., Calendar A)",
 )
 @click.option(
     "--to_file",
-    type=click.Path(exists=True),
+    type=Source(),
     required=True,
-    help="Path to the destination ICS file (e.g., Calendar B)",
+    help="Path or http(s) URL of the destination ICS file (e.g., Calendar B)",
 )
 @click.option(
     "--output",
@@ -34,15 +159,168 @@ def cli():
     type=str,
     help="Prefix to add to event summaries when importing (e.g., '[Synced]')",
 )
-def sync(from_file, to_file, output, add_prefix):
+@click.option(
+    "--filter-prefix",
+    type=str,
+    help="Skip source events whose summary starts with this prefix",
+)
+@click.option(
+    "--include",
+    metavar="REGEX",
+    multiple=True,
+    help="Only sync source events whose summary matches (repeatable)",
+)
+@click.option(
+    "--exclude",
+    metavar="REGEX",
+    multiple=True,
+    help="Skip source events whose summary matches (repeatable)",
+)
+@click.option(
+    "--category",
+    "categories",
+    multiple=True,
+    help="Only sync source events in one of these categories (repeatable)",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    help="Skip source events that end before this time (UTC)",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(),
+    help="Skip source events that start at or after this time (UTC)",
+)
+@click.option(
+    "--rewrite",
+    "rewrites",
+    nargs=2,
+    multiple=True,
+    metavar="REGEX REPLACEMENT",
+    help="Replace matches in source event summaries, as re.sub (repeatable)",
+)
+@click.option(
+    "--strip",
+    metavar="FIELD",
+    multiple=True,
+    help="Remove a property or component, e.g. DESCRIPTION or VALARM (repeatable)",
+)
+@click.option(
+    "--mmap",
+    "use_mmap",
+    is_flag=True,
+    help="Memory-map the input files and only parse the events that are used",
+)
+@click.option(
+    "--state-file",
+    type=click.Path(dir_okay=False),
+    help="Sync incrementally, keeping fingerprints of synced events in this file",
+)
+@click.option(
+    "--memory-budget",
+    type=click.IntRange(min=1),
+    metavar="MB",
+    help="Sync through sorted run files on disk, keeping at most this many MB "
+    "of events in memory",
+)
+@click.option(
+    "--temp-dir",
+    type=click.Path(file_okay=False, exists=True),
+    help="Directory for the run files of --memory-budget (default: system temp)",
+)
+@click.pass_obj
+def sync(
+    obj,
+    from_file,
+    to_file,
+    output,
+    add_prefix,
+    filter_prefix,
+    include,
+    exclude,
+    categories,
+    since,
+    until,
+    rewrites,
+    strip,
+    use_mmap,
+    state_file,
+    memory_budget,
+    temp_dir,
+):
     """
     Sync calendar events from source to destination,
     adding prefixes or replacing event summaries as needed.
+
+    Source events are filtered by --filter-prefix, --include, --exclude,
+    --category and --since/--until, then rewritten by --rewrite and --strip,
+    and finally get --add-prefix if they are new to the destination.
     """
+    from calendar_sync.external_sync import external_sync
+    from calendar_sync.file_writer import write_ics_file
+    from calendar_sync.incremental import incremental_sync
+    from calendar_sync.sync import sync_ics_files
+
+    pipeline = build_pipeline(
+        include, exclude, categories, since, until, rewrites, strip
+    )
+    if state_file and pipeline:
+        raise click.UsageError(
+            "--state-file only supports the --add-prefix and --filter-prefix stages."
+        )
+    if state_file and memory_budget:
+        raise click.UsageError("--state-file cannot be used with --memory-budget.")
+
     click.echo(f"Syncing events from {from_file} to {to_file}")
+    from_file, to_file = fetch_sources(obj, [from_file, to_file])
+
+    if state_file:
+        result = incremental_sync(
+            from_file,
+            to_file,
+            output,
+            state_file,
+            add_prefix=add_prefix,
+            filter_prefix=filter_prefix,
+        )
+        if result["full"]:
+            click.echo(f"No usable sync state, synced all {result['changed']} events")
+        else:
+            click.echo(f"Updated {result['changed']} changed events")
+        click.echo(f"Synced calendar saved to {output}")
+        return
+
+    if memory_budget:
+        result = external_sync(
+            from_file,
+            to_file,
+            output,
+            add_prefix=add_prefix,
+            filter_prefix=filter_prefix,
+            pipeline=pipeline,
+            memory_budget=memory_budget * 1024 * 1024,
+            temp_dir=temp_dir,
+        )
+        for line in pipeline.summary():
+            click.echo(line)
+        click.echo(
+            f"Synced {result['events']} events through {result['runs']} run files"
+        )
+        click.echo(f"Synced calendar saved to {output}")
+        return
 
-    # Sync the two calendars, applying prefix and replace options if provided
-    new_cal = sync_ics_files(from_file, to_file, add_prefix=add_prefix)
+    # Sync the two calendars, running the source events through the pipeline
+    new_cal = sync_ics_files(
+        from_file,
+        to_file,
+        add_prefix=add_prefix,
+        filter_prefix=filter_prefix,
+        use_mmap=use_mmap,
+        pipeline=pipeline,
+    )
+    for line in pipeline.summary():
+        click.echo(line)
 
     # Write the merged/updated calendar to the output file
     write_ics_file(new_cal, output)
@@ -50,36 +328,497 @@ def sync(from_file, to_file, output, add_prefix):
 
 
 @cli.command(name="check_conflicts")
+@click.option(
+    "--from_file",
+    type=Source(),
+    help="Path or http(s) URL of the first ICS file (e.g., Calendar A)",
+)
+@click.option(
+    "--to_file",
+    type=Source(),
+    help="Path or http(s) URL of the second ICS file (e.g., Calendar B)",
+)
+@click.option(
+    "--calendar",
+    "calendars",
+    type=Source(),
+    multiple=True,
+    help="Path or URL of an ICS file to check against all other calendars "
+    "(repeatable)",
+)
+@click.option(
+    "--days", type=int, default=7, help="Number of days ahead to check for conflicts"
+)
+@click.option(
+    "--mmap",
+    "use_mmap",
+    is_flag=True,
+    help="Memory-map the input files and only parse events inside the window",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to parse the calendars with",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(FORMATS),
+    default="text",
+    show_default=True,
+    help="Write conflicts as text, JSON Lines or CSV, as they are found",
+)
+@click.option(
+    "--summary",
+    is_flag=True,
+    help="Only count conflicts and double-booked time, per calendar pair and day",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    help="Check the X days from this time (UTC) instead of from now",
+)
+@click.option(
+    "--db",
+    type=click.Path(dir_okay=False, exists=True),
+    help="Read calendars indexed over the window from this `index` database",
+)
+@click.pass_obj
+def check_conflicts_cmd(
+    obj,
+    from_file,
+    to_file,
+    calendars,
+    days,
+    use_mmap,
+    jobs,
+    output_format,
+    summary,
+    since,
+    db,
+):
+    """
+    Check for conflicting events between two ICS files within the next X days,
+    or between every pair of calendars given with --calendar.
+    """
+    from calendar_sync.conflict_checker import (
+        iter_conflicts,
+        load_calendars,
+        summarize_conflicts,
+    )
+    from calendar_sync.conflict_writer import write_conflicts, write_summary
+    from calendar_sync.recurrence import to_utc
+
+    if use_mmap and jobs > 1:
+        raise click.UsageError("--mmap cannot be used with --jobs.")
+
+    # Keep stdout for the conflicts themselves when they are for another tool
+    status = output_format != "text"
+    window = f"for {days} days from {since}" if since else f"for the next {days} days"
+    if calendars:
+        files = [f for f in (from_file, to_file) if f] + list(calendars)
+        click.echo(
+            f"Checking conflicts between {len(files)} calendars {window}",
+            err=status,
+        )
+    elif from_file and to_file:
+        files = [from_file, to_file]
+        click.echo(
+            f"Checking conflicts between {from_file} and {to_file} {window}",
+            err=status,
+        )
+    else:
+        raise click.UsageError(
+            "Provide both --from_file and --to_file, or use --calendar."
+        )
+
+    local = fetch_sources(obj, files)
+    if calendars:
+        # A calendar given twice is only checked once
+        first = {}
+        for i, path in enumerate(local):
+            first.setdefault(path, i)
+        positions = list(first.values())
+    else:
+        # The two files are checked against each other even if they are the same
+        positions = [0, 1]
+    event_db = None
+    if db:
+        from calendar_sync.event_db import EventDB
+
+        event_db = EventDB(db)
+    try:
+        loaded = load_calendars(
+            list(dict.fromkeys(local)),
+            days,
+            use_mmap=use_mmap,
+            cache=obj["cache"],
+            jobs=jobs,
+            start=since and to_utc(since),
+            db=event_db,
+        )
+    finally:
+        if event_db is not None:
+            event_db.close()
+    checked = {i: loaded[local[i]] for i in positions}
+
+    # Label conflicts with the names given, not where feeds were downloaded to
+    stream = sys.stdout
+    if summary:
+        result = summarize_conflicts(checked)
+        for pair in result["calendars"]:
+            pair["calendar1"] = files[pair["calendar1"]]
+            pair["calendar2"] = files[pair["calendar2"]]
+        write_summary(result, stream, output_format)
+        stream.flush()
+        return
+
+    count = write_conflicts(
+        (
+            (files[i1], event1, files[i2], event2)
+            for i1, event1, i2, event2 in iter_conflicts(checked)
+        ),
+        stream,
+        output_format,
+        tagged=bool(calendars),
+    )
+    stream.flush()
+
+    if count:
+        click.echo(f"Found {count} conflicts.", err=status)
+    else:
+        click.echo("No conflicts found.", err=status)
+
+
+@cli.command(name="index")
+@click.argument("sources", nargs=-1, type=Source())
+@click.option(
+    "--db",
+    type=click.Path(dir_okay=False),
+    help="SQLite database to index into (default: events.sqlite in the cache dir)",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    help="Index events from this time (UTC, default: a year ago)",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(),
+    help="Index events until this time (UTC, default: a year from now)",
+)
+@click.option(
+    "--uid",
+    "uids",
+    multiple=True,
+    help="Print the indexed events with this UID in any calendar (repeatable)",
+)
+@click.pass_obj
+def index_cmd(obj, sources, db, since, until, uids):
+    """
+    Load the events of ICS files into a SQLite database, indexed by time and
+    UID, for check_conflicts --db and UID lookups across calendars.
+    """
+    from calendar_sync.event_db import EventDB, default_db_path
+    from calendar_sync.recurrence import to_utc
+
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    since = to_utc(since) if since else now - timedelta(days=365)
+    until = to_utc(until) if until else now + timedelta(days=365)
+    db = db or default_db_path(obj["cache_dir"])
+
+    with EventDB(db) as event_db:
+        for source, ics_file in zip(sources, fetch_sources(obj, list(sources))):
+            count = event_db.index(ics_file, since, until, cache=obj["cache"])
+            click.echo(f"Indexed {count} events from {source} into {db}")
+        for uid in uids:
+            events = event_db.events_by_uid(uid)
+            click.echo(f"{len(events)} events with UID {uid}:")
+            for ics_file, event in events:
+                click.echo(
+                    f"- {ics_file}: {event['summary']} "
+                    f"{event['start']:%Y-%m-%d %H:%M} to "
+                    f"{event['end']:%Y-%m-%d %H:%M} UTC"
+                )
+
+
+@cli.command(name="freebusy")
+@click.option(
+    "--calendar",
+    "calendars",
+    type=Source(),
+    multiple=True,
+    required=True,
+    help="Path or URL of an ICS file to include (repeatable)",
+)
+@click.option(
+    "--days", type=int, default=7, help="Number of days ahead to list busy time for"
+)
+@click.option(
+    "--all",
+    "require_all",
+    is_flag=True,
+    help="Only count time as busy when every calendar is busy",
+)
+@click.option(
+    "--at",
+    type=click.DateTime(),
+    help="Only report whether the calendars are busy at this time (UTC)",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(),
+    help="With --at, report whether the calendars are busy at any point until then",
+)
+@click.option(
+    "--output",
+    type=click.Path(),
+    help="Write the busy time as a VFREEBUSY calendar to this file",
+)
+@click.pass_obj
+def freebusy(obj, calendars, days, require_all, at, until, output):
+    """
+    Show when the calendars are busy within the next X days, or whether they
+    are busy at a given time.
+    """
+    from calendar_sync.file_writer import write_ics_file
+    from calendar_sync.freebusy import intersection, load_busy, to_vfreebusy, union
+    from calendar_sync.recurrence import to_utc
+
+    if until is not None and at is None:
+        raise click.UsageError("--until can only be used with --at.")
+    # Only the time asked about is indexed, along with events still running then
+    if at is not None:
+        window_start = to_utc(at)
+        window_end = to_utc(until) if until else window_start + timedelta(seconds=1)
+        if window_end <= window_start:
+            raise click.UsageError("--until must be after --at.")
+    else:
+        window_start = datetime.now(timezone.utc).replace(microsecond=0)
+        window_end = window_start + timedelta(days=days)
+
+    files = fetch_sources(obj, list(calendars))
+    indexes = [
+        load_busy(ics_file, window_start, window_end, cache=obj["cache"])
+        for ics_file in files
+    ]
+    index = intersection(indexes) if require_all else union(indexes)
+
+    if at is not None:
+        if until is None:
+            busy = index.is_busy(int(window_start.timestamp()))
+        else:
+            busy = index.overlaps(
+                int(window_start.timestamp()), int(window_end.timestamp())
+            )
+        click.echo("busy" if busy else "free")
+        return
+
+    click.echo(f"Busy {len(index)} times in the next {days} days:")
+    for start, end in index:
+        click.echo(
+            f"- {datetime.fromtimestamp(start, timezone.utc):%Y-%m-%d %H:%M} to "
+            f"{datetime.fromtimestamp(end, timezone.utc):%Y-%m-%d %H:%M} UTC"
+        )
+
+    if output:
+        write_ics_file(to_vfreebusy(index, window_start, window_end), output)
+        click.echo(f"Free/busy calendar saved to {output}")
+
+
+@cli.command(name="serve")
+@click.option(
+    "--calendar",
+    "calendars",
+    type=Source(),
+    multiple=True,
+    required=True,
+    help="Path or URL of an ICS file to serve queries for (repeatable)",
+)
+@click.option("--host", default=DEFAULT_HOST, show_default=True, help="Address to bind")
+@click.option(
+    "--port", type=int, default=DEFAULT_PORT, show_default=True, help="Port to bind"
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=DEFAULT_DAYS,
+    show_default=True,
+    help="Number of days from today to keep events in memory for",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=DEFAULT_INTERVAL,
+    show_default=True,
+    help="Seconds between checks of the calendar files",
+)
+@click.option(
+    "--debounce",
+    type=float,
+    default=DEFAULT_DEBOUNCE,
+    show_default=True,
+    help="Seconds a changed file must stay unchanged before it is reloaded",
+)
+@click.pass_obj
+def serve_cmd(obj, calendars, host, port, days, interval, debounce):
+    """
+    Load the calendars into memory once and answer conflict, free/busy and
+    event queries over a local HTTP/JSON API, reloading changed files.
+    """
+    from calendar_sync.server import CalendarService, serve
+
+    # Queries name calendars as given, not where feeds were downloaded to
+    files = fetch_sources(obj, list(calendars))
+    service = CalendarService(dict(zip(calendars, files)), days, cache=obj["cache"])
+    counts = "  ".join(
+        f"{name} {len(index)}" for name, index in service.indexes.items()
+    )
+    click.echo(f"Loaded {len(service.indexes)} calendars: {counts}")
+
+    def report(names, error):
+        if error is not None:
+            click.echo(f"Reload failed, keeping the loaded events: {error}", err=True)
+        elif names:
+            click.echo(f"Reloaded {', '.join(names)}")
+
+    service.watch(interval, debounce, report)
+
+    def ready(bound_host, bound_port):
+        click.echo(f"Serving on http://{bound_host}:{bound_port}, press Ctrl+C to stop")
+
+    try:
+        serve(service, host, port, ready)
+    except KeyboardInterrupt:
+        click.echo(f"Stopped after {service.reloads} reloads")
+
+
+@cli.command(name="batch")
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=DEFAULT_JOBS,
+    show_default=True,
+    help="Number of independent outputs to sync at the same time",
+)
+@click.pass_obj
+def batch(obj, manifest, jobs):
+    """
+    Sync every source and destination pair listed in a YAML or JSON manifest,
+    parsing each calendar once and writing each output once.
+    """
+    from calendar_sync.batch import ManifestError, load_manifest, run_batch
+
+    try:
+        pairs = load_manifest(manifest)
+        sources = [pair[key] for pair in pairs for key in ("from", "to")]
+        local = dict(zip(sources, fetch_sources(obj, sources)))
+        for pair in pairs:
+            pair["from"], pair["to"] = local[pair["from"]], local[pair["to"]]
+        counts = run_batch(pairs, jobs=jobs)
+    except (ManifestError, OSError) as e:
+        raise click.ClickException(str(e))
+
+    for output, count in counts.items():
+        click.echo(f"Synced {count} events to {output}")
+    click.echo(
+        f"Synced {len(pairs)} pairs into {len(counts)} outputs "
+        f"from {len(set(sources))} calendars"
+    )
+
+
+@cli.command(name="watch")
 @click.option(
     "--from_file",
     type=click.Path(exists=True),
     required=True,
-    help="Path to the first ICS file (e.g., Calendar A)",
+    help="Path to the source ICS file (e.g., Calendar A)",
 )
 @click.option(
     "--to_file",
     type=click.Path(exists=True),
     required=True,
-    help="Path to the second ICS file (e.g., Calendar B)",
+    help="Path to the destination ICS file (e.g., Calendar B)",
 )
 @click.option(
-    "--days", type=int, default=7, help="Number of days ahead to check for conflicts"
+    "--output",
+    type=click.Path(),
+    help="Sync into this ICS file whenever an input changes",
+)
+@click.option(
+    "--add-prefix",
+    type=str,
+    help="Prefix to add to event summaries when importing (e.g., '[Synced]')",
+)
+@click.option(
+    "--days",
+    type=int,
+    help="Check for conflicts this many days ahead whenever an input changes",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=DEFAULT_INTERVAL,
+    show_default=True,
+    help="Seconds between checks of the input files",
+)
+@click.option(
+    "--debounce",
+    type=float,
+    default=DEFAULT_DEBOUNCE,
+    show_default=True,
+    help="Seconds a changed file must stay unchanged before it is processed",
 )
-def check_conflicts_cmd(from_file, to_file, days):
+def watch_cmd(from_file, to_file, output, add_prefix, days, interval, debounce):
     """
-    Check for conflicting events between two ICS files within the next X days.
+    Keep the calendars in memory and re-sync or re-check conflicts
+    whenever one of the input files changes.
     """
-    click.echo(
-        f"Checking conflicts between {from_file} and {to_file} for the next {days} days"
+    from calendar_sync.watch import FileWatcher, WatchSession, watch
+
+    if not output and days is None:
+        raise click.UsageError("Provide --output to sync, --days to check, or both.")
+
+    session = WatchSession(
+        from_file, to_file, output=output, add_prefix=add_prefix, days=days
     )
-    conflicts = check_conflicts(from_file, to_file, days)
+    watcher = FileWatcher(session.files, interval=interval, debounce=debounce)
 
-    if conflicts:
-        click.echo(f"Found {len(conflicts)} conflicts:")
-        for event1, event2 in conflicts:
-            click.echo(f"- Conflict: {event1['summary']} vs {event2['summary']}")
-    else:
-        click.echo("No conflicts found.")
+    def report(stats):
+        if "error" in stats:
+            click.echo(
+                f"Cycle {stats['cycle']} failed, keeping the last good calendars: "
+                f"{stats['error']}",
+                err=True,
+            )
+            return
+        stages = "  ".join(
+            f"{stage} {stats[stage]:.3f}s"
+            for stage in ("parse", "sync", "write", "check", "total")
+            if stage in stats
+        )
+        click.echo(f"Cycle {stats['cycle']}: {stats['changed']} changed  {stages}")
+        if "events" in stats:
+            click.echo(f"Synced {stats['events']} events to {output}")
+        if stats.get("conflicts"):
+            click.echo(f"Found {len(stats['conflicts'])} conflicts:")
+            for event1, event2 in stats["conflicts"]:
+                click.echo(f"- Conflict: {event1['summary']} vs {event2['summary']}")
+        elif "conflicts" in stats:
+            click.echo("No conflicts found.")
+
+    click.echo(f"Watching {from_file} and {to_file}, press Ctrl+C to stop")
+    try:
+        watch(session, watcher, report)
+    except KeyboardInterrupt:
+        totals = "  ".join(
+            f"{stage} {seconds:.3f}s" for stage, seconds in session.totals.items()
+        )
+        click.echo(f"Stopped after {session.cycles} cycles  {totals}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+# Midnight (UTC) at the start of tomorrow, for events that must be upcoming
+TOMORROW = datetime.now(timezone.utc).replace(
+    hour=0, minute=0, second=0, microsecond=0
+) + timedelta(days=1)
+
+
+def write_calendar(
+    path,
+    events,
+    start=datetime(2024, 9, 25, tzinfo=timezone.utc),
+    dtstamp=None,
+    extra_lines=(),
+):
+    """
+    Write an ICS file with the given events, starting `hour` hours after `start`.
+
+    Events are (uid, summary, hour) or (uid, summary, hour, hours) tuples, an
+    event lasting an hour unless `hours` is given. A plain summary is the i-th
+    event, with UID event-i, starting i hours after `start`. `dtstamp` is added
+    to every event and `extra_lines`, e.g. another VEVENT, after the events.
+    """
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for i, event in enumerate(events):
+        if isinstance(event, str):
+            event = (f"event-{i}", event, i)
+        uid, summary, hour, hours = (event + (1,))[:4]
+        dtstart = start + timedelta(hours=hour)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"SUMMARY:{summary}",
+            dtstart.strftime("DTSTART:%Y%m%dT%H%M%SZ"),
+            (dtstart + timedelta(hours=hours)).strftime("DTEND:%Y%m%dT%H%M%SZ"),
+        ]
+        if dtstamp:
+            lines.append(f"DTSTAMP:{dtstamp}")
+        lines.append("END:VEVENT")
+    lines += extra_lines
+    lines.append("END:VCALENDAR")
+    path.write_text("\r\n".join(lines) + "\r\n", encoding="utf-8")
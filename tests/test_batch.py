@@ -0,0 +1,125 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from icalendar import Calendar
+
+from calendar_sync.batch import ManifestError, load_manifest, plan_batch, run_batch
+from calendar_sync.file_writer import write_ics_file
+from calendar_sync.sync import read_calendar
+from conftest import write_calendar
+
+
+def summaries(path):
+    """Return the summaries of the events in an ICS file."""
+    with open(path, "rb") as f:
+        return sorted(
+            str(e["SUMMARY"]) for e in Calendar.from_ical(f.read()).walk("VEVENT")
+        )
+
+
+def pair(source, destination, output, add_prefix=None):
+    """Build a pair the way load_manifest returns them."""
+    return {
+        "from": str(source),
+        "to": str(destination),
+        "output": str(output),
+        "add_prefix": add_prefix,
+        "filter_prefix": None,
+    }
+
+
+def test_run_batch_parses_each_file_once(tmp_path):
+    """Test that shared calendars are parsed once and each output written once."""
+    team_a, team_b, shared, personal = (
+        tmp_path / name for name in ("a.ics", "b.ics", "shared.ics", "personal.ics")
+    )
+    write_calendar(team_a, [("a-1", "Planning", 9)])
+    write_calendar(team_b, [("b-1", "Review", 10)])
+    write_calendar(shared, [("s-1", "All hands", 11)])
+    write_calendar(personal, [("p-1", "Lunch", 12)])
+    merged, mine, digest = (tmp_path / name for name in ("m.ics", "mine.ics", "d.ics"))
+    pairs = [
+        pair(team_a, shared, merged, "[A] "),
+        pair(team_a, personal, mine, "[Team] "),
+        pair(team_b, shared, merged, "[B] "),
+        # Reads the output the first and third pairs merge into
+        pair(merged, personal, digest),
+    ]
+
+    with (
+        patch(
+            "calendar_sync.batch.read_calendar", side_effect=read_calendar
+        ) as mock_read,
+        patch(
+            "calendar_sync.batch.write_ics_file", side_effect=write_ics_file
+        ) as mock_write,
+    ):
+        counts = run_batch(pairs, jobs=2)
+
+    read = [call.args[0] for call in mock_read.call_args_list]
+    assert sorted(read) == sorted(map(str, (team_a, shared, personal, team_b)))
+    assert sorted(call.args[1] for call in mock_write.call_args_list) == sorted(
+        map(str, (merged, mine, digest))
+    )
+    assert counts == {str(merged): 3, str(mine): 2, str(digest): 4}
+    assert summaries(merged) == ["All hands", "[A] Planning", "[B] Review"]
+    # The prefix for one output does not leak into another
+    assert summaries(mine) == ["Lunch", "[Team] Planning"]
+
+
+def test_plan_batch_rejects_cycles_and_mixed_destinations(tmp_path):
+    """Test that outputs depending on each other or on two destinations fail."""
+    with pytest.raises(ManifestError, match="depend on each other"):
+        plan_batch([pair("a", "x", "y"), pair("b", "y", "x")])
+    with pytest.raises(ManifestError, match="same 'to' calendar"):
+        plan_batch([pair("a", "x", "out"), pair("b", "y", "out")])
+
+    levels = plan_batch([pair("out", "c", "final"), pair("a", "b", "out")])
+    assert [[output for output, _ in level] for level in levels] == [["out"], ["final"]]
+
+
+def test_load_manifest_resolves_paths(tmp_path):
+    """Test that YAML and JSON manifests give the same pairs."""
+    (tmp_path / "manifest.yaml").write_text(
+        "pairs:\n"
+        "  - from: a.ics\n"
+        "    to: shared/b.ics\n"
+        "    add_prefix: '[A] '\n"
+    )
+    (tmp_path / "manifest.json").write_text(
+        json.dumps(
+            {"pairs": [{"from": "a.ics", "to": "shared/b.ics", "add_prefix": "[A] "}]}
+        )
+    )
+
+    expected = [
+        pair(
+            tmp_path / "a.ics",
+            tmp_path / "shared/b.ics",
+            tmp_path / "shared/b.ics",
+            "[A] ",
+        )
+    ]
+    assert load_manifest(str(tmp_path / "manifest.yaml")) == expected
+    assert load_manifest(str(tmp_path / "manifest.json")) == expected
+
+    (tmp_path / "bad.json").write_text(json.dumps({"pairs": [{"from": "a.ics"}]}))
+    with pytest.raises(ManifestError, match="'from' and 'to' are required"):
+        load_manifest(str(tmp_path / "bad.json"))
+
+    (tmp_path / "url.json").write_text(
+        json.dumps(
+            {
+                "pairs": [
+                    {
+                        "from": "a.ics",
+                        "to": "b.ics",
+                        "output": "https://example.com/out.ics",
+                    }
+                ]
+            }
+        )
+    )
+    with pytest.raises(ManifestError, match="'output' must be a local path"):
+        load_manifest(str(tmp_path / "url.json"))
@@ -0,0 +1,80 @@
+import os
+from unittest.mock import patch
+
+from calendar_sync.cache import EventCache
+from calendar_sync.event_loader import load_events, load_records
+from conftest import TOMORROW, write_calendar
+
+
+def test_cache_round_trip_skips_parsing(tmp_path):
+    """Test that a second load of an unchanged file is served from the cache."""
+    ics_file = tmp_path / "calendar.ics"
+    write_calendar(ics_file, ["Stand-up", "Møde"], start=TOMORROW)
+    cache = EventCache(str(tmp_path / "cache"))
+
+    events = load_events(str(ics_file), 7, cache=cache)
+    assert cache.get(str(ics_file)) == load_records(str(ics_file))
+
+    with patch("calendar_sync.event_loader.load_records") as mock_load_records:
+        cached_events = load_events(str(ics_file), 7, cache=cache)
+
+    mock_load_records.assert_not_called()
+    assert cached_events == events
+    assert [event["summary"] for event in cached_events] == ["Stand-up", "Møde"]
+
+
+def test_cache_invalidated_by_content_not_mtime(tmp_path):
+    """Test that touching a file keeps its entry but changing it does not."""
+    ics_file = tmp_path / "calendar.ics"
+    write_calendar(ics_file, ["Stand-up"], start=TOMORROW)
+    cache = EventCache(str(tmp_path / "cache"))
+    fingerprint = cache.fingerprint(str(ics_file))
+    cache.put(str(ics_file), load_records(str(ics_file)), fingerprint)
+
+    stat = os.stat(ics_file)
+    os.utime(ics_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(str(ics_file)) is not None
+
+    write_calendar(ics_file, ["Retro"], start=TOMORROW)
+    os.utime(ics_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    assert cache.get(str(ics_file)) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that old entries are evicted once the cache grows past max_bytes."""
+    cache = EventCache(str(tmp_path / "cache"))
+    first, second = tmp_path / "first.ics", tmp_path / "second.ics"
+    write_calendar(first, ["One"], start=TOMORROW)
+    write_calendar(second, ["Two"], start=TOMORROW)
+
+    fingerprint = cache.fingerprint(str(first))
+    cache.put(str(first), load_records(str(first)), fingerprint)
+    fingerprint = cache.fingerprint(str(second))
+    cache.put(str(second), load_records(str(second)), fingerprint)
+    os.utime(cache._entry_path(str(first)), ns=(0, 0))
+    cache.max_bytes = os.path.getsize(cache._entry_path(str(second)))
+    cache.evict()
+
+    assert cache.get(str(first)) is None
+    assert cache.get(str(second)) is not None
+
+    cache.clear()
+    assert cache.get(str(second)) is None
+
+
+def test_cache_skips_files_changed_while_parsing(tmp_path):
+    """Test that records parsed from old contents are not stored as the new ones."""
+    ics_file = tmp_path / "calendar.ics"
+    write_calendar(ics_file, ["Stand-up"], start=TOMORROW)
+    cache = EventCache(str(tmp_path / "cache"))
+    fingerprint = cache.fingerprint(str(ics_file))
+    records = load_records(str(ics_file))
+
+    stat = os.stat(ics_file)
+    write_calendar(ics_file, ["Retrospective"], start=TOMORROW)
+    os.utime(ics_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.put(str(ics_file), records, fingerprint)
+
+    assert cache.get(str(ics_file)) is None
+    events = load_events(str(ics_file), 7, cache=cache)
+    assert [event["summary"] for event in events] == ["Retrospective"]
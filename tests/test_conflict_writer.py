@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from calendar_sync.conflict_checker import (
+    find_conflicts_multi,
+    iter_conflicts,
+    summarize_conflicts,
+)
+from calendar_sync.conflict_writer import FIELDS, write_conflicts, write_summary
+from sync_calendars import cli
+
+HOUR = timedelta(hours=1)
+
+calendars = {
+    "a.ics": [
+        {
+            "uid": "a-1",
+            "summary": "Standup",
+            "start": datetime(2024, 9, 25, 10),
+            "end": datetime(2024, 9, 25, 11),
+        },
+        {
+            "uid": "a-2",
+            "summary": "Deadline",
+            "start": datetime(2024, 9, 25, 12),
+            "end": datetime(2024, 9, 25, 12),
+        },
+    ],
+    "b.ics": [
+        {
+            "uid": "b-1",
+            "summary": "Review",
+            "start": datetime(2024, 9, 25, 10, 30),
+            "end": datetime(2024, 9, 25, 11, 30),
+        },
+        {
+            "uid": "b-2",
+            "summary": "Release",
+            "start": datetime(2024, 9, 25, 12),
+            "end": datetime(2024, 9, 25, 12),
+        },
+    ],
+}
+
+
+def test_iter_conflicts_is_lazy_and_matches_find_conflicts_multi():
+    """Test that iter_conflicts yields conflicts one at a time, in sweep order."""
+    conflicts = iter_conflicts(calendars)
+
+    first = next(conflicts)
+    assert (first[0], first[1]["uid"], first[2], first[3]["uid"]) == (
+        "a.ics",
+        "a-1",
+        "b.ics",
+        "b-1",
+    )
+    # Zero-length events at the same time are an exact match
+    assert [first] + list(conflicts) == find_conflicts_multi(calendars)
+    assert len(find_conflicts_multi(calendars)) == 2
+
+
+def test_write_conflicts_jsonl_and_csv():
+    """Test that jsonl and csv output have one row per conflict with FIELDS."""
+    stream = io.StringIO()
+    assert write_conflicts(iter_conflicts(calendars), stream, "jsonl") == 2
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert list(rows[0]) == list(FIELDS)
+    assert rows[0]["summary2"] == "Review"
+    assert rows[1]["start1"] == "2024-09-25T12:00:00"
+
+    stream = io.StringIO()
+    assert write_conflicts(iter_conflicts(calendars), stream, "csv") == 2
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert [(row["uid1"], row["uid2"]) for row in rows] == [
+        ("a-1", "b-1"),
+        ("a-2", "b-2"),
+    ]
+
+    stream = io.StringIO()
+    assert write_conflicts(iter(()), stream, "csv") == 0
+    assert stream.getvalue() == ",".join(FIELDS) + "\n"
+
+
+def test_check_conflicts_format_keeps_stdout_for_conflicts(tmp_path, monkeypatch):
+    """Test that with --format jsonl every status message goes to stderr."""
+    monkeypatch.chdir(tmp_path)
+    for name in calendars:
+        (tmp_path / name).write_text("")
+    with patch(
+        "calendar_sync.conflict_checker.load_events",
+        side_effect=list(calendars.values()),
+    ):
+        result = CliRunner().invoke(
+            cli,
+            [
+                "--cache-dir",
+                str(tmp_path / "cache"),
+                "--clear-cache",
+                "--no-cache",
+                "check_conflicts",
+                "--from_file",
+                "a.ics",
+                "--to_file",
+                "b.ics",
+                "--format",
+                "jsonl",
+            ],
+        )
+
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [row["calendar1"] for row in rows] == ["a.ics", "a.ics"]
+    assert "Cleared the event cache." in result.stderr
+    assert "Found 2 conflicts." in result.stderr
+
+
+def test_check_conflicts_of_a_file_against_itself(tmp_path, monkeypatch):
+    """Test that the same file as --from_file and --to_file shows double-bookings."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.ics").write_text("")
+    with patch(
+        "calendar_sync.conflict_checker.load_events",
+        return_value=calendars["a.ics"] + calendars["b.ics"],
+    ) as mock_load_events:
+        result = CliRunner().invoke(
+            cli,
+            ["--no-cache", "check_conflicts", "--from_file", "a.ics"]
+            + ["--to_file", "a.ics", "--format", "csv"],
+        )
+
+    assert result.exit_code == 0, result.output
+    assert mock_load_events.call_count == 1
+    # Each double-booking is found from both sides, as the two-file check always did
+    assert "Found 4 conflicts." in result.stderr
+
+
+def test_summarize_conflicts_matches_iter_conflicts():
+    """Test that summary counts match the listed conflicts on random calendars."""
+    rng = random.Random(7)
+    base = datetime(2024, 9, 25, tzinfo=timezone.utc)
+    for _ in range(50):
+        calendars = {}
+        for name in ("a", "b", "c"):
+            events = []
+            for _ in range(rng.randint(0, 20)):
+                start = base + timedelta(minutes=30 * rng.randint(0, 100))
+                end = start + timedelta(minutes=30 * rng.choice([0, 1, 2, 60]))
+                uid = f"event-{rng.randint(0, 10)}"
+                events.append({"uid": uid, "summary": uid, "start": start, "end": end})
+            calendars[name] = events
+
+        summary = summarize_conflicts(calendars)
+        conflicts = list(iter_conflicts(calendars))
+
+        assert summary["conflicts"] == len(conflicts)
+        pairs = Counter((name1, name2) for name1, _, name2, _ in conflicts)
+        assert {
+            (pair["calendar1"], pair["calendar2"]): pair["conflicts"]
+            for pair in summary["calendars"]
+        } == pairs
+        days = Counter(
+            max(event1["start"], event2["start"]).date().isoformat()
+            for _, event1, _, event2 in conflicts
+        )
+        assert {
+            day["day"]: day["conflicts"] for day in summary["days"] if day["conflicts"]
+        } == days
+
+
+def test_summarize_conflicts_overlap_minutes():
+    """Test that double-booked time is counted once, split at midnight."""
+    base = datetime(2024, 9, 25, 22, tzinfo=timezone.utc)
+    calendars = {
+        "a": [
+            {"uid": "long", "summary": "", "start": base, "end": base + HOUR * 4},
+            {"uid": "copy", "summary": "", "start": base, "end": base + HOUR * 4},
+        ],
+        "b": [
+            # Overlaps both events of a at once, apart from the copy of itself,
+            # and an instant at the start of an event is no conflict
+            {
+                "uid": "late",
+                "summary": "",
+                "start": base + HOUR,
+                "end": base + HOUR * 3,
+            },
+            {"uid": "copy", "summary": "", "start": base, "end": base + HOUR * 4},
+            {"uid": "dot", "summary": "", "start": base, "end": base},
+        ],
+    }
+
+    summary = summarize_conflicts(calendars)
+
+    assert summary["conflicts"] == 3
+    assert summary["overlap_minutes"] == 240
+    assert summary["days"] == [
+        {"day": "2024-09-25", "conflicts": 3, "overlap_minutes": 120},
+        {"day": "2024-09-26", "conflicts": 0, "overlap_minutes": 120},
+    ]
+
+    stream = io.StringIO()
+    write_summary(summary, stream)
+    assert stream.getvalue().splitlines()[:3] == [
+        "3 conflicts between 5 events",
+        "Double-booked for 240 minutes",
+        "- a vs b: 3 conflicts",
+    ]
@@ -1,6 +1,13 @@
+import random
+from datetime import datetime, timedelta
+
 import pytest
 from unittest.mock import patch
-from calendar_sync.conflict_checker import check_conflicts
+from calendar_sync.conflict_checker import (
+    check_conflicts,
+    check_conflicts_multi,
+    find_conflicts,
+)
 
 # Sample event data for testing
 mock_events_file1 = [
@@ -105,3 +112,89 @@ def test_check_conflicts_same_events(mock_load_events):
     # Assert that no conflicts are found
     # (identical events should not be considered conflicts)
     assert len(result) == 0, f"Expected no conflicts, but got {len(result)}"
+
+
+def test_find_conflicts_matches_nested_loop():
+    """Test that the sweep line finds the same pairs as a full pairwise scan."""
+    rng = random.Random(42)
+    base = datetime(2024, 9, 25, 8, 0)
+
+    def random_events(prefix, count):
+        events = []
+        for i in range(count):
+            start = base + timedelta(minutes=15 * rng.randint(0, 40))
+            end = start + timedelta(minutes=15 * rng.randint(0, 8))
+            events.append({"start": start, "end": end, "uid": f"{prefix}-{i}"})
+        # Share a few UIDs between the calendars, these must never conflict
+        events.append({"start": base, "end": base + timedelta(hours=9), "uid": "x"})
+        return events
+
+    events1 = random_events("a", 60)
+    events2 = random_events("b", 60)
+
+    expected = {
+        (e1["uid"], e2["uid"])
+        for e1 in events1
+        for e2 in events2
+        if e1["uid"] != e2["uid"]
+        and (
+            (e1["start"] < e2["end"] and e1["end"] > e2["start"])
+            or (e1["start"] == e2["start"] and e1["end"] == e2["end"])
+        )
+    }
+
+    result = find_conflicts(events1, events2)
+
+    assert {(e1["uid"], e2["uid"]) for e1, e2 in result} == expected
+    assert len(result) == len(expected)
+
+
+def test_check_conflicts_multi(mock_load_events):
+    """Test that every calendar is loaded once and pairs are tagged by file."""
+    mock_events_file3 = [
+        {"start": "2024-09-25 10:45", "end": "2024-09-25 12:15", "uid": "event-5"},
+    ]
+    mock_load_events.side_effect = [
+        mock_events_file1,
+        mock_events_file2,
+        mock_events_file3,
+    ]
+
+    result = check_conflicts_multi(["a.ics", "b.ics", "c.ics", "a.ics"], days=7)
+
+    assert mock_load_events.call_count == 3
+    pairs = {(f1, e1["uid"], f2, e2["uid"]) for f1, e1, f2, e2 in result}
+    assert pairs == {
+        ("a.ics", "event-1", "b.ics", "event-3"),
+        ("a.ics", "event-2", "b.ics", "event-4"),
+        ("a.ics", "event-1", "c.ics", "event-5"),
+        ("a.ics", "event-2", "c.ics", "event-5"),
+        ("b.ics", "event-3", "c.ics", "event-5"),
+        ("b.ics", "event-4", "c.ics", "event-5"),
+    }
+
+
+def test_overlapping_events_of_one_calendar_do_not_conflict():
+    """Test that a calendar's own overlapping events are never paired up."""
+    base = datetime(2024, 9, 25, 8, 0)
+    events1 = [
+        {
+            "start": base + timedelta(minutes=i),
+            "end": base + timedelta(hours=9),
+            "uid": f"a-{i}",
+        }
+        for i in range(500)
+    ]
+    events2 = [
+        {
+            "start": base + timedelta(hours=8),
+            "end": base + timedelta(hours=10),
+            "uid": "b-1",
+        }
+    ]
+
+    assert find_conflicts(events1, []) == []
+    result = find_conflicts(events1, events2)
+    assert [(e1["uid"], e2["uid"]) for e1, e2 in result] == [
+        (f"a-{i}", "b-1") for i in range(500)
+    ]
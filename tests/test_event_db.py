@@ -0,0 +1,111 @@
+import os
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from calendar_sync.conflict_checker import load_calendars
+from calendar_sync.event_db import EventDB
+from calendar_sync.event_loader import load_events
+from conftest import TOMORROW, write_calendar
+from sync_calendars import cli
+
+
+def write_with_series(path, uids):
+    """Write an ICS file with one event per UID starting tomorrow and a series."""
+    series = [
+        "BEGIN:VEVENT",
+        f"UID:series-{path.stem}",
+        "SUMMARY:Weekly",
+        (TOMORROW - timedelta(days=30)).strftime("DTSTART:%Y%m%dT%H%M%SZ"),
+        (TOMORROW - timedelta(days=30, minutes=-30)).strftime("DTEND:%Y%m%dT%H%M%SZ"),
+        "RRULE:FREQ=WEEKLY",
+        "END:VEVENT",
+    ]
+    events = [(uid, f"Event {i}", i) for i, uid in enumerate(uids)]
+    write_calendar(path, events, start=TOMORROW, extra_lines=series)
+
+
+def by_start(event):
+    return event["start"], event["uid"]
+
+
+def window():
+    now = datetime.now(timezone.utc)
+    return now - timedelta(days=60), now + timedelta(days=60)
+
+
+def test_indexed_events_match_load_events(tmp_path):
+    """Test that the database returns what parsing the file does for a window."""
+    ics_file = tmp_path / "a.ics"
+    write_with_series(ics_file, ["event-1", "event-2"])
+
+    with EventDB(str(tmp_path / "events.sqlite")) as db:
+        # Occurrences of the series in the indexed window are stored too
+        assert db.index(str(ics_file), *window()) == 2 + 13
+        events = db.load_events(str(ics_file), 30)
+        expected = load_events(str(ics_file), 30)
+        assert len(events) == len(expected) == 2 + 4
+        assert sorted(events, key=by_start) == sorted(expected, key=by_start)
+
+        # Windows outside the indexed one and changed files are not answered
+        assert db.load_events(str(ics_file), 90) is None
+        os.utime(ics_file, ns=(0, 0))
+        assert db.load_events(str(ics_file), 30) is None
+
+
+def test_events_by_uid_across_calendars(tmp_path):
+    """Test that a UID is found in every calendar and reindexing replaces."""
+    calendar_a, calendar_b = tmp_path / "a.ics", tmp_path / "b.ics"
+    write_with_series(calendar_a, ["shared", "only-a"])
+    write_with_series(calendar_b, ["shared"])
+
+    with EventDB(str(tmp_path / "events.sqlite")) as db:
+        for ics_file in (calendar_a, calendar_b):
+            db.index(str(ics_file), *window())
+        db.index(str(calendar_a), *window())
+
+        found = db.events_by_uid("shared")
+        assert sorted(path for path, _ in found) == [
+            str(calendar_a),
+            str(calendar_b),
+        ]
+        assert len(db.events_by_uid("only-a")) == 1
+
+
+def test_load_calendars_reads_indexed_calendars(tmp_path):
+    """Test that only calendars the database cannot answer for are parsed."""
+    calendar_a, calendar_b = tmp_path / "a.ics", tmp_path / "b.ics"
+    write_with_series(calendar_a, ["event-1"])
+    write_with_series(calendar_b, ["event-2"])
+
+    with EventDB(str(tmp_path / "events.sqlite")) as db:
+        db.index(str(calendar_a), *window())
+        with patch(
+            "calendar_sync.conflict_checker.load_events", return_value=[]
+        ) as mock_load_events:
+            calendars = load_calendars([str(calendar_b), str(calendar_a)], 7, db=db)
+
+    assert list(calendars) == [str(calendar_b), str(calendar_a)]
+    assert mock_load_events.call_count == 1
+    assert mock_load_events.call_args.args[0] == str(calendar_b)
+    assert [event["uid"] for event in calendars[str(calendar_a)]] == [
+        "event-1",
+        "series-a",
+    ]
+
+
+def test_index_keeps_the_database_in_the_cache_dir_without_the_cache(tmp_path):
+    """Test that --no-cache still puts the default database in --cache-dir."""
+    calendar_a = tmp_path / "a.ics"
+    write_with_series(calendar_a, ["event-1"])
+    cache_dir = tmp_path / "cache"
+
+    result = CliRunner().invoke(
+        cli, ["--no-cache", "--cache-dir", str(cache_dir), "index", str(calendar_a)]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert os.listdir(cache_dir) == ["events.sqlite"]
+    with EventDB(str(cache_dir / "events.sqlite")) as db:
+        assert len(db.events_by_uid("event-1")) == 1
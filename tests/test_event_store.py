@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from calendar_sync.event_store import EventStore
+
+
+def test_event_store_uses_epoch_microseconds_for_aware_times():
+    """Test that aware datetimes become UTC epoch microseconds and UIDs ids."""
+    start = datetime(2024, 9, 25, 10, 0, tzinfo=timezone.utc)
+    end = datetime(2024, 9, 25, 11, 0, 0, 500, tzinfo=timezone.utc)
+    events = [
+        {"uid": "event-1", "start": start, "end": end},
+        {"uid": "event-2", "start": start, "end": end},
+    ]
+
+    store = EventStore.from_calendars([events[:1], events + events[:1]])
+
+    assert len(store) == 4
+    assert list(store.starts) == [int(start.timestamp()) * 1_000_000] * 4
+    assert list(store.ends) == [int(end.timestamp()) * 1_000_000 + 500] * 4
+    assert list(store.uids) == [0, 0, 1, 0]
+    assert list(store.calendars) == [0, 1, 1, 1]
+    assert store.events[2] is events[1]
+
+
+def test_event_store_ranks_other_time_values():
+    """Test that times which are not aware datetimes keep their ordering."""
+    events = [
+        {"uid": "event-1", "start": "2024-09-25 12:00", "end": "2024-09-25 13:00"},
+        {"uid": "event-2", "start": "2024-09-25 10:00", "end": "2024-09-25 12:00"},
+    ]
+
+    store = EventStore.from_calendars([events])
+
+    assert list(store.starts) == [1, 0]
+    assert list(store.ends) == [2, 1]
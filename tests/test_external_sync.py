@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from icalendar import Calendar
+
+from calendar_sync.external_sync import RunSpiller, external_sync
+from calendar_sync.file_writer import write_ics_file
+from calendar_sync.pipeline import Pipeline, rewrite_summary
+from calendar_sync.sync import sync_ics_files
+from conftest import write_calendar
+from sync_calendars import cli
+
+
+def events(path):
+    """Return the (uid, summary, start) of every event in the file, in order."""
+    with open(path, "rb") as f:
+        calendar = Calendar.from_ical(f.read())
+    return [
+        (str(event["UID"]), str(event["SUMMARY"]), event["DTSTART"].dt)
+        for event in calendar.walk("VEVENT")
+    ]
+
+
+def test_run_spiller_sorts_in_memory_and_through_runs(tmp_path):
+    """Test that records come back sorted whether or not they were spilled."""
+    records = [(f"uid-{i % 7}".encode(), i, b"x" * i) for i in range(50, 0, -1)]
+
+    in_memory = RunSpiller(str(tmp_path), 1024 * 1024)
+    spilled = RunSpiller(str(tmp_path), 1)
+    for record in records:
+        in_memory.add(*record)
+        spilled.add(*record)
+
+    with patch("calendar_sync.external_sync.MAX_FAN_IN", 4):
+        assert list(spilled.sorted()) == sorted(records)
+    assert list(in_memory.sorted()) == sorted(records)
+    assert in_memory.spilled == 0
+    assert spilled.spilled == 50
+
+
+def test_external_sync_matches_sync_ics_files(tmp_path):
+    """Test that the out-of-core sync writes the events a normal sync does."""
+    source, destination = tmp_path / "a.ics", tmp_path / "b.ics"
+    write_calendar(
+        source,
+        [
+            ("a-1", "Planning", 9),
+            ("shared", "Review", 10),
+            ("a-2", "XYZ: Private", 11),
+            ("a-1", "Planning (again)", 12),
+            ("moved", "Demo", 15),
+            ("a-3", "Team sync", 16),
+        ],
+    )
+    write_calendar(
+        destination,
+        [("b-1", "Lunch", 12), ("shared", "Review", 10), ("moved", "Demo", 14)],
+    )
+    options = {"add_prefix": "[A] ", "filter_prefix": "XYZ:", "check_conflicts": True}
+
+    expected = sync_ics_files(
+        str(source),
+        str(destination),
+        pipeline=Pipeline([rewrite_summary("^Team ", "")]),
+        **options,
+    )
+    write_ics_file(expected, str(tmp_path / "expected.ics"))
+    pipeline = Pipeline([rewrite_summary("^Team ", "")])
+    with patch("calendar_sync.external_sync.MAX_FAN_IN", 2):
+        result = external_sync(
+            str(source),
+            str(destination),
+            str(tmp_path / "out.ics"),
+            pipeline=pipeline,
+            memory_budget=1,
+            temp_dir=str(tmp_path),
+            **options,
+        )
+
+    assert events(tmp_path / "out.ics") == events(tmp_path / "expected.ics")
+    assert ("a-3", "[A] sync") in [
+        (uid, summary) for uid, summary, _ in events(tmp_path / "out.ics")
+    ]
+    assert result["events"] == 5
+    assert result["runs"] > 2
+    assert pipeline.summary() == [
+        "skip_prefix: 1 dropped",
+        "rewrite: 1 changed",
+        "add_prefix: 2 changed",
+    ]
+    # Run files are removed once the output is written
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "a.ics",
+        "b.ics",
+        "expected.ics",
+        "out.ics",
+    ]
+
+
+def test_memory_budget_cannot_be_combined_with_state_file(tmp_path):
+    """Test that --memory-budget refuses --state-file."""
+    source, destination = tmp_path / "a.ics", tmp_path / "b.ics"
+    write_calendar(source, [("a-1", "Planning", 9)])
+    write_calendar(destination, [])
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "sync",
+            "--from_file",
+            str(source),
+            "--to_file",
+            str(destination),
+            "--output",
+            str(tmp_path / "out.ics"),
+            "--memory-budget",
+            "64",
+            "--state-file",
+            str(tmp_path / "state.json"),
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "--memory-budget" in result.output
@@ -0,0 +1,99 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from calendar_sync.feeds import FeedError, FeedFetcher, resolve_sources
+
+FEED = (
+    b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:event-1\r\n"
+    b"DTSTART:20240925T100000Z\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+)
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serves FEED at /<name>.ics with an ETag, and 404 for anything else."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if not self.path.endswith(".ics"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(FEED)))
+        self.end_headers()
+        self.wfile.write(FEED)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FeedHandler)
+        self.requests = []
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+@pytest.fixture
+def server():
+    """Run a stub feed server on localhost for the duration of a test."""
+    server = CountingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_feed_is_not_downloaded_again(server, tmp_path):
+    """Test that a second fetch sends the ETag and keeps the file on a 304."""
+    url = f"http://127.0.0.1:{server.server_port}/team.ics"
+    fetcher = FeedFetcher(str(tmp_path))
+
+    path = fetcher.fetch(url)
+    with open(path, "rb") as f:
+        assert f.read() == FEED
+    mtime_ns = os.stat(path).st_mtime_ns
+
+    assert fetcher.fetch(url) == path
+    fetcher.close()
+
+    assert server.requests[1][1]["If-None-Match"] == '"v1"'
+    assert os.stat(path).st_mtime_ns == mtime_ns
+    # Both requests went over the same pooled connection
+    assert server.connections == 1
+
+
+def test_resolve_sources_fetches_urls_and_keeps_paths(server, tmp_path):
+    """Test that URLs are downloaded concurrently and local paths pass through."""
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/{name}.ics" for name in ("a", "b", "c")]
+
+    paths = resolve_sources(urls + ["local.ics"], str(tmp_path))
+
+    assert paths[-1] == "local.ics"
+    assert len(set(paths[:3])) == 3
+    for path in paths[:3]:
+        with open(path, "rb") as f:
+            assert f.read() == FEED
+
+    with pytest.raises(FeedError, match="HTTP 404"):
+        resolve_sources([f"{base}/missing"], str(tmp_path))
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+import pytest
+from icalendar import Calendar, Event
+
+from calendar_sync.file_writer import write_ics_file
+
+
+def build_calendar(num_events):
+    """Build a calendar with a few top-level properties and some events."""
+    calendar = Calendar()
+    calendar.add("prodid", "-//calendar_sync//EN")
+    calendar.add("version", "2.0")
+    for i in range(num_events):
+        event = Event()
+        event.add("uid", f"event-{i}@example.com")
+        event.add("summary", f"Meeting {i} " + "with a long description " * 4)
+        calendar.add_component(event)
+    return calendar
+
+
+def test_write_ics_file_matches_to_ical(tmp_path):
+    """Test that the streamed output is byte for byte what to_ical returns."""
+    calendar = build_calendar(20)
+    output = tmp_path / "output.ics"
+
+    write_ics_file(calendar, str(output))
+
+    assert output.read_bytes() == calendar.to_ical()
+    assert [path.name for path in tmp_path.iterdir()] == ["output.ics"]
+
+
+def test_write_ics_file_keeps_old_output_on_failure(tmp_path):
+    """Test that a failed write leaves the previous output and no temp file."""
+    output = tmp_path / "output.ics"
+    output.write_bytes(b"previous")
+    calendar = build_calendar(3)
+
+    with (
+        patch.object(Event, "to_ical", side_effect=ValueError("unserializable event")),
+        pytest.raises(ValueError),
+    ):
+        write_ics_file(calendar, str(output))
+
+    assert output.read_bytes() == b"previous"
+    assert [path.name for path in tmp_path.iterdir()] == ["output.ics"]
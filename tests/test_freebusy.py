@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+from click.testing import CliRunner
+from icalendar import Calendar
+
+from calendar_sync.freebusy import BusyIndex, intersection, to_vfreebusy, union
+from sync_calendars import cli
+
+
+def at(hour, minute=0):
+    """Return 2024-09-25 at the given UTC time."""
+    return datetime(2024, 9, 25, hour, minute, tzinfo=timezone.utc)
+
+
+def ts(hour, minute=0):
+    """Return 2024-09-25 at the given UTC time in epoch seconds."""
+    return int(at(hour, minute).timestamp())
+
+
+def test_busy_index_merges_runs_and_answers_queries():
+    """Test that overlapping and adjacent events become one run."""
+    index = BusyIndex.from_events(
+        [
+            {"start": at(10), "end": at(11)},
+            {"start": at(9), "end": at(10)},
+            {"start": at(9, 30), "end": at(9, 45)},
+            {"start": at(14), "end": at(15)},
+            {"start": at(16), "end": at(16)},
+        ]
+    )
+
+    assert list(index) == [(ts(9), ts(11)), (ts(14), ts(15))]
+    assert index.is_busy(ts(10, 59))
+    assert not index.is_busy(ts(11))
+    assert not index.is_busy(ts(16))
+    assert index.overlaps(ts(13), ts(14, 1))
+    assert not index.overlaps(ts(11), ts(14))
+    assert index.free(ts(8), ts(16)) == [
+        (ts(8), ts(9)),
+        (ts(11), ts(14)),
+        (ts(15), ts(16)),
+    ]
+
+
+def test_union_and_intersection():
+    """Test OR and AND of busy time across calendars."""
+    a = BusyIndex([(ts(9), ts(11)), (ts(14), ts(15))])
+    b = BusyIndex([(ts(10), ts(12)), (ts(15), ts(16))])
+    c = BusyIndex([(ts(10, 30), ts(17))])
+
+    assert list(union([a, b])) == [(ts(9), ts(12)), (ts(14), ts(16))]
+    assert list(intersection([a, b])) == [(ts(10), ts(11))]
+    assert list(intersection([a, b, c])) == [(ts(10, 30), ts(11))]
+
+
+def test_to_vfreebusy_lists_busy_periods_in_window():
+    """Test that the VFREEBUSY component holds the busy time clipped to the window."""
+    index = BusyIndex([(ts(8), ts(10)), (ts(14), ts(15)), (ts(20), ts(21))])
+
+    calendar = Calendar.from_ical(to_vfreebusy(index, at(9), at(18)).to_ical())
+
+    (component,) = calendar.walk("VFREEBUSY")
+    periods = [prop.dt for prop in component["FREEBUSY"]]
+    assert periods == [(at(9), at(10)), (at(14), at(15))]
+    assert component["FREEBUSY"][0].params["FBTYPE"] == "BUSY"
+
+
+def test_freebusy_counts_events_that_are_already_running(tmp_path):
+    """Test that a meeting that started before now or --at makes it busy."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    start, end = now - timedelta(minutes=30), now + timedelta(minutes=30)
+    (tmp_path / "a.ics").write_text(
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\nUID:running\r\n"
+        f"SUMMARY:Running\r\nDTSTART:{start:%Y%m%dT%H%M%SZ}\r\n"
+        f"DTEND:{end:%Y%m%dT%H%M%SZ}\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n",
+        encoding="utf-8",
+    )
+
+    def freebusy(*args):
+        return CliRunner().invoke(
+            cli,
+            ["--cache-dir", str(tmp_path / "cache"), "freebusy"]
+            + ["--calendar", str(tmp_path / "a.ics"), *args],
+        )
+
+    assert "Busy 1 times" in freebusy().output
+    later = (now + timedelta(minutes=10)).strftime("%Y-%m-%d %H:%M:%S")
+    assert freebusy("--at", later).output == "busy\n"
+    # The indexed window follows --at, however far it is from --days
+    assert freebusy("--at", "2000-01-01 10:00:00").output == "free\n"
+    assert freebusy("--until", later).exit_code == 2
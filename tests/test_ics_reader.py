@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+
+from calendar_sync.event_loader import load_events
+from calendar_sync.ics_reader import VEventIndex, iter_events, iter_vevent_blocks
+
+ICS = (
+    b"BEGIN:VCALENDAR\r\n"
+    b"VERSION:2.0\r\n"
+    b"BEGIN:VEVENT\r\n"
+    b"UID:event-1\r\n"
+    b"SUMMARY:A very long summary that has been\r\n"
+    b"  folded over two lines\r\n"
+    b"DTSTART:20240925T100000Z\r\n"
+    b"DTEND:20240925T110000Z\r\n"
+    b"BEGIN:VALARM\r\n"
+    b"ACTION:DISPLAY\r\n"
+    b"TRIGGER:-PT15M\r\n"
+    b"END:VALARM\r\n"
+    b"END:VEVENT\r\n"
+    b"BEGIN:VEVENT\r\n"
+    b"UID:event-2\r\n"
+    b"SUMMARY:Old event\r\n"
+    b"DTSTART:20140925T100000Z\r\n"
+    b"DTEND:20140925T110000Z\r\n"
+    b"END:VEVENT\r\n"
+    b"END:VCALENDAR\r\n"
+)
+
+
+def test_iter_vevent_blocks_unfolds_lines(tmp_path):
+    """Test that VEVENT blocks are split out and folded lines are joined."""
+    ics_file = tmp_path / "calendar.ics"
+    ics_file.write_bytes(ICS)
+
+    blocks = list(iter_vevent_blocks(str(ics_file)))
+
+    assert len(blocks) == 2
+    assert b"SUMMARY:A very long summary that has been folded over two lines" in (
+        blocks[0]
+    )
+    assert blocks[0][-1] == b"END:VEVENT"
+
+
+def test_iter_events_skips_events_outside_window(tmp_path):
+    """Test that only events starting inside the window are parsed."""
+    ics_file = tmp_path / "calendar.ics"
+    ics_file.write_bytes(ICS)
+
+    events = list(
+        iter_events(
+            str(ics_file),
+            datetime(2024, 9, 1, tzinfo=timezone.utc),
+            datetime(2024, 10, 1, tzinfo=timezone.utc),
+        )
+    )
+
+    assert [str(event["UID"]) for event in events] == ["event-1"]
+    assert len(events[0].subcomponents) == 1  # The VALARM is kept
+    assert len(list(iter_events(str(ics_file)))) == 2
+
+
+def test_vevent_index_slices_events_on_demand(tmp_path):
+    """Test that the mmap index finds every VEVENT and parses them lazily."""
+    ics_file = tmp_path / "calendar.ics"
+    ics_file.write_bytes(ICS)
+
+    with VEventIndex(str(ics_file)) as index:
+        assert list(index) == ["event-1", "event-2"]
+        assert [index.dtstart(i).year for i in range(2)] == [2024, 2014]
+        assert bytes(index.block(1)).startswith(b"BEGIN:VEVENT\r\nUID:event-2")
+        assert not index._parsed
+
+        event = index["event-2"]
+        assert str(event["SUMMARY"]) == "Old event"
+        assert list(index._parsed) == [1]
+
+
+def test_load_events_with_mmap_matches_streaming(tmp_path):
+    """Test that loading through the mmap index gives the same events."""
+    start = datetime.now(timezone.utc).replace(microsecond=0)
+    lines = [b"BEGIN:VCALENDAR"]
+    for day in range(-5, 20):
+        dtstart = start + timedelta(days=day, hours=1)
+        dtend = dtstart + timedelta(hours=1)
+        lines += [
+            b"BEGIN:VEVENT",
+            f"UID:event-{day}".encode(),
+            f"SUMMARY:Event {day}".encode(),
+            dtstart.strftime("DTSTART:%Y%m%dT%H%M%SZ").encode(),
+            dtend.strftime("DTEND:%Y%m%dT%H%M%SZ").encode(),
+            b"END:VEVENT",
+        ]
+    lines.append(b"END:VCALENDAR")
+    ics_file = tmp_path / "calendar.ics"
+    ics_file.write_bytes(b"\r\n".join(lines) + b"\r\n")
+
+    events = load_events(str(ics_file), 7)
+    mapped_events = load_events(str(ics_file), 7, use_mmap=True)
+
+    assert [event["uid"] for event in events] == [f"event-{day}" for day in range(7)]
+    assert mapped_events == events
@@ -0,0 +1,93 @@
+from icalendar import Calendar
+
+from calendar_sync.incremental import incremental_sync
+from calendar_sync.sync import sync_ics_files
+from conftest import write_calendar
+
+# Exports stamp their events, which the fingerprints leave out
+DTSTAMP = "20240901T000000Z"
+
+
+def summaries(calendar):
+    """Return the (uid, summary) pairs of every event in a calendar."""
+    return {
+        (str(event["UID"]), str(event["SUMMARY"])) for event in calendar.walk("VEVENT")
+    }
+
+
+def test_incremental_sync_matches_full_sync(tmp_path):
+    """Test that patching the previous output gives the same events as a full sync."""
+    source, destination = tmp_path / "a.ics", tmp_path / "b.ics"
+    output, state = tmp_path / "out.ics", tmp_path / "state.json"
+    write_calendar(
+        source, [("a-1", "Planning", 9), ("a-2", "Review", 10)], dtstamp=DTSTAMP
+    )
+    write_calendar(
+        destination, [("b-1", "Lunch", 12), ("a-2", "Review", 10)], dtstamp=DTSTAMP
+    )
+
+    args = (str(source), str(destination), str(output), str(state))
+    first = incremental_sync(*args, add_prefix="[A] ")
+    assert first["full"] is True
+
+    assert incremental_sync(*args, add_prefix="[A] ") == {"full": False, "changed": 0}
+
+    # Rename one event, add one and remove one
+    write_calendar(
+        source,
+        [("a-1", "Planning (moved)", 9), ("a-2", "Review", 10), ("a-3", "Demo", 14)],
+        dtstamp=DTSTAMP,
+    )
+    write_calendar(destination, [("a-2", "Review", 10)], dtstamp=DTSTAMP)
+    second = incremental_sync(*args, add_prefix="[A] ")
+
+    assert second == {"full": False, "changed": 3}
+    expected = sync_ics_files(str(source), str(destination), add_prefix="[A] ")
+    with open(output, "rb") as f:
+        patched = Calendar.from_ical(f.read())
+    assert summaries(patched) == summaries(expected)
+    assert ("a-1", "[A] Planning (moved)") in summaries(patched)
+
+
+def test_incremental_sync_rebuilds_when_options_change(tmp_path):
+    """Test that a sync with different options does not reuse the state."""
+    source, destination = tmp_path / "a.ics", tmp_path / "b.ics"
+    output, state = tmp_path / "out.ics", tmp_path / "state.json"
+    write_calendar(source, [("a-1", "Planning", 9)], dtstamp=DTSTAMP)
+    write_calendar(destination, [("b-1", "Lunch", 12)], dtstamp=DTSTAMP)
+    args = (str(source), str(destination), str(output), str(state))
+
+    incremental_sync(*args, add_prefix="[A] ")
+    result = incremental_sync(*args, add_prefix="[B] ")
+
+    assert result["full"] is True
+
+
+def test_incremental_sync_of_an_event_without_summary(tmp_path):
+    """Test that a new event without SUMMARY is prefixed as in a full sync."""
+    source, destination = tmp_path / "a.ics", tmp_path / "b.ics"
+    output, state = tmp_path / "out.ics", tmp_path / "state.json"
+    write_calendar(source, [("a-1", "Planning", 9)], dtstamp=DTSTAMP)
+    write_calendar(destination, [("b-1", "Lunch", 12)], dtstamp=DTSTAMP)
+    args = (str(source), str(destination), str(output), str(state))
+    incremental_sync(*args, add_prefix="[A] ")
+
+    untitled = [
+        "BEGIN:VEVENT",
+        "UID:a-2",
+        "DTSTART:20240925T140000Z",
+        "DTEND:20240925T150000Z",
+        f"DTSTAMP:{DTSTAMP}",
+        "END:VEVENT",
+    ]
+    write_calendar(
+        source, [("a-1", "Planning", 9)], dtstamp=DTSTAMP, extra_lines=untitled
+    )
+    result = incremental_sync(*args, add_prefix="[A] ")
+
+    assert result == {"full": False, "changed": 1}
+    expected = sync_ics_files(str(source), str(destination), add_prefix="[A] ")
+    with open(output, "rb") as f:
+        patched = Calendar.from_ical(f.read())
+    assert summaries(patched) == summaries(expected)
+    assert ("a-2", "[A] ") in summaries(patched)
@@ -0,0 +1,58 @@
+from click.testing import CliRunner
+
+from calendar_sync.event_loader import load_events, load_records
+from calendar_sync.parallel import load_events_parallel, split_ics_file
+from conftest import TOMORROW, write_calendar
+from sync_calendars import cli
+
+
+def test_split_ics_file_keeps_every_event(tmp_path):
+    """Test that chunks start at VEVENT boundaries and hold all events once."""
+    ics_file = tmp_path / "calendar.ics"
+    write_calendar(ics_file, [f"Event {i}" for i in range(50)], start=TOMORROW)
+
+    ranges = split_ics_file(str(ics_file), 4)
+    assert len(ranges) == 4
+    data = ics_file.read_bytes()
+    assert all(data[start:].startswith(b"BEGIN:VEVENT") for start, _ in ranges[1:])
+
+    records = []
+    for byte_range in ranges:
+        records += load_records(str(ics_file), byte_range=byte_range)
+    assert records == load_records(str(ics_file))
+
+
+def test_load_events_parallel_matches_load_events(tmp_path, monkeypatch):
+    """Test that parsing split files in worker processes gives the same events."""
+    monkeypatch.setattr("calendar_sync.parallel.MIN_CHUNK_BYTES", 1024)
+    files = []
+    for name in ("a.ics", "b.ics"):
+        ics_file = tmp_path / name
+        write_calendar(ics_file, [f"{name} {i}" for i in range(40)], start=TOMORROW)
+        files.append(str(ics_file))
+
+    calendars = load_events_parallel(files, 7, jobs=2)
+
+    assert list(calendars) == files
+    for ics_file in files:
+        assert calendars[ics_file] == load_events(ics_file, 7)
+
+
+def test_check_conflicts_rejects_jobs_with_mmap(tmp_path):
+    """Test that --mmap is not silently dropped when parsing in processes."""
+    write_calendar(tmp_path / "a.ics", ["Planning"], start=TOMORROW)
+    write_calendar(tmp_path / "b.ics", ["Review"], start=TOMORROW)
+
+    result = CliRunner().invoke(
+        cli,
+        ["--no-cache", "check_conflicts", "--mmap", "--jobs", "2"]
+        + [
+            "--from_file",
+            str(tmp_path / "a.ics"),
+            "--to_file",
+            str(tmp_path / "b.ics"),
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "--mmap cannot be used with --jobs" in result.stderr
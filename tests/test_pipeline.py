@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from icalendar import Alarm, Calendar, Event
+
+from calendar_sync import pipeline
+from calendar_sync.sync import sync_ics_files
+
+
+def make_event(uid, summary, day, categories=None):
+    event = Event()
+    event.add("UID", uid)
+    event.add("SUMMARY", summary)
+    event.add("DESCRIPTION", "Private notes")
+    event.add("DTSTART", datetime(2024, 9, day, 9, tzinfo=timezone.utc))
+    event.add("DTEND", datetime(2024, 9, day, 10, tzinfo=timezone.utc))
+    if categories:
+        event.add("CATEGORIES", categories)
+    event.add_component(Alarm())
+    return event
+
+
+def test_stages_drop_and_copy_events():
+    """Test that stages drop events or change copies, counting what they did."""
+    events = [
+        make_event("1", "Team standup", 25, ["Work"]),
+        make_event("2", "Dentist", 26, ["Home"]),
+        make_event("3", "Team retro", 30, ["work"]),
+        make_event("4", "Team offsite", 27, ["Work", "Travel"]),
+    ]
+    flow = pipeline.Pipeline(
+        [
+            pipeline.in_categories(["WORK"]),
+            pipeline.match_summary("offsite", exclude=True),
+            pipeline.in_window(None, datetime(2024, 9, 28, tzinfo=timezone.utc)),
+            pipeline.rewrite_summary(r"^Team ", ""),
+            pipeline.strip_fields(["description", "VALARM"]),
+        ]
+    )
+
+    result = list(flow.run((str(event["UID"]), event) for event in events))
+
+    assert [(uid, str(event["SUMMARY"])) for uid, event in result] == [("1", "standup")]
+    assert "DESCRIPTION" not in result[0][1] and not result[0][1].subcomponents
+    # The source event itself is left alone
+    assert str(events[0]["SUMMARY"]) == "Team standup"
+    assert "DESCRIPTION" in events[0] and events[0].subcomponents
+    assert flow.summary() == [
+        "category: 1 dropped",
+        "exclude: 1 dropped",
+        "window: 1 dropped",
+        "rewrite: 1 changed",
+        "strip: 1 changed",
+    ]
+
+
+def test_sync_runs_pipeline_without_printing_each_event(capsys):
+    """Test that sync prefixes new events through the pipeline quietly."""
+    from_cal, to_cal = Calendar(), Calendar()
+    for uid, summary in [("shared", "Planning"), ("new", "Review"), ("x", "XYZ: 1")]:
+        from_cal.add_component(make_event(uid, summary, 25))
+    to_cal.add_component(make_event("shared", "Planning", 25))
+    flow = pipeline.Pipeline([pipeline.strip_fields(["DESCRIPTION"])])
+
+    with patch("calendar_sync.sync.read_calendar") as mock_read_calendar:
+        mock_read_calendar.side_effect = [to_cal, from_cal]
+        new_cal = sync_ics_files(
+            "from.ics",
+            "to.ics",
+            add_prefix="[A] ",
+            filter_prefix="XYZ:",
+            pipeline=flow,
+        )
+
+    assert [str(event["SUMMARY"]) for event in new_cal.walk("VEVENT")] == [
+        "Planning",
+        "[A] Review",
+    ]
+    assert flow.summary() == [
+        "skip_prefix: 1 dropped",
+        "strip: 2 changed",
+        "add_prefix: 1 changed",
+    ]
+    assert capsys.readouterr().out == ""
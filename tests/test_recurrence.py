@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+
+from icalendar import Event
+
+from calendar_sync.conflict_checker import check_conflicts
+from calendar_sync.event_loader import load_events
+from calendar_sync.recurrence import iter_occurrences
+
+UTC = timezone.utc
+
+
+def make_event(*lines):
+    """Parse a VEVENT from its content lines."""
+    body = "\r\n".join(["BEGIN:VEVENT", "UID:series", *lines, "END:VEVENT"])
+    return Event.from_ical(body + "\r\n")
+
+
+def test_iter_occurrences_applies_rdate_and_exdate():
+    """Test that RDATE adds and EXDATE removes occurrences of a daily series."""
+    event = make_event(
+        "DTSTART:20240902T090000Z",
+        "DTEND:20240902T093000Z",
+        "RRULE:FREQ=DAILY;UNTIL=20240906",
+        "EXDATE:20240904T090000Z",
+        "RDATE:20240910T120000Z",
+    )
+
+    occurrences = list(
+        iter_occurrences(
+            event, datetime(2024, 9, 1, tzinfo=UTC), datetime(2024, 9, 30, tzinfo=UTC)
+        )
+    )
+
+    assert [start.day for start, _ in occurrences] == [2, 3, 5, 6, 10]
+    assert occurrences[-1] == (
+        datetime(2024, 9, 10, 12, 0, tzinfo=UTC),
+        datetime(2024, 9, 10, 12, 30, tzinfo=UTC),
+    )
+
+
+def test_iter_occurrences_is_bounded_by_window():
+    """Test that an endless series only yields occurrences inside the window."""
+    event = make_event(
+        "DTSTART;TZID=Europe/Copenhagen:20100104T100000",
+        "DTEND;TZID=Europe/Copenhagen:20100104T110000",
+        "RRULE:FREQ=WEEKLY",
+    )
+
+    occurrences = list(
+        iter_occurrences(
+            event,
+            datetime(2024, 10, 20, tzinfo=UTC),
+            datetime(2024, 11, 3, tzinfo=UTC),
+        )
+    )
+
+    # 10:00 in Copenhagen is 08:00 UTC in summer time and 09:00 UTC after it
+    assert [start for start, _ in occurrences] == [
+        datetime(2024, 10, 21, 8, 0, tzinfo=UTC),
+        datetime(2024, 10, 28, 9, 0, tzinfo=UTC),
+    ]
+
+
+def test_recurring_events_feed_conflict_checks(tmp_path):
+    """Test that occurrences, minus overridden ones, are checked for conflicts."""
+    today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    first = today - timedelta(days=30) + timedelta(hours=9)
+    moved = today + timedelta(days=2, hours=9)
+
+    def stamp(value):
+        return value.strftime("%Y%m%dT%H%M%SZ")
+
+    series = tmp_path / "series.ics"
+    series.write_text(
+        "\r\n".join(
+            [
+                "BEGIN:VCALENDAR",
+                "BEGIN:VEVENT",
+                "UID:daily",
+                "SUMMARY:Daily stand-up",
+                f"DTSTART:{stamp(first)}",
+                f"DTEND:{stamp(first + timedelta(minutes=15))}",
+                "RRULE:FREQ=DAILY",
+                "END:VEVENT",
+                "BEGIN:VEVENT",
+                "UID:daily",
+                "SUMMARY:Daily stand-up (moved)",
+                f"RECURRENCE-ID:{stamp(moved)}",
+                f"DTSTART:{stamp(moved + timedelta(hours=5))}",
+                f"DTEND:{stamp(moved + timedelta(hours=5, minutes=15))}",
+                "END:VEVENT",
+                "END:VCALENDAR",
+            ]
+        )
+        + "\r\n"
+    )
+    meetings = tmp_path / "meetings.ics"
+    meetings.write_text(
+        "\r\n".join(
+            [
+                "BEGIN:VCALENDAR",
+                "BEGIN:VEVENT",
+                "UID:planning",
+                "SUMMARY:Planning",
+                f"DTSTART:{stamp(moved)}",
+                f"DTEND:{stamp(moved + timedelta(hours=1))}",
+                "END:VEVENT",
+                "BEGIN:VEVENT",
+                "UID:review",
+                "SUMMARY:Review",
+                f"DTSTART:{stamp(today + timedelta(days=3, hours=9))}",
+                f"DTEND:{stamp(today + timedelta(days=3, hours=10))}",
+                "END:VEVENT",
+                "END:VCALENDAR",
+            ]
+        )
+        + "\r\n"
+    )
+
+    events = load_events(str(series), 7)
+    assert "Daily stand-up (moved)" in [event["summary"] for event in events]
+    assert moved not in [event["start"] for event in events]
+
+    conflicts = check_conflicts(str(series), str(meetings), 7)
+    assert [(e1["summary"], e2["summary"]) for e1, e2 in conflicts] == [
+        ("Daily stand-up", "Review")
+    ]
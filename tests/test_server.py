@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+from datetime import timedelta
+
+from calendar_sync.server import CalendarIndex, CalendarService, start_server
+from conftest import TOMORROW, write_calendar
+
+
+def at(hour):
+    return (TOMORROW + timedelta(hours=hour)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def service(tmp_path):
+    write_calendar(
+        tmp_path / "a.ics",
+        [
+            ("a-1", "Planning", 9, 1),
+            ("a-2", "Offsite", 12, 5),
+            ("shared", "Sync", 18, 1),
+        ],
+        start=TOMORROW,
+    )
+    write_calendar(
+        tmp_path / "b.ics",
+        [("b-1", "Lunch", 13, 1), ("shared", "Sync", 20, 1)],
+        start=TOMORROW,
+    )
+    return CalendarService({"a": str(tmp_path / "a.ics"), "b": str(tmp_path / "b.ics")})
+
+
+def test_overlapping_matches_a_scan():
+    """Test that the index finds the events a scan of all of them does."""
+    base = TOMORROW
+    events = [
+        {
+            "uid": f"e-{i}",
+            "summary": str(i),
+            "start": base + timedelta(minutes=(i * 37) % 600),
+            "end": base + timedelta(minutes=(i * 37) % 600 + (i * 53) % 240),
+        }
+        for i in range(200)
+    ]
+    index = CalendarIndex(events)
+
+    for start in range(-300, 900, 45):
+        for length in (1, 30, 200):
+            first = int((base + timedelta(minutes=start)).timestamp())
+            last = first + length * 60
+            expected = [
+                event
+                for event in index.events
+                if event["start"].timestamp() < last
+                and (
+                    event["end"].timestamp() > first
+                    or event["start"].timestamp() >= first
+                )
+            ]
+            assert index.overlapping(first, last) == expected
+
+
+def test_queries(tmp_path):
+    """Test the event, conflict and free/busy queries and their errors."""
+    calendars = service(tmp_path)
+    window = f"start={at(0)}&end={at(24)}"
+
+    status, found = calendars.handle("GET", "/events?uid=shared")
+    assert status == 200
+    assert [(event["calendar"], event["summary"]) for event in found["events"]] == [
+        ("a", "Sync"),
+        ("b", "Sync"),
+    ]
+    _, found = calendars.handle(
+        "GET", f"/events?calendar=a&start={at(10)}&end={at(13)}"
+    )
+    assert [event["uid"] for event in found["events"]] == ["a-2"]
+
+    _, conflicts = calendars.handle("GET", f"/conflicts?{window}")
+    assert conflicts["count"] == 1
+    assert (conflicts["conflicts"][0]["uid1"], conflicts["conflicts"][0]["uid2"]) == (
+        "a-2",
+        "b-1",
+    )
+    _, summary = calendars.handle("GET", f"/conflicts?{window}&summary=1")
+    assert summary["conflicts"] == 1
+    assert summary["overlap_minutes"] == 60
+
+    # Offsets are kept, a + in the query string is not read as a space
+    _, busy = calendars.handle("GET", f"/freebusy?at={at(14)}%2B01:00")
+    assert busy["busy"] is True
+    _, busy = calendars.handle("GET", f"/freebusy?calendar=a&calendar=b&all=1&{window}")
+    assert [(slot["start"][11:16], slot["end"][11:16]) for slot in busy["busy"]] == [
+        ("13:00", "14:00")
+    ]
+    assert len(busy["free"]) == 2
+
+    assert calendars.handle("GET", "/events?calendar=c")[0] == 404
+    assert calendars.handle("GET", "/events?start=soon")[0] == 400
+    assert calendars.handle("GET", "/conflicts?calendar=a")[0] == 400
+    assert calendars.handle("POST", "/events")[0] == 405
+    assert calendars.handle("GET", "/nothing")[0] == 404
+
+
+async def request(port, *targets):
+    """Send GETs over one kept-alive connection, returning the JSON bodies."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    bodies = []
+    for target in targets:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        bodies.append(json.loads(body))
+    writer.close()
+    return bodies
+
+
+def test_http_api_answers_concurrent_connections_and_reloads(tmp_path):
+    """Test requests over several connections, before and after a file changes."""
+    calendars = service(tmp_path)
+    reloaded = threading.Event()
+    calendars.watch(0.01, 0.01, lambda names, error: reloaded.set())
+
+    async def main():
+        server = await start_server(calendars, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            results = await asyncio.gather(
+                *(request(port, "/health", "/conflicts") for _ in range(5))
+            )
+            write_calendar(
+                tmp_path / "b.ics", [("b-2", "Dentist", 9, 1)], start=TOMORROW
+            )
+            assert await asyncio.to_thread(reloaded.wait, 5)
+            results.append(await request(port, "/health", "/events?uid=b-2"))
+        return results
+
+    results = asyncio.run(main())
+    for health, conflicts in results[:5]:
+        assert health["calendars"] == {"a": 3, "b": 2}
+        assert conflicts["count"] == 1
+    health, found = results[5]
+    assert health["calendars"] == {"a": 3, "b": 1}
+    assert health["reloads"] == 1
+    assert found["events"][0]["summary"] == "Dentist"
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+from conftest import write_calendar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Imports that take tens of milliseconds and are only needed by some commands
+HEAVY_MODULES = ("icalendar", "dateutil", "asyncio", "http.client", "multiprocessing")
+
+
+def imported_modules(*args):
+    """Run the CLI under `python -X importtime`, returning the modules it loaded."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "sync_calendars.py", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def heavy(modules):
+    return sorted(
+        name
+        for name in modules
+        for heavy in HEAVY_MODULES
+        if name == heavy or name.startswith(heavy + ".")
+    )
+
+
+def test_help_does_not_import_heavy_modules():
+    """Test that --help starts without icalendar, asyncio and the like."""
+    modules = imported_modules("--help")
+    assert "click" in modules
+    assert heavy(modules) == []
+    # Their defaults are shown in the help, the modules are not needed for it
+    assert not modules & {"calendar_sync.batch", "calendar_sync.watch", "termcolor"}
+
+
+def test_conflict_check_of_one_off_events_does_not_import_icalendar(tmp_path):
+    """Test that one-off events are checked, parsed or cached, without icalendar."""
+    write_calendar(tmp_path / "a.ics", [("a-1", "Planning", 9)])
+    write_calendar(tmp_path / "b.ics", [("b-1", "Review", 9)])
+    args = [
+        "--cache-dir",
+        str(tmp_path / "cache"),
+        "check_conflicts",
+        "--from_file",
+        str(tmp_path / "a.ics"),
+        "--to_file",
+        str(tmp_path / "b.ics"),
+        "--days",
+        "36500",
+    ]
+
+    assert heavy(imported_modules(*args)) == []
+    assert os.listdir(tmp_path / "cache")
+    assert heavy(imported_modules(*args)) == []
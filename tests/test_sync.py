@@ -79,3 +79,34 @@ def test_handle_event_conflicts_rescheduled():
 
     result = handle_event_conflicts(event, existing_event, check_conflicts=True)
     assert result is True  # Conflict, should skip
+
+
+def test_sync_ics_files_keeps_output_order():
+    """Test that updated events move to the end, after the destination events."""
+    mock_from_cal = Calendar()
+    mock_to_cal = Calendar()
+
+    for uid in ["dest-1", "shared", "dest-2"]:
+        event = Event()
+        event.add("UID", uid)
+        event.add("SUMMARY", f"Destination {uid}")
+        mock_to_cal.add_component(event)
+
+    for uid in ["shared", "source-1"]:
+        event = Event()
+        event.add("UID", uid)
+        event.add("SUMMARY", f"Source {uid}")
+        mock_from_cal.add_component(event)
+
+    with patch("calendar_sync.sync.read_calendar") as mock_read_calendar:
+        mock_read_calendar.side_effect = [mock_to_cal, mock_from_cal]
+        new_cal = sync_ics_files("mock_from.ics", "mock_to.ics")
+
+    assert [
+        (str(event["UID"]), str(event["SUMMARY"])) for event in new_cal.walk("VEVENT")
+    ] == [
+        ("dest-1", "Destination dest-1"),
+        ("dest-2", "Destination dest-2"),
+        ("shared", "Source shared"),
+        ("source-1", "Source source-1"),
+    ]
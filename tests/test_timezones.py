@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from calendar_sync.event_loader import _block_record, _event_record, load_records
+from calendar_sync.ics_reader import iter_vevent_blocks, parse_block
+from calendar_sync.timezones import TimeNormalizer
+
+ICS = (
+    b"BEGIN:VCALENDAR\r\n"
+    b"VERSION:2.0\r\n"
+    b"BEGIN:VTIMEZONE\r\n"
+    b"TZID:Head Office\r\n"
+    b"BEGIN:STANDARD\r\n"
+    b"DTSTART:19701025T030000\r\n"
+    b"TZOFFSETFROM:+0200\r\n"
+    b"TZOFFSETTO:+0100\r\n"
+    b"RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU\r\n"
+    b"END:STANDARD\r\n"
+    b"BEGIN:DAYLIGHT\r\n"
+    b"DTSTART:19700329T020000\r\n"
+    b"TZOFFSETFROM:+0100\r\n"
+    b"TZOFFSETTO:+0200\r\n"
+    b"RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU\r\n"
+    b"END:DAYLIGHT\r\n"
+    b"END:VTIMEZONE\r\n"
+    b"BEGIN:VEVENT\r\n"
+    b"UID:custom\r\n"
+    b"SUMMARY:Planning\\, part 1\r\n"
+    b"DTSTART;TZID=Head Office:20240715T090000\r\n"
+    b"DTEND;TZID=Head Office:20240715T100000\r\n"
+    b"END:VEVENT\r\n"
+    b"BEGIN:VEVENT\r\n"
+    b"UID:windows\r\n"
+    b"SUMMARY;LANGUAGE=en:Review\r\n"
+    b'DTSTART;TZID="W. Europe Standard Time":20240115T090000\r\n'
+    b"DTEND;TZID=W. Europe Standard Time:20240115T100000\r\n"
+    b"END:VEVENT\r\n"
+    b"BEGIN:VEVENT\r\n"
+    b"UID:all-day\r\n"
+    b"SUMMARY:Offsite\r\n"
+    b"DTSTART;VALUE=DATE:20240925\r\n"
+    b"END:VEVENT\r\n"
+    b"BEGIN:VEVENT\r\n"
+    b"UID:floating\r\n"
+    b"DTSTART:20240925T090000\r\n"
+    b"RECURRENCE-ID;TZID=America/New_York:20240925T090000\r\n"
+    b"END:VEVENT\r\n"
+    b"END:VCALENDAR\r\n"
+)
+
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def test_epoch_converts_each_form_to_utc():
+    """Test that UTC, floating, dated and zoned values become UTC epoch seconds."""
+    normalizer = TimeNormalizer()
+
+    assert normalizer.epoch(b"20240925T090000Z") == epoch(2024, 9, 25, 9)
+    assert normalizer.epoch(b"20240925T090000") == epoch(2024, 9, 25, 9)
+    assert normalizer.epoch(b"20240925") == epoch(2024, 9, 25)
+    # Summer and winter time, and the repeated hour when clocks go back
+    assert normalizer.epoch(b"20240715T090000", "Europe/Berlin") == epoch(
+        2024, 7, 15, 7
+    )
+    assert normalizer.epoch(b"20240115T090000", "Europe/Berlin") == epoch(
+        2024, 1, 15, 8
+    )
+    assert normalizer.epoch(b"20241027T023000", "Europe/Berlin") == epoch(
+        2024, 10, 27, 0, 30
+    )
+    assert normalizer.epoch(b"20240925T090000", "Nowhere/Zone") == epoch(2024, 9, 25, 9)
+    assert normalizer.epoch(b"20241325T090000") is None
+    assert normalizer.epoch(b"20240925T0900") is None
+
+
+def test_offsets_are_looked_up_once_per_zone_and_bucket():
+    """Test that a zone is resolved once and its offsets are memoized."""
+    normalizer = TimeNormalizer()
+    with patch(
+        "calendar_sync.timezones._lookup", wraps=lambda tzid: None
+    ) as mock_lookup:
+        for day in range(1, 29):
+            for minute in ("00", "05", "10"):
+                normalizer.epoch(f"202402{day:02d}T09{minute}00".encode(), "Lab")
+
+    assert mock_lookup.call_count == 1
+    assert len(normalizer._offsets) == 28
+
+
+def test_raw_records_match_parsed_components(tmp_path):
+    """Test that records read from raw lines match those of parsed events."""
+    ics_file = tmp_path / "calendar.ics"
+    ics_file.write_bytes(ICS)
+    normalizer = TimeNormalizer(str(ics_file))
+
+    for block in iter_vevent_blocks(str(ics_file)):
+        component = parse_block(block)
+        assert _block_record(block, normalizer) == _event_record(component, normalizer)
+
+    records = {record[0]: record for record in load_records(str(ics_file))}
+    # The zone only defined by the VTIMEZONE is applied, not read as UTC
+    assert records["custom"][1:4] == (
+        "Planning, part 1",
+        epoch(2024, 7, 15, 7),
+        epoch(2024, 7, 15, 8),
+    )
+    assert records["windows"][2] == epoch(2024, 1, 15, 8)
+    assert records["all-day"][2:4] == (epoch(2024, 9, 25), epoch(2024, 9, 26))
+    assert records["floating"][1:5] == (
+        "None",
+        epoch(2024, 9, 25, 9),
+        epoch(2024, 9, 25, 9),
+        epoch(2024, 9, 25, 13),
+    )
+
+
+def test_recurring_series_in_a_file_defined_zone(tmp_path):
+    """Test that a series and its override share the zone of a VTIMEZONE."""
+    from calendar_sync.cache import EventCache
+    from calendar_sync.event_loader import load_events
+
+    ics_file = tmp_path / "series.ics"
+    ics_file.write_bytes(
+        b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+        b"BEGIN:VTIMEZONE\r\nTZID:Series Office\r\nBEGIN:STANDARD\r\n"
+        b"DTSTART:19700101T000000\r\nTZOFFSETFROM:+0200\r\nTZOFFSETTO:+0200\r\n"
+        b"END:STANDARD\r\nEND:VTIMEZONE\r\n"
+        b"BEGIN:VEVENT\r\nUID:daily\r\nSUMMARY:Daily\r\n"
+        b"DTSTART;TZID=Series Office:20300101T120000\r\n"
+        b"DTEND;TZID=Series Office:20300101T130000\r\n"
+        b"RRULE:FREQ=DAILY;COUNT=3\r\nEND:VEVENT\r\n"
+        b"BEGIN:VEVENT\r\nUID:daily\r\nSUMMARY:Moved\r\n"
+        b"RECURRENCE-ID;TZID=Series Office:20300102T120000\r\n"
+        b"DTSTART;TZID=Series Office:20300102T150000\r\n"
+        b"DTEND;TZID=Series Office:20300102T160000\r\nEND:VEVENT\r\n"
+        b"END:VCALENDAR\r\n"
+    )
+    start = datetime(2029, 12, 31, tzinfo=timezone.utc)
+    cache = EventCache(str(tmp_path / "cache"))
+
+    for options in ({}, {"cache": cache}, {"cache": cache}):
+        events = load_events(str(ics_file), 10, start=start, **options)
+        assert sorted(
+            (event["summary"], event["start"].strftime("%d %H:%M")) for event in events
+        ) == [("Daily", "01 10:00"), ("Daily", "03 10:00"), ("Moved", "02 13:00")]
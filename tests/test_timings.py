@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from calendar_sync import timings
+from conftest import write_calendar
+from sync_calendars import cli
+
+
+def test_stages_are_added_up_only_when_enabled():
+    """Test that stages cost nothing while disabled and add up while enabled."""
+    assert timings.stage("parse") is timings.stage("merge")
+
+    timings.enable()
+    try:
+        for count in (2, 3):
+            with timings.stage("parse") as parse:
+                parse.add(events=count)
+        timings.stage("unused")
+        report = timings.report()
+    finally:
+        timings.disable()
+
+    (parse,) = report["stages"]
+    assert (parse["stage"], parse["calls"], parse["events"]) == ("parse", 2, 5)
+    assert parse["seconds"] >= 0
+    assert "parse" in timings.to_text(report)
+
+
+def test_stages_report_how_much_they_raised_the_peak():
+    """Test that a stage after a larger one does not report its peak as its own."""
+    timings.enable()
+    try:
+        with patch("calendar_sync.timings.peak_rss_kb", side_effect=[100, 5000]):
+            with timings.stage("load_events"):
+                pass
+        with patch("calendar_sync.timings.peak_rss_kb", side_effect=[5000, 5000]):
+            with timings.stage("write"):
+                pass
+        with patch("calendar_sync.timings.peak_rss_kb", return_value=5000):
+            report = timings.report()
+    finally:
+        timings.disable()
+
+    load, write = report["stages"]
+    assert load["peak_rss_growth_kb"] == 4900
+    assert write["peak_rss_growth_kb"] == 0
+    text = timings.to_text(report)
+    assert "Peak +" in text
+    assert text.splitlines()[-1].endswith("4.9 MB")
+
+
+def test_cli_writes_timings_json(tmp_path):
+    """Test that --timings-json reports each stage of a sync."""
+    write_calendar(tmp_path / "a.ics", [("a-1", "Planning", 9)])
+    write_calendar(tmp_path / "b.ics", [("b-1", "Review", 10)])
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--timings-json",
+            str(tmp_path / "timings.json"),
+            "sync",
+            "--from_file",
+            str(tmp_path / "a.ics"),
+            "--to_file",
+            str(tmp_path / "b.ics"),
+            "--output",
+            str(tmp_path / "out.ics"),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    report = json.loads((tmp_path / "timings.json").read_text())
+    stages = {totals["stage"]: totals for totals in report["stages"]}
+    assert list(stages) == ["parse", "merge", "handle_event_conflicts", "write"]
+    assert stages["parse"]["components"] == 2
+    assert stages["merge"]["events"] == 2
+    assert stages["handle_event_conflicts"]["calls"] == 1
+    assert stages["handle_event_conflicts"]["events"] == 0
+    assert not timings.enabled()
@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from icalendar import Calendar
+
+from calendar_sync.sync import read_calendar
+from calendar_sync.watch import FileWatcher, WatchSession, watch
+from conftest import write_calendar
+
+# Ahead of now, so the events are in the conflict window of the sessions
+FUTURE = datetime(2099, 9, 25, tzinfo=timezone.utc)
+
+
+def test_file_watcher_debounces_bursts_of_writes(tmp_path):
+    """Test that several writes in a row are reported as one change."""
+    watched = tmp_path / "a.ics"
+    other = tmp_path / "b.ics"
+    watched.write_text("v0")
+    other.write_text("v0")
+    writes = iter(["v1", "v22", "v333"])
+    sleeps = []
+
+    def sleep(seconds):
+        # Keep writing the file for the first few polls, like a slow exporter
+        sleeps.append(seconds)
+        for content in writes:
+            watched.write_text(content)
+            break
+
+    watcher = FileWatcher(
+        [str(watched), str(other)], interval=1, debounce=0.2, sleep=sleep
+    )
+
+    assert watcher.wait() == [str(watched)]
+    assert sleeps == [1, 0.2, 0.2, 0.2]
+    assert watched.read_text() == "v333"
+
+
+def test_watch_session_only_parses_changed_files(tmp_path):
+    """Test that later cycles reuse the parsed calendars of unchanged files."""
+    from_file, to_file, output = (
+        tmp_path / name for name in ("a.ics", "b.ics", "out.ics")
+    )
+    write_calendar(from_file, [("a-1", "Planning", 9)], start=FUTURE)
+    write_calendar(to_file, [("b-1", "Review", 9)], start=FUTURE)
+    session = WatchSession(str(from_file), str(to_file), output=str(output), days=36500)
+
+    with (
+        patch(
+            "calendar_sync.watch.read_calendar", side_effect=read_calendar
+        ) as mock_read,
+        patch("calendar_sync.watch.load_records") as mock_load_records,
+    ):
+        first = session.run_cycle()
+        write_calendar(
+            from_file, [("a-1", "Planning", 9), ("a-2", "Retro", 12)], start=FUTURE
+        )
+        second = session.run_cycle([str(from_file)])
+
+    assert [call.args[0] for call in mock_read.call_args_list] == [
+        str(from_file),
+        str(to_file),
+        str(from_file),
+    ]
+    # The conflict check reuses the calendars parsed for the sync
+    mock_load_records.assert_not_called()
+    assert (first["events"], second["events"]) == (2, 3)
+    assert len(second["conflicts"]) == 1
+    assert {"parse", "sync", "write", "check", "total"} <= set(second)
+    with open(output, "rb") as f:
+        assert len(Calendar.from_ical(f.read()).walk("VEVENT")) == 3
+
+
+def test_watch_ignores_its_own_output(tmp_path):
+    """Test that writing an output that is also an input does not count as a change."""
+    from_file, to_file = tmp_path / "a.ics", tmp_path / "b.ics"
+    write_calendar(from_file, [("a-1", "Planning", 9)], start=FUTURE)
+    write_calendar(to_file, [("b-1", "Review", 9)], start=FUTURE)
+    session = WatchSession(str(from_file), str(to_file), output=str(to_file))
+
+    def sleep(seconds):
+        if seconds == 1:
+            write_calendar(from_file, [("a-1", "Planning (moved)", 10)], start=FUTURE)
+
+    watcher = FileWatcher(session.files, interval=1, debounce=0, sleep=sleep)
+    reports = []
+    watch(session, watcher, reports.append, max_cycles=2)
+
+    assert [(stats["cycle"], stats["changed"]) for stats in reports] == [(1, 2), (2, 1)]
+
+
+def test_watch_keeps_the_last_good_calendars_when_a_cycle_fails(tmp_path):
+    """Test that a half-written file is reported and the watch goes on."""
+    from_file, to_file, output = (
+        tmp_path / name for name in ("a.ics", "b.ics", "out.ics")
+    )
+    write_calendar(from_file, [("a-1", "Planning", 9)], start=FUTURE)
+    write_calendar(to_file, [("b-1", "Review", 9)], start=FUTURE)
+    session = WatchSession(str(from_file), str(to_file), output=str(output), days=36500)
+
+    class Watcher:
+        """Reports from_file as changed after each of the writes."""
+
+        writes = iter(
+            [
+                lambda: from_file.write_text("BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\n"),
+                lambda: write_calendar(from_file, [("a-2", "Retro", 12)], start=FUTURE),
+            ]
+        )
+
+        def wait(self):
+            next(self.writes)()
+            return [str(from_file)]
+
+        def acknowledge(self, path):
+            pass
+
+    reports = []
+    watch(session, Watcher(), reports.append, max_cycles=2)
+
+    assert [stats["cycle"] for stats in reports] == [1, 2, 2]
+    assert isinstance(reports[1]["error"], ValueError)
+    assert reports[2]["events"] == 2
+    assert reports[2]["conflicts"] == []
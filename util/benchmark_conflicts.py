@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from generate_test_data import generate_events, generate_overlapping_events
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from calendar_sync.conflict_checker import find_conflicts  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def to_loaded_events(events):
+    """Convert generated icalendar events into the dicts `load_events` returns."""
+    loaded = []
+    for event in events:
+        loaded.append(
+            {
+                "uid": str(event["uid"]),
+                "summary": str(event["summary"]),
+                "start": event["dtstart"].dt.replace(tzinfo=timezone.utc),
+                "end": event["dtend"].dt.replace(tzinfo=timezone.utc),
+            }
+        )
+    return loaded
+
+
+def nested_loop_conflicts(events1, events2):
+    """Reference pairwise scan, equivalent to the old check_conflicts loop."""
+    conflicts = []
+    for event1 in events1:
+        for event2 in events2:
+            if event1["uid"] != event2["uid"] and (
+                event1["start"] < event2["end"] and event1["end"] > event2["start"]
+            ):
+                conflicts.append((event1, event2))
+    return conflicts
+
+
+def benchmark(num_events: int, compare: bool):
+    """Time the conflict engine on two generated, overlapping calendars."""
+    start_time = datetime.now() + timedelta(days=1)
+    events_a = generate_events(num_events, start_time, overlap=True)
+    events_b = generate_overlapping_events(events_a, [])
+    events1 = to_loaded_events(events_a)
+    events2 = to_loaded_events(events_b)
+
+    began = time.perf_counter()
+    conflicts = find_conflicts(events1, events2)
+    sweep_seconds = time.perf_counter() - began
+
+    line = f"{num_events:>8} events  {len(conflicts):>8} conflicts  "
+    line += f"sweep {sweep_seconds:8.3f}s"
+
+    if compare:
+        began = time.perf_counter()
+        nested_loop_conflicts(events1, events2)
+        line += f"  nested loop {time.perf_counter() - began:8.3f}s"
+
+    print(line)
+
+
+def main():
+    # Usage: python benchmark_conflicts.py [num_events ...] [--compare]
+    compare = "--compare" in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    for num_events in sizes or SIZES:
+        # The pairwise scan is quadratic, only run it where it finishes in seconds
+        benchmark(num_events, compare and num_events <= 10_000)
+
+
+if __name__ == "__main__":
+    main()
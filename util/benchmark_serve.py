@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from generate_test_data import TIMEZONES, generate_calendars, write_calendars
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CLI = os.path.join(ROOT, "sync_calendars.py")
+
+
+def queries(names, events, rng):
+    """Yield (kind, target) requests over random days of the generated events."""
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    days = max(events * len(names) // 24, 1)
+    while True:
+        day = start + timedelta(days=rng.randrange(days))
+        end = day + timedelta(days=1)
+        window = f"start={day:%Y-%m-%dT%H:%M:%S}&end={end:%Y-%m-%dT%H:%M:%S}"
+        calendar = rng.randrange(len(names))
+        uid = f"calendar-{calendar}-event-{rng.randrange(events)}@example.com"
+        yield rng.choice(
+            [
+                ("events?uid", f"/events?uid={uid}"),
+                ("events?range", f"/events?{window}"),
+                ("freebusy", f"/freebusy?{window}"),
+                ("conflicts", f"/conflicts?{window}"),
+                ("conflicts?summary", f"/conflicts?{window}&summary=1"),
+            ]
+        )
+
+
+async def client(port, requests, latencies):
+    """Send requests one after another over a kept-alive connection."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for kind, target in requests:
+        began = time.perf_counter()
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        status = await reader.readline()
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.setdefault(kind, []).append(time.perf_counter() - began)
+        assert status.startswith(b"HTTP/1.1 200"), status
+    writer.close()
+
+
+async def run_clients(port, requests, concurrency):
+    latencies = {}
+    began = time.perf_counter()
+    await asyncio.gather(
+        *(client(port, requests[i::concurrency], latencies) for i in range(concurrency))
+    )
+    return latencies, time.perf_counter() - began
+
+
+def percentile(values, p):
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def report(kind, values):
+    values = sorted(values)
+    print(
+        f"{kind:<18} {len(values):>6}  "
+        f"p50 {percentile(values, 0.5) * 1000:7.2f}ms  "
+        f"p95 {percentile(values, 0.95) * 1000:7.2f}ms  "
+        f"p99 {percentile(values, 0.99) * 1000:7.2f}ms"
+    )
+
+
+def start_server(paths, days, cache_dir):
+    """Start `serve` on a free port, returning the process once it is ready."""
+    command = [sys.executable, CLI, "--cache-dir", cache_dir, "serve", "--port", "0"]
+    command += ["--days", str(days)]
+    for path in paths:
+        command += ["--calendar", path]
+    began = time.perf_counter()
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    for line in server.stdout:
+        if line.startswith("Serving on"):
+            port = int(line.split(",")[0].rsplit(":", 1)[1])
+            print(f"Server ready in {time.perf_counter() - began:.2f}s on port {port}")
+            return server, port
+    raise RuntimeError("The server exited before it was ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the latency of `serve` queries on generated calendars."
+    )
+    parser.add_argument("--calendars", type=int, default=4)
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recurring-ratio", type=float, default=0.05)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--compare",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also time N `check_conflicts` runs, one process per request",
+    )
+    args = parser.parse_args()
+
+    # Events are an hour apart per calendar, recurring ones repeat for 12 weeks
+    days = args.events * args.calendars // 24 + 7 * 13 + 1
+    with tempfile.TemporaryDirectory() as directory:
+        calendars = generate_calendars(
+            args.calendars,
+            args.events,
+            seed=args.seed,
+            recurring_ratio=args.recurring_ratio,
+            timezones=TIMEZONES,
+        )
+        paths = write_calendars(calendars, directory)
+        server, port = start_server(paths, days, os.path.join(directory, "cache"))
+        try:
+            rng = random.Random(args.seed)
+            generator = queries(paths, args.events, rng)
+            requests = [next(generator) for _ in range(args.requests)]
+            latencies, seconds = asyncio.run(
+                run_clients(port, requests, args.concurrency)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(
+            f"{args.requests} requests over {args.concurrency} connections in "
+            f"{seconds:.2f}s, {args.requests / seconds:.0f} requests/s"
+        )
+        for kind in sorted(latencies):
+            report(kind, latencies[kind])
+        report("all", [value for values in latencies.values() for value in values])
+
+        if args.compare:
+            command = [sys.executable, CLI, "--cache-dir"]
+            command += [os.path.join(directory, "cache"), "check_conflicts"]
+            for path in paths:
+                command += ["--calendar", path]
+            command += ["--days", "1", "--format", "jsonl"]
+            times = []
+            for _ in range(args.compare):
+                began = time.perf_counter()
+                subprocess.run(command, capture_output=True, check=True)
+                times.append(time.perf_counter() - began)
+            print(
+                f"check_conflicts process per request: {len(times)} runs  "
+                f"median {statistics.median(times) * 1000:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
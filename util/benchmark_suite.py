@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from generate_test_data import TIMEZONES, generate_calendars, write_calendars
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from calendar_sync.conflict_checker import (  # noqa: E402
+    check_conflicts,
+    check_conflicts_multi,
+)
+from calendar_sync.event_loader import load_events  # noqa: E402
+from calendar_sync.file_writer import write_ics_file  # noqa: E402
+from calendar_sync.sync import sync_ics_files  # noqa: E402
+
+RESULTS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_results.jsonl"
+)
+# A benchmark this much slower than the previous run is reported as a regression
+DEFAULT_THRESHOLD = 1.2
+
+
+def benchmarks(paths, days, output):
+    """Return the benchmarks to run as (name, function) pairs."""
+    merged = sync_ics_files(paths[1], paths[0])
+    return [
+        ("load_events", lambda: load_events(paths[0], days)),
+        ("check_conflicts", lambda: check_conflicts(paths[0], paths[1], days)),
+        ("check_conflicts_multi", lambda: check_conflicts_multi(paths, days)),
+        ("sync_ics_files", lambda: sync_ics_files(paths[1], paths[0])),
+        ("write_ics_file", lambda: write_ics_file(merged, output)),
+    ]
+
+
+def time_function(function, repeat):
+    """Return the min and median wall time of `repeat` calls to the function."""
+    times = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - began)
+    return {"min": min(times), "median": statistics.median(times)}
+
+
+def git_commit():
+    """Return the short hash of the checked out commit, if there is one."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(results_file):
+    """Read the stored runs, oldest first."""
+    try:
+        with open(results_file, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def compare(run, previous, threshold):
+    """Print each benchmark against the previous run, returning the regressions."""
+    regressions = []
+    for name, result in run["results"].items():
+        line = f"{name:<24} {result['min']:8.3f}s"
+        before = previous["results"].get(name) if previous else None
+        if before:
+            ratio = result["min"] / before["min"]
+            line += f"  {ratio:5.2f}x vs {previous['commit'] or previous['timestamp']}"
+            if ratio > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time load, conflict check, sync and write on generated calendars."
+    )
+    parser.add_argument("--calendars", type=int, default=4)
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--overlap-ratio", type=float, default=0.1)
+    parser.add_argument("--recurring-ratio", type=float, default=0.05)
+    parser.add_argument("--timezones", default=",".join(TIMEZONES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--label", help="Free text stored with the results")
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare with the last stored run with the same parameters",
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--no-save", action="store_true", help="Do not store the results of this run"
+    )
+    args = parser.parse_args()
+
+    params = {
+        "calendars": args.calendars,
+        "events": args.events,
+        "seed": args.seed,
+        "overlap_ratio": args.overlap_ratio,
+        "recurring_ratio": args.recurring_ratio,
+        "timezones": args.timezones,
+    }
+    # Events are an hour apart per calendar, recurring ones repeat for 12 weeks
+    days = args.events * args.calendars // 24 + 7 * 13
+
+    with tempfile.TemporaryDirectory() as directory:
+        calendars = generate_calendars(
+            args.calendars,
+            args.events,
+            seed=args.seed,
+            overlap_ratio=args.overlap_ratio,
+            recurring_ratio=args.recurring_ratio,
+            timezones=args.timezones.split(","),
+        )
+        paths = write_calendars(calendars, directory)
+        output = os.path.join(directory, "output.ics")
+
+        results = {}
+        for name, function in benchmarks(paths, days, output):
+            results[name] = time_function(function, args.repeat)
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+
+    previous = None
+    if args.compare:
+        matching = [r for r in load_results(args.results) if r["params"] == params]
+        previous = matching[-1] if matching else None
+        if previous is None:
+            print("No stored run with the same parameters to compare with")
+    regressions = compare(run, previous, args.threshold)
+
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run) + "\n")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
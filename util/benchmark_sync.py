@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from icalendar import Calendar
+
+from generate_test_data import generate_events
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from calendar_sync.sync import (  # noqa: E402
+    get_events_from_calendar,
+    handle_event_conflicts,
+    sync_ics_files,
+)
+
+SIZES = [1_000, 5_000, 10_000, 100_000]
+
+
+def build_calendars(num_events: int):
+    """
+    Build two in-memory calendars where every UID exists in both.
+    The source calendar lists its events in a different order.
+    """
+    start_time = datetime.now() + timedelta(days=1)
+    uids = [f"event-{i}@example.com" for i in range(num_events)]
+
+    calendars = []
+    for _ in range(2):
+        cal = Calendar()
+        for event in generate_events(num_events, start_time, False, uids):
+            cal.add_component(event)
+        calendars.append(cal)
+    random.Random(num_events).shuffle(calendars[1].subcomponents)
+    return calendars
+
+
+def list_remove_merge(to_calendar, from_calendar):
+    """Reference merge using list.remove, as sync_ics_files used to do."""
+    new_cal = Calendar()
+    destination_events = get_events_from_calendar(to_calendar)
+    for event in destination_events.values():
+        new_cal.add_component(event)
+    for uid, event in get_events_from_calendar(from_calendar).items():
+        if uid in destination_events:
+            if handle_event_conflicts(event, destination_events[uid], None):
+                continue
+            new_cal.subcomponents.remove(destination_events[uid])
+        new_cal.add_component(event)
+    return new_cal
+
+
+def benchmark(num_events: int, compare: bool):
+    """Time the merge in sync_ics_files when 100% of the UIDs overlap."""
+    to_calendar, from_calendar = build_calendars(num_events)
+
+    # Skip reading ICS files so only the merge itself is timed
+    with patch("calendar_sync.sync.read_calendar") as mock_read_calendar:
+        mock_read_calendar.side_effect = [to_calendar, from_calendar]
+        began = time.perf_counter()
+        new_cal = sync_ics_files("from.ics", "to.ics")
+        merge_seconds = time.perf_counter() - began
+
+    line = f"{num_events:>8} events  {len(new_cal.subcomponents):>8} merged  "
+    line += f"sync {merge_seconds:8.3f}s"
+
+    if compare:
+        began = time.perf_counter()
+        list_remove_merge(to_calendar, from_calendar)
+        line += f"  list.remove {time.perf_counter() - began:8.3f}s"
+
+    print(line)
+
+
+def main():
+    # Usage: python benchmark_sync.py [num_events ...] [--compare]
+    compare = "--compare" in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    for num_events in sizes or SIZES:
+        # The list.remove merge is quadratic, only run it where it finishes
+        benchmark(num_events, compare and num_events <= 5_000)
+
+
+if __name__ == "__main__":
+    main()
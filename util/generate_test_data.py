@@ -1,10 +1,22 @@
-import sys
-from typing import List
-from datetime import datetime, timedelta
+import argparse
+import itertools
+from typing import List, Optional, Sequence
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from icalendar import Event, Calendar
 import random
 import os
 
+TIMEZONES = ["UTC", "Europe/Copenhagen", "America/New_York", "Asia/Tokyo"]
+
+# Sequence numbers for generated UIDs, so no two generated events share a UID
+_uid_numbers = itertools.count(1)
+
+
+def unique_uid() -> str:
+    """Return a UID no other generated event has."""
+    return f"event-{next(_uid_numbers)}@example.com"
+
 
 def create_event(summary, start_time, end_time, uid):
     """Helper function to create an event."""
@@ -17,10 +29,10 @@ def create_event(summary, start_time, end_time, uid):
     return event
 
 
-def create_test_ics(file_name: str, events: List[Event]):
-    """Write a list of events to an ICS file in the ../tests/test_data directory."""
-    # Define the relative directory path
-    directory = "../tests/test_data"
+def create_test_ics(
+    file_name: str, events: List[Event], directory: str = "../tests/test_data"
+):
+    """Write a list of events to an ICS file, by default in ../tests/test_data."""
 
     # Create the directory if it doesn't exist
     os.makedirs(directory, exist_ok=True)
@@ -62,7 +74,7 @@ def generate_events(
         if shared_uids and i < len(shared_uids):
             uid = shared_uids[i]
         else:
-            uid = f"event-{random.randint(1000, 9999)}@example.com"
+            uid = unique_uid()
 
         event = create_event(summary, event_start, event_end, uid)
         events.append(event)
@@ -90,7 +102,7 @@ def generate_overlapping_events(events_a: List[Event], shared_uids: List[str]):
         if event["uid"] in shared_uids:
             overlap_uid = event["uid"]
         else:
-            overlap_uid = f"event-{random.randint(1000, 9999)}@example.com"
+            overlap_uid = unique_uid()
         overlapping_event = create_event(
             overlap_summary, overlap_start, overlap_end, overlap_uid
         )
@@ -100,7 +112,12 @@ def generate_overlapping_events(events_a: List[Event], shared_uids: List[str]):
     return overlapping_events
 
 
-def generate_ics_files(num_events: int, overlap: bool = False, same_uid: bool = False):
+def generate_ics_files(
+    num_events: int,
+    overlap: bool = False,
+    same_uid: bool = False,
+    directory: str = "../tests/test_data",
+):
     """Generate two ICS files with specified options."""
     if num_events <= 0:
         print("No events to generate. Please provide a positive number of events.")
@@ -132,30 +149,126 @@ def generate_ics_files(num_events: int, overlap: bool = False, same_uid: bool =
         start_time_b = start_time_a + random_offset
         events_b = generate_events(num_events, start_time_b, overlap, shared_uids)
 
-    create_test_ics("calendar_a.ics", events_a)
-    create_test_ics("calendar_b.ics", events_b)
+    create_test_ics("calendar_a.ics", events_a, directory)
+    create_test_ics("calendar_b.ics", events_b, directory)
 
-    print(
-        f"""Generated {num_events} events for each calendar.
-         Overlap: {overlap}, Same UID: {same_uid}"""
-    )
+    print(f"""Generated {num_events} events for each calendar.
+         Overlap: {overlap}, Same UID: {same_uid}""")
     if same_uid:
         print(f"Number of events with the same UID: {len(shared_uids)}")
 
 
+def generate_calendars(
+    num_calendars: int,
+    num_events: int,
+    seed: int = 0,
+    overlap_ratio: float = 0.1,
+    recurring_ratio: float = 0.0,
+    timezones: Sequence[str] = ("UTC",),
+    start_time: Optional[datetime] = None,
+) -> List[Calendar]:
+    """
+    Generate calendars with a controlled share of conflicting events.
+
+    Events of different calendars take turns on an hourly grid and end within
+    their hour, so they never overlap by accident. A share `overlap_ratio` of
+    the events in every calendar but the first is instead moved onto the slot
+    of the first calendar's event, which makes it conflict. A share
+    `recurring_ratio` of the events repeat weekly, whose later occurrences can
+    add conflicts, and every event is written in one of `timezones`. The same
+    seed and start time give the same calendars.
+    """
+    rng = random.Random(seed)
+    zones = [ZoneInfo(name) for name in timezones]
+    if start_time is None:
+        start_time = datetime.now(timezone.utc).replace(
+            minute=0, second=0, microsecond=0
+        ) + timedelta(days=1)
+
+    calendars = []
+    for c in range(num_calendars):
+        cal = Calendar()
+        cal.add("prodid", "-//calendar_sync//generate_test_data//EN")
+        cal.add("version", "2.0")
+        for i in range(num_events):
+            slot = c
+            if c > 0 and rng.random() < overlap_ratio:
+                slot = 0
+            event_start = start_time + timedelta(
+                hours=i * num_calendars + slot, minutes=rng.choice((0, 5, 10, 15))
+            )
+            event_end = event_start + timedelta(minutes=rng.choice((30, 40, 45)))
+            zone = rng.choice(zones)
+
+            event = Event()
+            event.add("uid", f"calendar-{c}-event-{i}@example.com")
+            event.add("summary", f"Calendar {c} event {i}")
+            event.add("dtstart", event_start.astimezone(zone))
+            event.add("dtend", event_end.astimezone(zone))
+            event.add("dtstamp", start_time)
+            if rng.random() < recurring_ratio:
+                event.add("rrule", {"FREQ": "WEEKLY", "COUNT": rng.randint(2, 12)})
+            cal.add_component(event)
+
+        cal.add_missing_timezones()
+        calendars.append(cal)
+    return calendars
+
+
+def write_calendars(calendars: List[Calendar], directory: str) -> List[str]:
+    """Write calendars to calendar_<n>.ics files, replacing existing ones."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for c, cal in enumerate(calendars):
+        path = os.path.join(directory, f"calendar_{c}.ics")
+        with open(path, "wb") as f:
+            f.write(cal.to_ical())
+        paths.append(path)
+    return paths
+
+
 def main():
-    # Parse arguments from sys.argv
-    if len(sys.argv) < 2:
-        print(
-            "Usage: python generate_test_data.py <num_events> [--overlap] [--same-uid]"
+    parser = argparse.ArgumentParser(description="Generate ICS files for testing.")
+    parser.add_argument("num_events", type=int, help="Number of events per calendar")
+    parser.add_argument("--overlap", action="store_true")
+    parser.add_argument("--same-uid", action="store_true")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible output")
+    parser.add_argument(
+        "--calendars",
+        type=int,
+        help="Generate this many calendars with generate_calendars instead",
+    )
+    parser.add_argument("--overlap-ratio", type=float, default=0.1)
+    parser.add_argument("--recurring-ratio", type=float, default=0.0)
+    parser.add_argument(
+        "--timezones",
+        default="UTC",
+        help=f"Comma separated zones to spread events over, e.g. {','.join(TIMEZONES)}",
+    )
+    parser.add_argument("--output-dir", default="../tests/test_data")
+    args = parser.parse_args()
+
+    if args.calendars:
+        calendars = generate_calendars(
+            args.calendars,
+            args.num_events,
+            seed=args.seed or 0,
+            overlap_ratio=args.overlap_ratio,
+            recurring_ratio=args.recurring_ratio,
+            timezones=args.timezones.split(","),
         )
-        sys.exit(1)
-
-    num_events = int(sys.argv[1])
-    overlap = "--overlap" in sys.argv
-    same_uid = "--same-uid" in sys.argv
+        for path in write_calendars(calendars, args.output_dir):
+            print(f"Created ICS file: {path}")
+        return
 
-    generate_ics_files(num_events, overlap=overlap, same_uid=same_uid)
+    if args.seed is not None:
+        random.seed(args.seed)
+    generate_ics_files(
+        args.num_events,
+        overlap=args.overlap,
+        same_uid=args.same_uid,
+        directory=args.output_dir,
+    )
 
 
 if __name__ == "__main__":
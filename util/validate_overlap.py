@@ -1,19 +1,20 @@
-from icalendar import Calendar
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from calendar_sync.ics_reader import iter_events  # noqa: E402
 
 
 def read_ics(file_path: str):
     """Read events from an ICS file
     and return a list of (start_time, end_time, summary)."""
-    with open(file_path, "rb") as f:
-        cal = Calendar.from_ical(f.read())
-
     events = []
-    for component in cal.walk():
-        if component.name == "VEVENT":
-            start = component.get("dtstart").dt
-            end = component.get("dtend").dt
-            summary = component.get("summary")
-            events.append((start, end, summary))
+    for component in iter_events(file_path):
+        start = component.get("dtstart").dt
+        end = component.get("dtend").dt
+        summary = component.get("summary")
+        events.append((start, end, summary))
 
     return events
 